@@ -15,6 +15,7 @@ CREATE ROLE web_reader WITH LOGIN PASSWORD ''; --Establecer contraseña
 GRANT CONNECT ON DATABASE postgres TO python_script;
 GRANT USAGE ON SCHEMA public TO python_script;
 GRANT SELECT, INSERT, UPDATE ON ALL TABLES IN SCHEMA public TO python_script;
+GRANT TEMPORARY ON DATABASE postgres TO python_script; -- Tablas temporales de la carga masiva (COPY)
 
 GRANT USAGE ON SCHEMA public TO web_reader;
 
@@ -24,3 +25,5 @@ GRANT SELECT ON TABLE pollutant_types TO web_reader;
 GRANT SELECT ON TABLE measurement_sessions TO web_reader;
 GRANT SELECT ON TABLE signal_measurements TO web_reader;
 GRANT SELECT ON TABLE pollution_measurements TO web_reader;
+GRANT SELECT ON TABLE signal_grid_cells TO web_reader;
+GRANT SELECT ON TABLE pollution_grid_cells TO web_reader;
@@ -65,6 +65,11 @@ CREATE TABLE IF NOT EXISTS measurement_sessions (
     longitude DECIMAL(11, 8) NOT NULL,
     timestamp_recorded TIMESTAMPTZ NOT NULL,
     operator_id INTEGER NOT NULL REFERENCES operators(id),
+    -- Cuadrícula UTM de 10 m calculada por el importador (misma regla que get_precise_10m_cell)
+    utm_zone SMALLINT,
+    cell_id VARCHAR(24),
+    cell_lat DECIMAL(10, 8),
+    cell_lng DECIMAL(11, 8),
     created_at TIMESTAMPTZ DEFAULT NOW(),
     updated_at TIMESTAMPTZ DEFAULT NOW(),
     
@@ -73,6 +78,14 @@ CREATE TABLE IF NOT EXISTS measurement_sessions (
     )
 );
 
+-- Instalaciones anteriores: columnas de cuadrícula. Las vistas del mapa solo leen los
+-- agregados por celda: tras actualizar, ejecutar una vez csvToPostgres.py --backfill-celdas
+-- (o SELECT backfill_grid_cells()) para que las sesiones anteriores aparezcan en el mapa
+ALTER TABLE measurement_sessions ADD COLUMN IF NOT EXISTS utm_zone SMALLINT;
+ALTER TABLE measurement_sessions ADD COLUMN IF NOT EXISTS cell_id VARCHAR(24);
+ALTER TABLE measurement_sessions ADD COLUMN IF NOT EXISTS cell_lat DECIMAL(10, 8);
+ALTER TABLE measurement_sessions ADD COLUMN IF NOT EXISTS cell_lng DECIMAL(11, 8);
+
 -- Mediciones de señal
 CREATE TABLE IF NOT EXISTS signal_measurements (
     id BIGSERIAL PRIMARY KEY,
@@ -103,6 +116,48 @@ CREATE TABLE IF NOT EXISTS pollution_measurements (
     UNIQUE(session_id, pollutant_type_id)
 );
 
+-- Agregados de señal por celda de 10 m, operador y tipo de señal.
+-- Se guardan suma y suma de cuadrados para derivar media y desviación típica
+-- sin recorrer las mediciones (ver refresh_grid_cells)
+CREATE TABLE IF NOT EXISTS signal_grid_cells (
+    cell_id VARCHAR(24) NOT NULL,
+    operator_id INTEGER NOT NULL REFERENCES operators(id),
+    signal_type_id INTEGER NOT NULL REFERENCES signal_types(id),
+    utm_zone SMALLINT NOT NULL,
+    cell_lat DECIMAL(10, 8) NOT NULL,
+    cell_lng DECIMAL(11, 8) NOT NULL,
+    measurement_count INTEGER NOT NULL,
+    strength_sum BIGINT NOT NULL,
+    strength_sumsq BIGINT NOT NULL,
+    min_strength INTEGER NOT NULL,
+    max_strength INTEGER NOT NULL,
+    first_measurement TIMESTAMPTZ NOT NULL,
+    last_measurement TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    
+    PRIMARY KEY (cell_id, operator_id, signal_type_id)
+);
+
+-- Agregados diarios de contaminación por celda de 10 m y contaminante
+CREATE TABLE IF NOT EXISTS pollution_grid_cells (
+    cell_id VARCHAR(24) NOT NULL,
+    pollutant_type_id INTEGER NOT NULL REFERENCES pollutant_types(id),
+    measurement_date DATE NOT NULL,
+    utm_zone SMALLINT NOT NULL,
+    cell_lat DECIMAL(10, 8) NOT NULL,
+    cell_lng DECIMAL(11, 8) NOT NULL,
+    measurement_count INTEGER NOT NULL,
+    concentration_sum DECIMAL NOT NULL,
+    concentration_sumsq DECIMAL NOT NULL,
+    min_concentration DECIMAL(10,4) NOT NULL,
+    max_concentration DECIMAL(10,4) NOT NULL,
+    first_measurement TIMESTAMPTZ NOT NULL,
+    last_measurement TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    
+    PRIMARY KEY (cell_id, pollutant_type_id, measurement_date)
+);
+
 -- Tabla de provincias (si no existe)
 CREATE TABLE IF NOT EXISTS provincias_cyl (
     id SERIAL PRIMARY KEY,
@@ -111,6 +166,12 @@ CREATE TABLE IF NOT EXISTS provincias_cyl (
     geometry GEOMETRY(MULTIPOLYGON, 4326)
 );
 
+-- Provincia de cada sesión y de cada celda agregada, asignada por el importador
+-- con un índice espacial en memoria (ver --backfill-provincias para filas anteriores)
+ALTER TABLE measurement_sessions ADD COLUMN IF NOT EXISTS provincia_id INTEGER REFERENCES provincias_cyl(id);
+ALTER TABLE signal_grid_cells ADD COLUMN IF NOT EXISTS provincia_id INTEGER REFERENCES provincias_cyl(id);
+ALTER TABLE pollution_grid_cells ADD COLUMN IF NOT EXISTS provincia_id INTEGER REFERENCES provincias_cyl(id);
+
 -- ********************************
 -- CARGA DE DATOS E DICCIONARIOS
 -- ********************************
@@ -6,6 +6,8 @@
 CREATE INDEX IF NOT EXISTS idx_sessions_location ON measurement_sessions USING GIST(location);
 CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON measurement_sessions (timestamp_recorded DESC);
 CREATE INDEX IF NOT EXISTS idx_sessions_operator ON measurement_sessions (operator_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_cell ON measurement_sessions (cell_id);
+CREATE INDEX IF NOT EXISTS idx_sessions_provincia ON measurement_sessions (provincia_id);
 
 -- Índice espacio-temporal combinado (el más importante)
 CREATE INDEX IF NOT EXISTS idx_sessions_spatiotemporal 
@@ -25,3 +27,8 @@ CREATE INDEX IF NOT EXISTS idx_pollution_quality ON pollution_measurements(quali
 
 -- Índices para consultas frecuentes por fecha
 CREATE INDEX IF NOT EXISTS idx_sessions_date ON measurement_sessions (DATE(timestamp_recorded));
+
+-- Índices de los agregados por celda (filtro por fecha y bounding box de la API)
+CREATE INDEX IF NOT EXISTS idx_pollution_cells_date ON pollution_grid_cells (measurement_date DESC);
+CREATE INDEX IF NOT EXISTS idx_signal_cells_bbox ON signal_grid_cells (cell_lat, cell_lng);
+CREATE INDEX IF NOT EXISTS idx_pollution_cells_bbox ON pollution_grid_cells (cell_lat, cell_lng);
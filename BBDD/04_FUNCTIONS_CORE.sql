@@ -89,3 +89,105 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
+-- Recalcula los agregados de las celdas indicadas a partir de sus mediciones.
+-- El importador la llama con las celdas tocadas en cada bloque: el coste es
+-- proporcional a esas celdas y no al histórico completo.
+CREATE OR REPLACE FUNCTION refresh_grid_cells(p_cell_ids TEXT[])
+RETURNS INTEGER AS $$
+DECLARE
+    refreshed INTEGER;
+BEGIN
+    DELETE FROM signal_grid_cells WHERE cell_id = ANY(p_cell_ids);
+    DELETE FROM pollution_grid_cells WHERE cell_id = ANY(p_cell_ids);
+    
+    INSERT INTO signal_grid_cells
+    (cell_id, operator_id, signal_type_id, utm_zone, cell_lat, cell_lng, provincia_id,
+     measurement_count, strength_sum, strength_sumsq, min_strength, max_strength,
+     first_measurement, last_measurement, updated_at)
+    SELECT 
+        ms.cell_id, ms.operator_id, sm.signal_type_id,
+        MIN(ms.utm_zone), MIN(ms.cell_lat), MIN(ms.cell_lng), MIN(ms.provincia_id),
+        COUNT(*),
+        SUM(sm.signal_strength_dbm),
+        SUM(sm.signal_strength_dbm::bigint * sm.signal_strength_dbm),
+        MIN(sm.signal_strength_dbm),
+        MAX(sm.signal_strength_dbm),
+        MIN(ms.timestamp_recorded),
+        MAX(ms.timestamp_recorded),
+        NOW()
+    FROM measurement_sessions ms
+    JOIN signal_measurements sm ON ms.id = sm.session_id
+    WHERE ms.cell_id = ANY(p_cell_ids)
+        AND sm.signal_strength_dbm IS NOT NULL
+        AND sm.signal_strength_dbm BETWEEN -140 AND -30
+        AND sm.quality_flag = 'valid'
+    GROUP BY ms.cell_id, ms.operator_id, sm.signal_type_id;
+    GET DIAGNOSTICS refreshed = ROW_COUNT;
+    
+    INSERT INTO pollution_grid_cells
+    (cell_id, pollutant_type_id, measurement_date, utm_zone, cell_lat, cell_lng, provincia_id,
+     measurement_count, concentration_sum, concentration_sumsq, min_concentration, max_concentration,
+     first_measurement, last_measurement, updated_at)
+    SELECT 
+        ms.cell_id, pm.pollutant_type_id, DATE(ms.timestamp_recorded),
+        MIN(ms.utm_zone), MIN(ms.cell_lat), MIN(ms.cell_lng), MIN(ms.provincia_id),
+        COUNT(*),
+        SUM(pm.concentration),
+        SUM(pm.concentration * pm.concentration),
+        MIN(pm.concentration),
+        MAX(pm.concentration),
+        MIN(ms.timestamp_recorded),
+        MAX(ms.timestamp_recorded),
+        NOW()
+    FROM measurement_sessions ms
+    JOIN pollution_measurements pm ON ms.id = pm.session_id
+    WHERE ms.cell_id = ANY(p_cell_ids)
+        AND pm.concentration IS NOT NULL
+        AND pm.concentration > 0
+        AND pm.concentration < 9999
+        AND pm.quality_flag = 'valid'
+    GROUP BY ms.cell_id, pm.pollutant_type_id, DATE(ms.timestamp_recorded);
+    
+    RETURN refreshed;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
+
+-- Migración: calcula la celda de las sesiones anteriores al cálculo en el
+-- importador (misma regla de zonas que get_precise_10m_cell) y rellena los agregados.
+-- La ejecuta csvToPostgres.py --backfill-celdas; se puede relanzar sin efectos
+CREATE OR REPLACE FUNCTION backfill_grid_cells()
+RETURNS INTEGER AS $$
+DECLARE
+    updated_sessions INTEGER;
+BEGIN
+    WITH snapped AS (
+        SELECT id, utm_zone,
+               ST_SnapToGrid(ST_Transform(location::geometry, 32600 + utm_zone), 10.0) as utm_point
+        FROM (
+            SELECT id, location,
+                   CASE 
+                       WHEN longitude < -12 THEN 28
+                       WHEN longitude < -6 THEN 29
+                       WHEN longitude < 0 THEN 30
+                       ELSE 31
+                   END as utm_zone
+            FROM measurement_sessions
+            WHERE cell_id IS NULL
+        ) pending
+    )
+    UPDATE measurement_sessions ms SET
+        utm_zone = s.utm_zone,
+        cell_id = s.utm_zone || ':' || ST_X(s.utm_point)::bigint || ':' || ST_Y(s.utm_point)::bigint,
+        cell_lat = ROUND(ST_Y(ST_Transform(s.utm_point, 4326))::numeric, 8),
+        cell_lng = ROUND(ST_X(ST_Transform(s.utm_point, 4326))::numeric, 8)
+    FROM snapped s
+    WHERE ms.id = s.id;
+    GET DIAGNOSTICS updated_sessions = ROW_COUNT;
+    
+    PERFORM refresh_grid_cells(ARRAY(
+        SELECT DISTINCT cell_id FROM measurement_sessions WHERE cell_id IS NOT NULL
+    ));
+    
+    RETURN updated_sessions;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER;
@@ -2,17 +2,20 @@
 -- 06_VIEWS.sql - VISTAS PRINCIPALES
 -- =====================================================
 
--- Vista optimizada: Datos de señal por cuadrículas precisas
+-- Vista optimizada: Datos de señal por cuadrículas precisas.
+-- Lee los agregados por celda que mantiene el importador (signal_grid_cells):
+-- la celda UTM de 10 m se calcula al importar, no en cada consulta.
+-- Se recrea porque cell_lat/cell_lng pasan de double precision a DECIMAL
+DROP VIEW IF EXISTS vista_signal_grid_10m;
 CREATE OR REPLACE VIEW vista_signal_grid_10m AS
 SELECT 
     -- Identificadores únicos
-    md5(ST_X(cell_center::geometry)::text || '|' || ST_Y(cell_center::geometry)::text || '|' || 
-        operator_code || '|' || signal_type_code) as cell_id,
+    md5(grid_cell_id || '|' || operator_code || '|' || signal_type_code) as cell_id,
     
     -- Geometría de la celda (centro)
     cell_center,
-    ST_X(cell_center::geometry) as cell_lng,
-    ST_Y(cell_center::geometry) as cell_lat,
+    cell_lng,
+    cell_lat,
     
     -- Datos del operador y señal
     operator_code,
@@ -49,8 +52,7 @@ SELECT
         'type', 'Feature',
         'geometry', ST_AsGeoJSON(cell_center::geometry)::jsonb,
         'properties', jsonb_build_object(
-            'id', md5(ST_X(cell_center::geometry)::text || '|' || ST_Y(cell_center::geometry)::text || '|' || 
-                     operator_code || '|' || signal_type_code),
+            'id', md5(grid_cell_id || '|' || operator_code || '|' || signal_type_code),
             'operator_code', operator_code,
             'operator_name', operator_name,
             'signal_type', signal_type_code,
@@ -72,51 +74,50 @@ SELECT
     ) as geojson_feature
 FROM (
     SELECT 
-        get_precise_10m_cell(ms.location) as cell_center,
+        c.cell_id as grid_cell_id,
+        ST_SetSRID(ST_MakePoint(c.cell_lng, c.cell_lat), 4326)::geography as cell_center,
+        c.cell_lng,
+        c.cell_lat,
         o.name as operator_code,
         COALESCE(o.display_name, o.name) as operator_name,
         st.code as signal_type_code,
         COALESCE(st.display_name, st.code) as signal_type_name,
         
-        ROUND(AVG(sm.signal_strength_dbm)::numeric, 2) as avg_signal_strength,
-        MIN(sm.signal_strength_dbm) as min_signal_strength,
-        MAX(sm.signal_strength_dbm) as max_signal_strength,
-        COUNT(*) as measurement_count,
-        ROUND(STDDEV_POP(sm.signal_strength_dbm)::numeric, 2) as signal_stddev,
+        -- Estadísticas derivadas de conteo, suma y suma de cuadrados
+        ROUND(c.strength_sum::numeric / c.measurement_count, 2) as avg_signal_strength,
+        c.min_strength as min_signal_strength,
+        c.max_strength as max_signal_strength,
+        c.measurement_count,
+        ROUND(SQRT(GREATEST(c.strength_sumsq::numeric / c.measurement_count
+                            - (c.strength_sum::numeric / c.measurement_count) ^ 2, 0)), 2) as signal_stddev,
         
-        MIN(ms.timestamp_recorded) as first_measurement,
-        MAX(ms.timestamp_recorded) as last_measurement,
+        c.first_measurement,
+        c.last_measurement,
         
         COALESCE(p.provincia, 'Sin Provincia') as provincia_nombre,
         p.cod_ine_prov as provincia_codigo
         
-    FROM measurement_sessions ms
-    JOIN signal_measurements sm ON ms.id = sm.session_id
-    JOIN operators o ON ms.operator_id = o.id
-    JOIN signal_types st ON sm.signal_type_id = st.id
-    LEFT JOIN provincias_cyl p ON ST_Within(ms.location::geometry, p.geometry)
+    FROM signal_grid_cells c
+    JOIN operators o ON c.operator_id = o.id
+    JOIN signal_types st ON c.signal_type_id = st.id
+    LEFT JOIN provincias_cyl p ON p.id = c.provincia_id
     WHERE 
-        sm.signal_strength_dbm IS NOT NULL
-        AND sm.signal_strength_dbm BETWEEN -140 AND -30
-        AND sm.quality_flag = 'valid'
-        AND (o.is_active IS NULL OR o.is_active = true)
+        (o.is_active IS NULL OR o.is_active = true)
         AND (st.is_active IS NULL OR st.is_active = true)
-    GROUP BY 
-        cell_center, o.name, o.display_name, st.code, st.display_name,
-        p.provincia, p.cod_ine_prov
 ) aggregated;
 
--- Vista optimizada: Datos de contaminación por cuadrículas precisas (últimos 30 días)
+-- Vista optimizada: Datos de contaminación por cuadrículas precisas (últimos 30 días).
+-- Lee los agregados diarios por celda que mantiene el importador (pollution_grid_cells)
+DROP VIEW IF EXISTS vista_pollution_grid_10m;
 CREATE OR REPLACE VIEW vista_pollution_grid_10m AS
 SELECT 
     -- Identificadores únicos
-    md5(ST_X(cell_center::geometry)::text || '|' || ST_Y(cell_center::geometry)::text || '|' || 
-        pollutant_code || '|' || measurement_date::text) as cell_id,
+    md5(grid_cell_id || '|' || pollutant_code || '|' || measurement_date::text) as cell_id,
     
     -- Geometría de la celda
     cell_center,
-    ST_X(cell_center::geometry) as cell_lng,
-    ST_Y(cell_center::geometry) as cell_lat,
+    cell_lng,
+    cell_lat,
     
     -- Datos del contaminante
     pollutant_code,
@@ -145,8 +146,7 @@ SELECT
         'type', 'Feature',
         'geometry', ST_AsGeoJSON(cell_center::geometry)::jsonb,
         'properties', jsonb_build_object(
-            'id', md5(ST_X(cell_center::geometry)::text || '|' || ST_Y(cell_center::geometry)::text || '|' || 
-                     pollutant_code || '|' || measurement_date::text),
+            'id', md5(grid_cell_id || '|' || pollutant_code || '|' || measurement_date::text),
             'pollutant_code', pollutant_code,
             'pollutant_name', pollutant_name,
             'pollutant_unit', pollutant_unit,
@@ -162,36 +162,33 @@ SELECT
     ) as geojson_feature
 FROM (
     SELECT 
-        get_precise_10m_cell(ms.location) as cell_center,
+        c.cell_id as grid_cell_id,
+        ST_SetSRID(ST_MakePoint(c.cell_lng, c.cell_lat), 4326)::geography as cell_center,
+        c.cell_lng,
+        c.cell_lat,
         pt.code as pollutant_code,
         COALESCE(pt.display_name, pt.code) as pollutant_name,
         pt.unit as pollutant_unit,
         
-        ROUND(AVG(pm.concentration)::numeric, 4) as avg_concentration,
-        MIN(pm.concentration) as min_concentration,
-        MAX(pm.concentration) as max_concentration,
-        COUNT(*) as measurement_count,
-        ROUND(STDDEV_POP(pm.concentration)::numeric, 4) as concentration_stddev,
+        -- Estadísticas derivadas de conteo, suma y suma de cuadrados
+        ROUND(c.concentration_sum / c.measurement_count, 4) as avg_concentration,
+        c.min_concentration,
+        c.max_concentration,
+        c.measurement_count,
+        ROUND(SQRT(GREATEST(c.concentration_sumsq / c.measurement_count
+                            - (c.concentration_sum / c.measurement_count) ^ 2, 0)), 4) as concentration_stddev,
         
-        DATE(ms.timestamp_recorded) as measurement_date,
-        MIN(ms.timestamp_recorded) as first_measurement,
-        MAX(ms.timestamp_recorded) as last_measurement,
+        c.measurement_date,
+        c.first_measurement,
+        c.last_measurement,
         
         COALESCE(p.provincia, 'Sin Provincia CyL') as provincia_nombre,
         p.cod_ine_prov as provincia_codigo
         
-    FROM measurement_sessions ms
-    JOIN pollution_measurements pm ON ms.id = pm.session_id
-    JOIN pollutant_types pt ON pm.pollutant_type_id = pt.id
-    LEFT JOIN provincias_cyl p ON ST_Within(ms.location::geometry, p.geometry)
+    FROM pollution_grid_cells c
+    JOIN pollutant_types pt ON c.pollutant_type_id = pt.id
+    LEFT JOIN provincias_cyl p ON p.id = c.provincia_id
     WHERE 
-        pm.concentration IS NOT NULL
-        AND pm.concentration > 0
-        AND pm.concentration < 9999
-        AND pm.quality_flag = 'valid'
-        AND ms.timestamp_recorded >= CURRENT_DATE - INTERVAL '30 days'  -- Solo últimos 30 días
+        c.measurement_date >= CURRENT_DATE - INTERVAL '30 days'  -- Solo últimos 30 días
         AND (pt.is_active IS NULL OR pt.is_active = true)
-    GROUP BY 
-        cell_center, pt.code, pt.display_name, pt.unit,
-        DATE(ms.timestamp_recorded), p.provincia, p.cod_ine_prov
 ) aggregated;
\ No newline at end of file
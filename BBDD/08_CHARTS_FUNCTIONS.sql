@@ -51,7 +51,7 @@ BEGIN
             JOIN signal_measurements sm ON ms.id = sm.session_id
             JOIN signal_types st ON sm.signal_type_id = st.id
             JOIN operators o ON ms.operator_id = o.id
-            LEFT JOIN provincias_cyl p ON ST_Within(ms.location::geometry, p.geometry)
+            LEFT JOIN provincias_cyl p ON p.id = ms.provincia_id  -- asignada al importar
             WHERE 
                 UPPER(st.code) = UPPER(p_signal_type)
                 AND sm.quality_flag = 'valid'
@@ -127,7 +127,7 @@ BEGIN
             FROM measurement_sessions ms
             JOIN pollution_measurements pm ON ms.id = pm.session_id
             JOIN pollutant_types pt ON pm.pollutant_type_id = pt.id
-            LEFT JOIN provincias_cyl p ON ST_Within(ms.location::geometry, p.geometry)
+            LEFT JOIN provincias_cyl p ON p.id = ms.provincia_id  -- asignada al importar
             WHERE 
                 UPPER(pt.code) = UPPER(p_pollutant_code)
                 AND pm.quality_flag = 'valid'
@@ -18,6 +18,8 @@ ALTER TABLE measurement_sessions ENABLE ROW LEVEL SECURITY;
 ALTER TABLE signal_measurements ENABLE ROW LEVEL SECURITY;
 ALTER TABLE pollution_measurements ENABLE ROW LEVEL SECURITY;
 ALTER TABLE provincias_cyl ENABLE ROW LEVEL SECURITY;
+ALTER TABLE signal_grid_cells ENABLE ROW LEVEL SECURITY;
+ALTER TABLE pollution_grid_cells ENABLE ROW LEVEL SECURITY;
 
 --Permisos para rol de python
 CREATE POLICY "Allow script inserts" 
@@ -87,4 +89,15 @@ USING (true);
 CREATE POLICY select_all_for_roles ON signal_types
 FOR SELECT
 TO web_reader, python_script
+USING (true);
+
+-- Agregados por celda: solo lectura (los escribe refresh_grid_cells, SECURITY DEFINER)
+CREATE POLICY select_all_for_roles ON signal_grid_cells
+FOR SELECT
+TO web_reader, python_script
+USING (true);
+
+CREATE POLICY select_all_for_roles ON pollution_grid_cells
+FOR SELECT
+TO web_reader, python_script
 USING (true);
\ No newline at end of file
@@ -113,6 +113,78 @@ function validate_parameters(string $category, array $params): array {
     return $clean;
 }
 
+// ===============================================
+// Instantáneas GeoJSON generadas por el importador
+// ===============================================
+const SNAPSHOT_DIR = __DIR__ . '/../data/geojson';
+const SNAPSHOT_MAX_AGE = 86400; // segundos sin una importación que las confirme; después se consulta la BBDD
+
+// Clave de capa en el manifiesto ("4g", "4g/movistar", "contaminación aérea/co")
+// o null si la petición lleva filtros que las instantáneas no cubren
+function snapshot_key(string $category, array $params): ?string {
+    foreach (['provinces', 'bbox', 'date_from', 'date_to', 'days_back'] as $filter) {
+        if (!empty($params[$filter])) return null;
+    }
+    $layers = array_values($params['operators'] ?? $params['pollutants'] ?? []);
+    if (count($layers) > 1) return null;
+
+    $key = mb_strtolower(trim($category));
+    return count($layers) === 1 ? $key . '/' . mb_strtolower(trim($layers[0])) : $key;
+}
+
+// Misma respuesta que la consulta a la BBDD: metadatos de la API y números como números
+function geojson_response(array $geojson, string $category): string {
+    if (isset($geojson['metadata'])) {
+        $geojson['metadata']['api_version'] = '1.0';
+        $geojson['metadata']['request_category'] = $category;
+        $geojson['metadata']['response_time'] = date('Y-m-d H:i:s');
+    }
+    return json_encode($geojson, JSON_UNESCAPED_UNICODE | JSON_NUMERIC_CHECK);
+}
+
+function serve_snapshot(string $category, array $params): bool {
+    $key = snapshot_key($category, $params);
+    if ($key === null) return false;
+
+    $manifest = json_decode((string)@file_get_contents(SNAPSHOT_DIR . '/manifest.json'), true);
+    if (!is_array($manifest) || !isset($manifest['layers'][$key])) return false;
+    // checked_at se renueva en cada importación correcta, aunque no cambien los datos
+    $checked_at = $manifest['checked_at'] ?? $manifest['generated_at'] ?? '';
+    if (time() - strtotime($checked_at) > SNAPSHOT_MAX_AGE) return false;
+
+    $layer = $manifest['layers'][$key];
+    $compressed = @file_get_contents(SNAPSHOT_DIR . '/' . $layer['encodings']['gzip']);
+    if ($compressed === false) return false;
+    $geojson = json_decode((string)gzdecode($compressed), true);
+    if (!is_array($geojson) || !isset($geojson['type'])) return false;
+
+    // El cuerpo lleva response_time, así que el ETag de la capa es débil
+    $etag = 'W/' . $layer['etag'];
+    header('ETag: ' . $etag);
+    header('Cache-Control: no-cache');
+    header('Vary: Accept-Encoding');
+    $if_none_match = trim($_SERVER['HTTP_IF_NONE_MATCH'] ?? '');
+    if ($if_none_match === $etag || $if_none_match === $layer['etag']) {
+        http_response_code(304);
+        return true;
+    }
+
+    // La instantánea se guarda sin metadata.generated_at (ETag estable): es la fecha de generación
+    if (isset($geojson['metadata'])) {
+        $geojson['metadata']['generated_at'] = $manifest['generated_at'];
+    }
+    $body = geojson_response($geojson, $category);
+
+    http_response_code(200);
+    if (stripos($_SERVER['HTTP_ACCEPT_ENCODING'] ?? '', 'gzip') !== false) {
+        header('Content-Encoding: gzip');
+        echo gzencode($body);
+    } else {
+        echo $body;
+    }
+    return true;
+}
+
 // ===============================================
 // Logging (debug)
 // ===============================================
@@ -143,6 +215,11 @@ try {
 
     log_request($category, $validated);
 
+    // Capas sin filtros adicionales: instantánea precalculada, sin consultar la BBDD
+    if (serve_snapshot($category, $validated)) {
+        exit;
+    }
+
     error_log("Calling Supabase with category: " . $category);
     error_log("Params: " . json_encode($validated));
 
@@ -152,15 +229,8 @@ try {
         throw new RuntimeException('Invalid GeoJSON response');
     }
 
-    // Metadatos extra opcionales
-    if (isset($geojson['metadata'])) {
-        $geojson['metadata']['api_version'] = '1.0';
-        $geojson['metadata']['request_category'] = $category;
-        $geojson['metadata']['response_time'] = date('Y-m-d H:i:s');
-    }
-
     http_response_code(200);
-    echo json_encode($geojson, JSON_UNESCAPED_UNICODE | JSON_NUMERIC_CHECK);
+    echo geojson_response($geojson, $category);
 
 } catch (InvalidArgumentException $e) {
     http_response_code(400);
@@ -0,0 +1,561 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Generador de hojas sintéticas y banco de pruebas de rendimiento del importador.
+
+Genera CSV con la misma estructura que la hoja de Google Sheets del formulario
+(incluidas las cabeceras con mojibake "ConcentraciÃ³n") y ejecuta sobre ellos
+la misma tubería que main() (Importer.run), contra una base de datos
+PostgreSQL/PostGIS local cargada desde BBDD/*.sql, contra una base de datos
+SQLite temporal (backend embebido) o contra una conexión simulada en memoria. Informa de filas por segundo y pico de memoria por fase.
+
+Uso:
+    python benchmarkImport.py --sizes 1000,10000,100000
+    python benchmarkImport.py --backend sqlite --sizes 10000
+    python benchmarkImport.py --backend postgres --dsn postgresql://... --init-schema --reset
+
+Autor: Sandra Torrero Casado
+Proyecto: TFG
+"""
+import os
+import csv
+import json
+import time
+import random
+import logging
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import psycopg2
+import psycopg2.extensions
+
+import csvToPostgres
+
+# =========================================================================
+# CONFIGURACIÓN DEL BANCO DE PRUEBAS
+# =========================================================================
+
+# Tamaños de hoja por defecto (filas)
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# Directorio con los scripts SQL del proyecto
+BBDD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "BBDD")
+
+# Scripts cargados con --init-schema. Se omiten 00_ROLES.sql y 10_SECURITY_RLS.sql:
+# el banco de pruebas se conecta como administrador y no necesita los roles
+SCHEMA_SCRIPTS = [
+    "01_SETUP.sql", "02_TABLES.sql", "03_INDEXES.sql", "04_FUNCTIONS_CORE.sql",
+    "05_TRIGGERS.sql", "06_VIEWS.sql", "07_API_FUNCTIONS.sql", "08_CHARTS_FUNCTIONS.sql",
+    "09_VALIDATION.sql",
+]
+
+# Cabeceras de la hoja del formulario (las columnas de concentración llegan con mojibake)
+SHEET_HEADERS = [
+    "Marca temporal", "OPERADOR", "COORDENADAS_LIMPIAS", "Intensidad 4G", "Intensidad 5G",
+    "ConcentraciÃ³n PM 2.5", "ConcentraciÃ³n PM 10", "ConcentraciÃ³n CO", "ConcentraciÃ³n CO2",
+    "Observaciones",
+]
+
+# Operadores tal y como los escriben los participantes (mayúsculas y espacios variables)
+KNOWN_OPERATORS = ["Movistar", "movistar", "VODAFONE", "Vodafone", " Orange ", "orange",
+                   "Yoigo", "O2", "Pepephone", "Digi", "Lowi", "Otro"]
+UNKNOWN_OPERATORS = ["Telefonía Rural", "Desconocido", "Simyo", "N/A"]
+
+# Zonas de muestreo (lat_min, lat_max, lon_min, lon_max) con su peso relativo
+SPAIN_REGIONS = [
+    ((37.6, 42.4, -6.8, -1.2), 0.86),   # Península (interior)
+    ((39.3, 39.9, 2.5, 3.3), 0.05),     # Mallorca
+    ((28.0, 28.5, -16.8, -16.2), 0.05), # Tenerife
+    ((27.8, 28.1, -15.7, -15.4), 0.04), # Gran Canaria
+]
+OUTSIDE_POINTS = [
+    (38.7223, -9.1393),   # Lisboa
+    (48.8566, 2.3522),    # París
+    (34.0209, -6.8416),   # Rabat
+    (40.0000, -15.0000),  # Atlántico
+    (42.5063, 1.5218),    # Andorra la Vella
+]
+INVALID_TIMESTAMPS = ["", "32/13/2025 25:61:00", "ayer", "2025-02-30 10:00"]
+
+# Contorno aproximado de España (lon, lat) para validar sin descargar la geometría del IGN
+APPROXIMATE_SPAIN_WKT = (
+    "MULTIPOLYGON((("
+    "-9.3 43.0, -8.0 43.8, -1.8 43.4, 3.3 42.4, 0.8 40.7, -0.3 39.5, 0.2 38.7, -1.6 37.2, "
+    "-5.6 36.0, -7.4 37.2, -7.0 38.0, -7.3 39.5, -6.9 41.9, -8.9 41.9, -9.3 43.0)), "
+    "((1.1 38.6, 4.4 38.6, 4.4 40.1, 1.1 40.1, 1.1 38.6)), "
+    "((-18.2 27.6, -13.4 27.6, -13.4 29.4, -18.2 29.4, -18.2 27.6)))"
+)
+
+logger = logging.getLogger(__name__)
+
+# =========================================================================
+# GENERADOR DE HOJAS SINTÉTICAS
+# =========================================================================
+
+def _random_coordinates(rnd: random.Random, outside_ratio: float) -> Tuple[float, float]:
+    """
+    Genera unas coordenadas dentro de España o, con probabilidad outside_ratio, fuera.
+
+    Args:
+        rnd (random.Random): Generador aleatorio
+        outside_ratio (float): Proporción de puntos fuera de España
+
+    Returns:
+        Tuple[float, float]: (latitud, longitud)
+    """
+    if rnd.random() < outside_ratio:
+        lat, lon = rnd.choice(OUTSIDE_POINTS)
+        return round(lat + rnd.uniform(-0.05, 0.05), 6), round(lon + rnd.uniform(-0.05, 0.05), 6)
+    regions, weights = zip(*SPAIN_REGIONS)
+    lat_min, lat_max, lon_min, lon_max = rnd.choices(regions, weights)[0]
+    return round(rnd.uniform(lat_min, lat_max), 6), round(rnd.uniform(lon_min, lon_max), 6)
+
+def _optional(rnd: random.Random, probability: float, value: str) -> str:
+    return value if rnd.random() < probability else ""
+
+def generate_sheet_csv(path: str, rows: int, seed: int = 1, bad_timestamp_ratio: float = 0.02,
+                       unknown_operator_ratio: float = 0.03, duplicate_ratio: float = 0.05,
+                       outside_ratio: float = 0.02, encoding: str = "utf-8") -> int:
+    """
+    Escribe un CSV con la estructura de la hoja del formulario.
+
+    Las filas llevan la marca temporal del formulario (dd/mm/aaaa hh:mm:ss),
+    operadores con mayúsculas y espacios variables, coordenadas repartidas por
+    la península y las islas, intensidades 4G/5G y concentraciones con huecos.
+    Una parte de las filas se repite: a veces de forma exacta y a veces como
+    nueva medición de la misma sesión (mismo punto, segundos después).
+
+    Args:
+        path (str): Ruta del CSV a generar
+        rows (int): Número de filas
+        seed (int): Semilla del generador aleatorio
+        bad_timestamp_ratio (float): Proporción de marcas temporales inválidas
+        unknown_operator_ratio (float): Proporción de operadores que no existen en la base de datos
+        duplicate_ratio (float): Proporción de filas duplicadas
+        outside_ratio (float): Proporción de coordenadas fuera de España
+        encoding (str): Codificación del fichero ("utf-8" o "latin1")
+
+    Returns:
+        int: Filas escritas
+    """
+    rnd = random.Random(seed)
+    timestamp = datetime(2025, 3, 1, 8, 0, 0)
+    previous: Optional[List[str]] = None
+    previous_timestamp: Optional[datetime] = None
+
+    with open(path, "w", newline="", encoding=encoding) as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(SHEET_HEADERS)
+        for _ in range(rows):
+            if previous is not None and rnd.random() < duplicate_ratio:
+                row = list(previous)
+                if previous_timestamp is not None and rnd.random() < 0.5:
+                    # Misma sesión registrada de nuevo unos segundos después
+                    repeated = previous_timestamp + timedelta(seconds=rnd.randint(1, 30))
+                    row[0] = repeated.strftime("%d/%m/%Y %H:%M:%S")
+                    row[3] = str(rnd.randint(-120, -60))
+                writer.writerow(row)
+                continue
+
+            timestamp += timedelta(seconds=rnd.randint(30, 900))
+            if rnd.random() < bad_timestamp_ratio:
+                marca, previous_timestamp = rnd.choice(INVALID_TIMESTAMPS), None
+            else:
+                marca, previous_timestamp = timestamp.strftime("%d/%m/%Y %H:%M:%S"), timestamp
+
+            operator = rnd.choice(UNKNOWN_OPERATORS if rnd.random() < unknown_operator_ratio else KNOWN_OPERATORS)
+            lat, lon = _random_coordinates(rnd, outside_ratio)
+
+            row = [
+                marca,
+                operator,
+                f"{lat}, {lon}",
+                _optional(rnd, 0.9, str(rnd.randint(-125, -55))),
+                _optional(rnd, 0.35, str(rnd.randint(-120, -70))),
+                _optional(rnd, 0.6, f"{rnd.uniform(2, 60):.1f}"),
+                _optional(rnd, 0.6, f"{rnd.uniform(5, 90):.1f}"),
+                _optional(rnd, 0.3, f"{rnd.uniform(0.1, 9):.2f}"),
+                _optional(rnd, 0.4, str(rnd.randint(380, 1800))),
+                _optional(rnd, 0.05, rnd.choice(["Sin cobertura en el valle", "Cerca de la carretera", "Día de niebla"])),
+            ]
+            # Filas sin ninguna medición (se descartan al validar)
+            if rnd.random() < 0.02:
+                row[3:9] = [""] * 6
+            writer.writerow(row)
+            previous = row
+    return rows
+
+# =========================================================================
+# CONEXIÓN SIMULADA EN MEMORIA
+# =========================================================================
+
+# Datos de referencia sembrados por BBDD/02_TABLES.sql
+FAKE_REFERENCE_DATA = {
+    "operators": {name: position for position, name in enumerate(
+        ["Movistar", "Vodafone", "Orange", "Yoigo", "O2", "Pepephone", "Digi", "Lowi", "Otro"], start=1)},
+    "signal_types": {"4G": 1, "5G": 2},
+    "pollutant_types": {"co": 1, "co2": 2, "pm25": 3, "pm10": 4},
+}
+
+class FakeDatabase:
+    """Tablas en memoria con las que responde FakeCursor."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.sessions: Dict[int, Tuple[float, float, datetime, int]] = {}
+        self.session_cells: Dict[int, str] = {}
+        self.signals: Dict[Tuple[int, int], int] = {}
+        self.pollutants: Dict[Tuple[int, int], Any] = {}
+
+class FakeCursor:
+    """
+    Cursor simulado que reconoce las consultas del modo fila a fila de
+    csvToPostgres. Cada execute cuenta como una ida y vuelta en las métricas
+    y puede simular la latencia de red configurada.
+    """
+
+    def __init__(self, database: FakeDatabase):
+        self.database = database
+        self.closed = False
+        self._result: List[tuple] = []
+
+    def execute(self, query: str, params: tuple = ()) -> None:
+        started = time.perf_counter()
+        if self.database.latency:
+            time.sleep(self.database.latency)
+        self._result = self._run(" ".join(query.split()), params)
+        csvToPostgres.get_importer().metrics.observe_query(time.perf_counter() - started)
+
+    def _run(self, query: str, params: tuple) -> List[tuple]:
+        db = self.database
+        if query.startswith(("SAVEPOINT", "RELEASE", "ROLLBACK")):
+            return []
+        if query.endswith("WHERE is_active = true"):
+            table = query.split(" FROM ")[1].split()[0]
+            return list(FAKE_REFERENCE_DATA[table].items())
+        if query.startswith("SELECT id, latitude, longitude"):
+            range_start, range_end = params
+            return [(session_id, lat, lon, timestamp, operator_id)
+                    for session_id, (lat, lon, timestamp, operator_id) in db.sessions.items()
+                    if range_start <= timestamp <= range_end]
+        if query.startswith("SELECT id FROM measurement_sessions"):
+            lat, lon, timestamp, operator_id = params
+            for session_id, (s_lat, s_lon, s_timestamp, s_operator) in db.sessions.items():
+                if (s_operator == operator_id and abs(s_lat - lat) < 1e-8 and abs(s_lon - lon) < 1e-8
+                        and abs((s_timestamp - timestamp).total_seconds()) < 60):
+                    return [(session_id,)]
+            return []
+        if query.startswith("INSERT INTO measurement_sessions"):
+            _, _, lat, lon, timestamp, operator_id = params[:6]
+            session_id = len(db.sessions) + 1
+            db.sessions[session_id] = (lat, lon, timestamp, operator_id)
+            db.session_cells[session_id] = params[7]
+            return [(session_id,)]
+        if query.startswith("INSERT INTO signal_measurements"):
+            session_id, type_id, value = params
+            db.signals[(session_id, type_id)] = value
+            return []
+        if query.startswith("INSERT INTO pollution_measurements"):
+            session_id, type_id, value = params
+            db.pollutants[(session_id, type_id)] = value
+            return []
+        if query.startswith("SELECT id, ST_AsBinary(geometry)"):
+            return []
+        if query.startswith("SELECT refresh_grid_cells"):
+            return [(len(params[0]),)]
+        raise NotImplementedError(f"Consulta no soportada por la conexión simulada: {query[:80]}")
+
+    def fetchone(self) -> Optional[tuple]:
+        return self._result[0] if self._result else None
+
+    def fetchall(self) -> List[tuple]:
+        return list(self._result)
+
+    def close(self) -> None:
+        self.closed = True
+
+class _FakeConnectionInfo:
+    transaction_status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+class FakeConnection:
+    """Conexión simulada: transacciones sin efecto y cursores sobre FakeDatabase."""
+
+    def __init__(self, database: FakeDatabase):
+        self.database = database
+        self.autocommit = True
+        self.closed = 0
+        self.info = _FakeConnectionInfo()
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self.database)
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = 1
+
+# =========================================================================
+# BASE DE DATOS LOCAL
+# =========================================================================
+
+def init_schema(dsn: str) -> None:
+    """
+    Carga en la base de datos indicada los scripts SQL del proyecto (requiere PostGIS).
+
+    Args:
+        dsn (str): Cadena de conexión de un usuario administrador
+    """
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for script in SCHEMA_SCRIPTS:
+                with open(os.path.join(BBDD_DIR, script), encoding="utf-8") as sql_file:
+                    cur.execute(sql_file.read())
+                logger.info(f"Script cargado: {script}")
+    finally:
+        conn.close()
+
+def reset_database(dsn: str) -> None:
+    """
+    Vacía las tablas de mediciones (sin tocar los catálogos de referencia).
+
+    Args:
+        dsn (str): Cadena de conexión
+    """
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("TRUNCATE measurement_sessions, signal_measurements, pollution_measurements, "
+                        "signal_grid_cells, pollution_grid_cells "
+                        "RESTART IDENTITY CASCADE")
+    finally:
+        conn.close()
+
+# =========================================================================
+# EJECUCIÓN DEL BANCO DE PRUEBAS
+# =========================================================================
+
+def configure_importer(work_dir: str, geometry_path: Optional[str]) -> None:
+    """
+    Aísla el importador del entorno real: estado incremental y métricas en un
+    directorio temporal, geometría de España desde fichero (sin red) y sin
+    instantáneas GeoJSON del mapa.
+
+    Args:
+        work_dir (str): Directorio temporal del banco de pruebas
+        geometry_path (str, optional): Geometría de España (WKB, WKT o GeoJSON);
+            por defecto el contorno aproximado APPROXIMATE_SPAIN_WKT
+    """
+    if geometry_path is None:
+        geometry_path = os.path.join(work_dir, "spain_approx.wkt")
+        with open(geometry_path, "w", encoding="utf-8") as wkt_file:
+            wkt_file.write(APPROXIMATE_SPAIN_WKT)
+    csvToPostgres.IMPORT_CACHE_DIR = work_dir
+    csvToPostgres.IMPORT_METRICS_ENABLED = False
+    csvToPostgres.SPAIN_GEOMETRY_FIXTURE = geometry_path
+    csvToPostgres.SPAIN_GEOMETRY_OFFLINE = True
+    csvToPostgres.SNAPSHOT_EXPORT_ENABLED = False
+    csvToPostgres.PARQUET_ARCHIVE_ENABLED = False
+
+def run_benchmark(rows: int, work_dir: str, backend: str = "fake", dsn: Optional[str] = None,
+                  chunk_size: int = csvToPostgres.CSV_CHUNK_SIZE, workers: int = 1,
+                  track_memory: bool = True, latency: float = 0.0, reset: bool = False,
+                  seed: int = 1, generator_options: Optional[Dict[str, Any]] = None,
+                  commit_every: int = csvToPostgres.COMMIT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    Genera una hoja de rows filas y la importa midiendo cada fase.
+
+    Args:
+        rows (int): Filas de la hoja sintética
+        work_dir (str): Directorio temporal
+        backend (str): "fake" (conexión simulada), "sqlite" (fichero temporal) o "postgres"
+        dsn (str, optional): Cadena de conexión para el backend postgres
+        chunk_size (int): Filas por bloque de lectura
+        workers (int): Hilos de escritura (solo backend postgres)
+        track_memory (bool): Medir el pico de memoria por fase con tracemalloc
+        latency (float): Latencia simulada por consulta en segundos (backend fake)
+        reset (bool): Vaciar las tablas de mediciones antes de importar (backend postgres)
+        seed (int): Semilla del generador
+        generator_options (Dict[str, Any], optional): Proporciones para generate_sheet_csv
+        commit_every (int): Filas por transacción en el modo fila a fila (0 = autocommit)
+
+    Returns:
+        Dict[str, Any]: Resultado con las fases, estadísticas y resumen de métricas
+    """
+    path = os.path.join(work_dir, f"sheet_{rows}.csv")
+    if track_memory:
+        tracemalloc.start()
+
+    # Generación de la hoja (se mide como una fase más)
+    started = time.perf_counter()
+    if track_memory:
+        tracemalloc.reset_peak()
+    generate_sheet_csv(path, rows, seed=seed, **(generator_options or {}))
+    generation = {'seconds': time.perf_counter() - started,
+                  'peak_memory_bytes': tracemalloc.get_traced_memory()[1] if track_memory else None}
+
+    if backend == "fake":
+        database = FakeDatabase(latency)
+        importer = csvToPostgres.Importer(connection_factory=lambda: FakeConnection(database),
+                                          commit_every=commit_every)
+    elif backend == "sqlite":
+        database_path = os.path.join(work_dir, f"bench_{rows}.db")
+        if os.path.exists(database_path):
+            os.remove(database_path)
+        importer = csvToPostgres.Importer(db_url=f"sqlite:///{database_path}", commit_every=commit_every)
+    else:
+        if reset:
+            reset_database(dsn)
+        importer = csvToPostgres.Importer(db_url=dsn, commit_every=commit_every)
+
+    try:
+        statistics = importer.run(full_reprocess=True, source=path, chunk_size=chunk_size, workers=workers)
+        summary = importer.metrics.summary(statistics, rows)
+    finally:
+        importer.close()
+        if track_memory:
+            tracemalloc.stop()
+        os.remove(path)
+
+    phases = {'generacion': generation}
+    for name, seconds in summary['phases_seconds'].items():
+        phases[name] = {'seconds': seconds,
+                        'peak_memory_bytes': summary['phases_peak_memory_bytes'].get(name)}
+    for phase in phases.values():
+        phase['rows_per_second'] = rows / phase['seconds'] if phase['seconds'] > 0 else None
+
+    return {
+        'rows': rows,
+        'backend': backend,
+        'duration_seconds': summary['duration_seconds'],
+        'rows_per_second': summary['rows_per_second'],
+        'db_queries': summary['db_queries']['count'],
+        'dataframe_memory_bytes': summary['dataframe_memory_bytes'],
+        'phases': phases,
+        'statistics': statistics,
+    }
+
+def print_result(result: Dict[str, Any]) -> None:
+    """
+    Muestra por consola la tabla de fases de una ejecución.
+
+    Args:
+        result (Dict[str, Any]): Resultado de run_benchmark
+    """
+    print(f"\n{result['rows']} filas · backend {result['backend']} · "
+          f"{result['duration_seconds']:.2f}s · {result['rows_per_second']:.0f} filas/s · "
+          f"{result['db_queries']} consultas · DataFrames "
+          f"{result['dataframe_memory_bytes']['total'] / 1024 / 1024:.1f} MB")
+    print(f"  {'Fase':<20}{'Segundos':>10}{'Filas/s':>14}{'Pico memoria (MB)':>20}")
+    for name, phase in result['phases'].items():
+        rows_per_second = f"{phase['rows_per_second']:.0f}" if phase['rows_per_second'] else "-"
+        memory = (f"{phase['peak_memory_bytes'] / 1024 / 1024:.1f}"
+                  if phase['peak_memory_bytes'] is not None else "-")
+        print(f"  {name:<20}{phase['seconds']:>10.3f}{rows_per_second:>14}{memory:>20}")
+    statistics = result['statistics']
+    print(f"  Procesadas: {statistics['processed']} · sesiones nuevas: {statistics['new_sessions']} · "
+          f"existentes: {statistics['existing_sessions']} · errores BD: {statistics['db_errors']}")
+
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Procesa los argumentos de línea de comandos.
+
+    Args:
+        argv (List[str], optional): Argumentos (por defecto sys.argv)
+
+    Returns:
+        argparse.Namespace: Opciones de ejecución
+    """
+    parser = argparse.ArgumentParser(description="Banco de pruebas de rendimiento del importador")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="Tamaños de hoja separados por comas")
+    parser.add_argument("--backend", choices=["fake", "sqlite", "postgres"], default="fake",
+                        help="Conexión simulada en memoria, SQLite temporal o PostgreSQL/PostGIS local")
+    parser.add_argument("--dsn", help="Cadena de conexión del backend postgres (nunca la de producción)")
+    parser.add_argument("--init-schema", action="store_true",
+                        help="Cargar BBDD/01..09 en la base de datos antes de empezar")
+    parser.add_argument("--reset", action="store_true",
+                        help="Vaciar las tablas de mediciones antes de cada tamaño")
+    parser.add_argument("--bulk", action="store_true", help="Usar la carga masiva (solo backend postgres)")
+    parser.add_argument("--workers", type=int, default=1, help="Hilos de escritura (solo backend postgres)")
+    parser.add_argument("--chunk-size", type=int, default=csvToPostgres.CSV_CHUNK_SIZE,
+                        help="Filas por bloque de lectura")
+    parser.add_argument("--commit-every", type=int, default=csvToPostgres.COMMIT_BATCH_SIZE,
+                        help="Filas por transacción en el modo fila a fila (0 = autocommit)")
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="Latencia simulada por consulta en el backend fake")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="No medir memoria (tracemalloc ralentiza la ejecución)")
+    parser.add_argument("--geometry", help="Geometría de España (WKB/WKT/GeoJSON); por defecto un contorno aproximado")
+    parser.add_argument("--seed", type=int, default=1, help="Semilla del generador")
+    parser.add_argument("--bad-timestamps", type=float, default=0.02, help="Proporción de marcas temporales inválidas")
+    parser.add_argument("--unknown-operators", type=float, default=0.03, help="Proporción de operadores desconocidos")
+    parser.add_argument("--duplicates", type=float, default=0.05, help="Proporción de filas duplicadas")
+    parser.add_argument("--outside", type=float, default=0.02, help="Proporción de coordenadas fuera de España")
+    parser.add_argument("--output", help="Guardar los resultados en un fichero JSON")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar el log del importador")
+    arguments = parser.parse_args(argv)
+
+    if arguments.backend == "postgres" and not arguments.dsn:
+        parser.error("--backend postgres requiere --dsn")
+    if arguments.backend != "postgres" and (arguments.bulk or arguments.workers > 1):
+        parser.error("--bulk y --workers solo están disponibles con --backend postgres")
+    return arguments
+
+def main(argv: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Ejecuta el banco de pruebas para cada tamaño solicitado.
+
+    Args:
+        argv (List[str], optional): Argumentos de línea de comandos
+
+    Returns:
+        List[Dict[str, Any]]: Resultados por tamaño
+    """
+    arguments = parse_arguments(argv)
+    logging.basicConfig(level=logging.INFO if arguments.verbose else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(message)s')
+    if not arguments.verbose:
+        # Los rechazos de filas inválidas son parte de la carga de trabajo, no del informe
+        logging.getLogger(csvToPostgres.__name__).setLevel(logging.CRITICAL)
+
+    csvToPostgres.BULK_LOAD_MODE = arguments.bulk
+    if arguments.init_schema:
+        init_schema(arguments.dsn)
+
+    generator_options = {
+        'bad_timestamp_ratio': arguments.bad_timestamps,
+        'unknown_operator_ratio': arguments.unknown_operators,
+        'duplicate_ratio': arguments.duplicates,
+        'outside_ratio': arguments.outside,
+    }
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="rurair_bench_") as work_dir:
+        configure_importer(work_dir, arguments.geometry)
+        for rows in (int(size) for size in arguments.sizes.split(",") if size.strip()):
+            result = run_benchmark(
+                rows, work_dir, backend=arguments.backend, dsn=arguments.dsn,
+                chunk_size=arguments.chunk_size, workers=arguments.workers,
+                track_memory=not arguments.no_memory, latency=arguments.latency_ms / 1000,
+                reset=arguments.reset, seed=arguments.seed, generator_options=generator_options,
+                commit_every=arguments.commit_every)
+            print_result(result)
+            results.append(result)
+
+    if arguments.output:
+        with open(arguments.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2, ensure_ascii=False, default=str)
+    return results
+
+if __name__ == "__main__":
+    main()
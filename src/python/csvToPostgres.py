@@ -11,17 +11,43 @@ Fecha: Julio 2025
 Proyecto: TFG
 """
 import os
+import io
+import sys
+import csv
+import codecs
+import argparse
+import json
+import time
+import random
+import signal
+import hashlib
+import gzip
+import tempfile
+import tracemalloc
+import cProfile
+import pstats
+import unicodedata
 import requests
 import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+import sqlite3
 import logging
-from datetime import datetime
+import threading
+import queue
+import functools
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+import numpy as np
 import pandas as pd
-import geopandas as gpd
-from shapely.geometry import Point, MultiPolygon, Polygon
+import shapely
+from shapely.geometry import MultiPolygon, Polygon
 from shapely.geometry.base import BaseGeometry
-from io import StringIO
+from io import BytesIO, StringIO
 from decimal import Decimal, InvalidOperation
-from typing import Dict, Tuple, Optional, Union
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Tuple, Optional, Union
 
 # =========================================================================
 # CONFIGURACIÓN DEL SISTEMA
@@ -33,32 +59,720 @@ SUPABASE_DB_URL = os.getenv("SUPABASE_DB_URL", "DATOS CONEXIÓN A SUPABASE CON R
 # URL CSV exportable desde Google Sheets (usar formato export?format=csv)
 GOOGLE_SHEET_CSV_URL = "URL GOOGLE SHEETS/export?format=csv"
 
-# Configuración de logging
-log_filename = f"import_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    handlers=[
-        logging.FileHandler(log_filename, encoding='utf-8'),  # Guarda en archivo
-        logging.StreamHandler()  # Muestra en consola
-    ]
-)
+# Lectura en streaming: filas por bloque (0 = cargar la hoja completa en memoria)
+CSV_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "10000"))
+# Bytes leídos por adelantado para detectar la codificación del CSV
+CSV_ENCODING_SAMPLE_BYTES = 64 * 1024
+# Motor de pandas para las cargas completas de la hoja (--chunk-size 0): "c" o
+# "pyarrow" (análisis multihilo); la lectura por bloques siempre usa "c"
+CSV_ENGINE = os.getenv("IMPORT_CSV_ENGINE", "c").strip().lower()
+
+# Carga masiva: COPY a tablas temporales + SQL por conjuntos en lugar de
+# varias consultas por fila (recomendado para hojas grandes contra Supabase)
+BULK_LOAD_MODE = os.getenv("IMPORT_BULK_LOAD", "false").strip().lower() in ("1", "true", "yes")
+BULK_BATCH_SIZE = int(os.getenv("IMPORT_BULK_BATCH_SIZE", "5000"))
+
+# Filas por transacción en el modo fila a fila (0 = autocommit por sentencia)
+COMMIT_BATCH_SIZE = int(os.getenv("IMPORT_COMMIT_BATCH_SIZE", "1000"))
+
+# Índice en memoria de sesiones para la detección de duplicados sin consultas por fila
+SESSION_INDEX_ENABLED = os.getenv("IMPORT_SESSION_INDEX", "true").strip().lower() in ("1", "true", "yes")
+
+# Hilos de importación en paralelo (cada uno con su propia conexión del pool)
+IMPORT_WORKERS = max(1, int(os.getenv("IMPORT_WORKERS", "1")))
+
+# Configuración de logging (se activa con setup_logging; importar el módulo no crea ficheros)
 logger = logging.getLogger(__name__)
-logger.info(f"Log guardándose en: {log_filename}")
+_log_filename: Optional[str] = None
+
+def setup_logging() -> str:
+    """
+    Configura el logging del importador: fichero con marca temporal y consola.
+    
+    Solo actúa en la primera llamada, de modo que un proceso que ejecuta
+    varias importaciones sigue escribiendo en el mismo fichero.
+    
+    Returns:
+        str: Ruta del fichero de log
+    """
+    global _log_filename
+    if _log_filename is not None:
+        return _log_filename
+    
+    _log_filename = f"import_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+    logging.basicConfig(
+        level=logging.DEBUG,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S',
+        handlers=[
+            logging.FileHandler(_log_filename, encoding='utf-8'),  # Guarda en archivo
+            logging.StreamHandler()  # Muestra en consola
+        ]
+    )
+    logger.info(f"Log guardándose en: {_log_filename}")
+    return _log_filename
 
 # =========================================================================
 # CONFIGURACIÓN DE CONEXIÓN A BASE DE DATOS
 # =========================================================================
 
-try:
-    conn = psycopg2.connect(SUPABASE_DB_URL)
-    conn.autocommit = True
-    cur = conn.cursor()
-    logger.info("Conexión a la base de datos establecida exitosamente")
-except psycopg2.Error as e:
-    logger.error(f"Error al conectar con la base de datos: {e}")
-    raise
+# Conexión/cursor asignados al hilo actual (los hilos de importación usan una del pool)
+_db_local = threading.local()
+
+def get_connection():
+    """
+    Devuelve la conexión a utilizar en el hilo actual.
+    
+    Returns:
+        Conexión de psycopg2 del hilo o la del importador activo
+    """
+    return getattr(_db_local, "conn", None) or get_importer().conn
+
+def get_cursor():
+    """
+    Devuelve el cursor a utilizar en el hilo actual.
+    
+    Returns:
+        Cursor de psycopg2 del hilo o el del importador activo
+    """
+    return getattr(_db_local, "cur", None) or get_importer().cur
+
+# =========================================================================
+# BACKENDS DE ALMACENAMIENTO
+# =========================================================================
+
+class StorageBackend(ABC):
+    """
+    Interfaz de almacenamiento del importador.
+    
+    Las funciones de acceso a datos (sesiones, mediciones, agregados por
+    celda, datos de referencia) validan y registran en el log, y delegan la
+    consulta concreta en el backend activo (Importer.storage). Los métodos
+    lanzan las excepciones de `errors`, que capturan esas funciones.
+    
+    Un backend debe implementar todos los métodos abstractos (si falta
+    alguno, falla al crearlo); close es opcional.
+    """
+    
+    name = "base"
+    # Excepciones de la base de datos que las funciones de acceso capturan
+    errors: Tuple[type, ...] = ()
+    # Capacidades opcionales: carga masiva con COPY, hilos con pool de
+    # conexiones e instantáneas GeoJSON generadas por funciones de la API
+    supports_bulk_load = False
+    supports_parallel = False
+    supports_snapshots = False
+    
+    @abstractmethod
+    def connect(self) -> None:
+        """Abre la conexión (si no está abierta)."""
+    
+    def close(self) -> None:
+        """Cierra las conexiones propias del backend."""
+    
+    # --- Datos de referencia ---
+    @abstractmethod
+    def lookup(self, table: str, key_column: str, value_column: str) -> Dict[str, int]:
+        ...
+    
+    @abstractmethod
+    def load_provinces(self) -> List[Tuple[int, bytes]]:
+        """Polígonos de provincias_cyl como (id, WKB)."""
+    
+    # --- Sesiones y mediciones ---
+    @abstractmethod
+    def sessions_between(self, start: datetime, end: datetime) -> List[tuple]:
+        """Sesiones (id, lat, lon, timestamp local, operator_id) de un intervalo."""
+    
+    @abstractmethod
+    def find_session(self, lat: float, lon: float, timestamp: datetime, operator_id: int) -> Optional[int]:
+        ...
+    
+    @abstractmethod
+    def insert_session(self, lat: float, lon: float, timestamp: datetime, operator_id: int,
+                       cell: Tuple[int, str, float, float], provincia_id: Optional[int]) -> Optional[int]:
+        ...
+    
+    @abstractmethod
+    def upsert_signal(self, session_id: int, signal_type_id: int, strength: int) -> None:
+        ...
+    
+    @abstractmethod
+    def upsert_pollutant(self, session_id: int, pollutant_type_id: int, concentration: Decimal) -> None:
+        ...
+    
+    # --- Agregados y provincias ---
+    @abstractmethod
+    def refresh_grid_cells(self, cell_ids: List[str]) -> int:
+        ...
+    
+    @abstractmethod
+    def backfill_grid_cells(self) -> int:
+        """Calcula la celda de las sesiones que no la tienen y recalcula todos los agregados."""
+    
+    @abstractmethod
+    def sessions_without_province(self, after_id: int, limit: int) -> List[tuple]:
+        """Sesiones (id, lat, lon, cell_id) sin provincia con ID mayor que after_id."""
+    
+    @abstractmethod
+    def assign_provinces(self, session_ids: List[int], province_ids: List[int]) -> None:
+        ...
+    
+    # --- Transacciones del modo fila a fila ---
+    @abstractmethod
+    def begin(self) -> None:
+        ...
+    
+    @abstractmethod
+    def savepoint(self) -> None:
+        ...
+    
+    @abstractmethod
+    def advance_savepoint(self) -> None:
+        """Libera el savepoint de la fila actual y abre el de la siguiente."""
+    
+    @abstractmethod
+    def rollback_to_savepoint(self) -> None:
+        ...
+    
+    @abstractmethod
+    def statement_failed(self) -> bool:
+        """True si alguna sentencia ha fallado desde el último savepoint."""
+    
+    @abstractmethod
+    def commit(self) -> None:
+        ...
+    
+    @abstractmethod
+    def rollback(self) -> None:
+        ...
+    
+    @abstractmethod
+    def end(self) -> None:
+        """Vuelve al modo autocommit tras una transacción."""
+
+class PostgresBackend(StorageBackend):
+    """
+    Backend PostgreSQL/Supabase (PostGIS). Trabaja con la conexión del hilo
+    actual (get_connection/get_cursor), así que sirve tanto a la conexión
+    principal del importador como a las de los hilos de escritura.
+    """
+    
+    name = "postgres"
+    errors = (psycopg2.Error,)
+    supports_bulk_load = True
+    supports_parallel = True
+    supports_snapshots = True
+    
+    def connect(self) -> None:
+        get_connection()
+    
+    def lookup(self, table: str, key_column: str, value_column: str) -> Dict[str, int]:
+        db_cursor = get_cursor()
+        db_cursor.execute(f"SELECT {key_column}, {value_column} FROM {table} WHERE is_active = true")
+        return dict(db_cursor.fetchall())
+    
+    def load_provinces(self) -> List[Tuple[int, bytes]]:
+        db_cursor = get_cursor()
+        db_cursor.execute("""
+            SELECT id, ST_AsBinary(geometry) FROM provincias_cyl
+            WHERE geometry IS NOT NULL
+            ORDER BY id
+        """)
+        return [(province_id, bytes(wkb)) for province_id, wkb in db_cursor.fetchall()]
+    
+    def sessions_between(self, start: datetime, end: datetime) -> List[tuple]:
+        db_cursor = get_cursor()
+        # timestamp_recorded::timestamp devuelve la hora local de la sesión,
+        # igual que los timestamps sin zona horaria que se insertan
+        db_cursor.execute("""
+            SELECT id, latitude, longitude, timestamp_recorded::timestamp, operator_id
+            FROM measurement_sessions
+            WHERE timestamp_recorded BETWEEN %s AND %s
+        """, (start, end))
+        return db_cursor.fetchall()
+    
+    def find_session(self, lat: float, lon: float, timestamp: datetime, operator_id: int) -> Optional[int]:
+        db_cursor = get_cursor()
+        db_cursor.execute("""
+            SELECT id FROM measurement_sessions 
+            WHERE ABS(latitude - %s) < 0.00000001
+            AND ABS(longitude - %s) < 0.00000001
+            AND ABS(EXTRACT(EPOCH FROM (timestamp_recorded - %s))) < 60
+            AND operator_id = %s
+            LIMIT 1
+        """, (lat, lon, timestamp, operator_id))
+        result = db_cursor.fetchone()
+        return result[0] if result else None
+    
+    def insert_session(self, lat: float, lon: float, timestamp: datetime, operator_id: int,
+                       cell: Tuple[int, str, float, float], provincia_id: Optional[int]) -> Optional[int]:
+        db_cursor = get_cursor()
+        db_cursor.execute("""
+            INSERT INTO measurement_sessions 
+            (location, latitude, longitude, timestamp_recorded, operator_id,
+             utm_zone, cell_id, cell_lat, cell_lng, provincia_id, created_at, updated_at)
+            VALUES (ST_SetSRID(ST_MakePoint(%s, %s), 4326), %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
+            RETURNING id;
+        """, (lon, lat, lat, lon, timestamp, operator_id, *cell, provincia_id))
+        result = db_cursor.fetchone()
+        return result[0] if result else None
+    
+    def upsert_signal(self, session_id: int, signal_type_id: int, strength: int) -> None:
+        get_cursor().execute("""
+            INSERT INTO signal_measurements 
+            (session_id, signal_type_id, signal_strength_dbm, created_at, updated_at, 
+             data_source, measurement_method, quality_flag)
+            VALUES (%s, %s, %s, NOW(), NOW(), 'forms', 'mobile', 'valid')
+            ON CONFLICT (session_id, signal_type_id) 
+            DO UPDATE SET 
+                signal_strength_dbm = EXCLUDED.signal_strength_dbm,
+                updated_at = NOW(),
+                quality_flag = 'valid';
+        """, (session_id, signal_type_id, strength))
+    
+    def upsert_pollutant(self, session_id: int, pollutant_type_id: int, concentration: Decimal) -> None:
+        get_cursor().execute("""
+            INSERT INTO pollution_measurements 
+            (session_id, pollutant_type_id, concentration, created_at, updated_at,
+             data_source, measurement_method, quality_flag)
+            VALUES (%s, %s, %s, NOW(), NOW(), 'forms', 'domestic_sensor', 'valid')
+            ON CONFLICT (session_id, pollutant_type_id)
+            DO UPDATE SET 
+                concentration = EXCLUDED.concentration,
+                updated_at = NOW(),
+                quality_flag = 'valid';
+        """, (session_id, pollutant_type_id, concentration))
+    
+    def refresh_grid_cells(self, cell_ids: List[str]) -> int:
+        db_cursor = get_cursor()
+        db_cursor.execute("SELECT refresh_grid_cells(%s::text[])", (cell_ids,))
+        return db_cursor.fetchone()[0]
+    
+    def backfill_grid_cells(self) -> int:
+        # Función de migración de BBDD/04_FUNCTIONS_CORE.sql
+        db_cursor = get_cursor()
+        db_cursor.execute("SELECT backfill_grid_cells()")
+        return db_cursor.fetchone()[0]
+    
+    def sessions_without_province(self, after_id: int, limit: int) -> List[tuple]:
+        db_cursor = get_cursor()
+        db_cursor.execute("""
+            SELECT id, latitude, longitude, cell_id FROM measurement_sessions
+            WHERE provincia_id IS NULL AND id > %s
+            ORDER BY id
+            LIMIT %s
+        """, (after_id, limit))
+        return db_cursor.fetchall()
+    
+    def assign_provinces(self, session_ids: List[int], province_ids: List[int]) -> None:
+        get_cursor().execute("""
+            UPDATE measurement_sessions ms SET provincia_id = b.provincia_id
+            FROM unnest(%s::bigint[], %s::int[]) AS b(id, provincia_id)
+            WHERE ms.id = b.id
+        """, (session_ids, province_ids))
+    
+    def begin(self) -> None:
+        get_connection().autocommit = False
+    
+    def savepoint(self) -> None:
+        get_cursor().execute("SAVEPOINT import_row")
+    
+    def advance_savepoint(self) -> None:
+        get_cursor().execute("RELEASE SAVEPOINT import_row; SAVEPOINT import_row")
+    
+    def rollback_to_savepoint(self) -> None:
+        get_cursor().execute("ROLLBACK TO SAVEPOINT import_row")
+    
+    def statement_failed(self) -> bool:
+        # Las funciones de acceso capturan sus propios errores: el estado de
+        # la transacción indica si alguna sentencia de la fila ha fallado
+        return get_connection().info.transaction_status == psycopg2.extensions.TRANSACTION_STATUS_INERROR
+    
+    def commit(self) -> None:
+        get_connection().commit()
+    
+    def rollback(self) -> None:
+        get_connection().rollback()
+    
+    def end(self) -> None:
+        get_connection().autocommit = True
+
+# Esquema del backend embebido: mismas tablas, restricciones y catálogos que
+# BBDD/02_TABLES.sql, sin tipos PostGIS (la geometría de provincias es WKB)
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS operators (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    display_name TEXT NOT NULL,
+    is_active INTEGER DEFAULT 1
+);
+INSERT OR IGNORE INTO operators (name, display_name) VALUES
+('movistar', 'Movistar'), ('vodafone', 'Vodafone'), ('orange', 'Orange'), ('yoigo', 'Yoigo'),
+('o2', 'O2'), ('pepephone', 'Pepephone'), ('digi', 'Digi'), ('lowi', 'Lowi'), ('otro', 'Otro');
+
+CREATE TABLE IF NOT EXISTS signal_types (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL UNIQUE,
+    display_name TEXT NOT NULL,
+    is_active INTEGER DEFAULT 1
+);
+INSERT OR IGNORE INTO signal_types (code, display_name) VALUES ('4g', '4G'), ('5g', '5G');
+
+CREATE TABLE IF NOT EXISTS pollutant_types (
+    id INTEGER PRIMARY KEY,
+    code TEXT NOT NULL UNIQUE,
+    display_name TEXT NOT NULL,
+    unit TEXT NOT NULL,
+    is_active INTEGER DEFAULT 1
+);
+INSERT OR IGNORE INTO pollutant_types (code, display_name, unit) VALUES
+('co', 'CO', 'ppm'), ('co2', 'CO2', 'ppm'),
+('pm25', 'Partículas PM2.5', 'µg/m³'), ('pm10', 'Partículas PM10', 'µg/m³');
+
+CREATE TABLE IF NOT EXISTS provincias_cyl (
+    id INTEGER PRIMARY KEY,
+    provincia TEXT NOT NULL,
+    cod_ine_prov TEXT,
+    geometry BLOB
+);
+
+CREATE TABLE IF NOT EXISTS measurement_sessions (
+    id INTEGER PRIMARY KEY,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL,
+    timestamp_recorded TEXT NOT NULL,
+    operator_id INTEGER NOT NULL REFERENCES operators(id),
+    utm_zone INTEGER,
+    cell_id TEXT,
+    cell_lat REAL,
+    cell_lng REAL,
+    provincia_id INTEGER REFERENCES provincias_cyl(id),
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    CHECK (latitude BETWEEN -90 AND 90 AND longitude BETWEEN -180 AND 180)
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON measurement_sessions (timestamp_recorded);
+CREATE INDEX IF NOT EXISTS idx_sessions_cell ON measurement_sessions (cell_id);
+
+CREATE TABLE IF NOT EXISTS signal_measurements (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES measurement_sessions(id) ON DELETE CASCADE,
+    signal_type_id INTEGER NOT NULL REFERENCES signal_types(id),
+    signal_strength_dbm INTEGER NOT NULL CHECK (signal_strength_dbm BETWEEN -140 AND -30),
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    data_source TEXT DEFAULT 'forms',
+    measurement_method TEXT DEFAULT 'mobile',
+    quality_flag TEXT DEFAULT 'valid',
+    UNIQUE(session_id, signal_type_id)
+);
+
+CREATE TABLE IF NOT EXISTS pollution_measurements (
+    id INTEGER PRIMARY KEY,
+    session_id INTEGER NOT NULL REFERENCES measurement_sessions(id) ON DELETE CASCADE,
+    pollutant_type_id INTEGER NOT NULL REFERENCES pollutant_types(id),
+    concentration REAL NOT NULL CHECK (concentration >= 0),
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    data_source TEXT DEFAULT 'forms',
+    measurement_method TEXT DEFAULT 'domestic_sensor',
+    quality_flag TEXT DEFAULT 'valid',
+    UNIQUE(session_id, pollutant_type_id)
+);
+
+CREATE TABLE IF NOT EXISTS signal_grid_cells (
+    cell_id TEXT NOT NULL,
+    operator_id INTEGER NOT NULL,
+    signal_type_id INTEGER NOT NULL,
+    utm_zone INTEGER NOT NULL,
+    cell_lat REAL NOT NULL,
+    cell_lng REAL NOT NULL,
+    provincia_id INTEGER,
+    measurement_count INTEGER NOT NULL,
+    strength_sum INTEGER NOT NULL,
+    strength_sumsq INTEGER NOT NULL,
+    min_strength INTEGER NOT NULL,
+    max_strength INTEGER NOT NULL,
+    first_measurement TEXT NOT NULL,
+    last_measurement TEXT NOT NULL,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (cell_id, operator_id, signal_type_id)
+);
+
+CREATE TABLE IF NOT EXISTS pollution_grid_cells (
+    cell_id TEXT NOT NULL,
+    pollutant_type_id INTEGER NOT NULL,
+    measurement_date TEXT NOT NULL,
+    utm_zone INTEGER NOT NULL,
+    cell_lat REAL NOT NULL,
+    cell_lng REAL NOT NULL,
+    provincia_id INTEGER,
+    measurement_count INTEGER NOT NULL,
+    concentration_sum REAL NOT NULL,
+    concentration_sumsq REAL NOT NULL,
+    min_concentration REAL NOT NULL,
+    max_concentration REAL NOT NULL,
+    first_measurement TEXT NOT NULL,
+    last_measurement TEXT NOT NULL,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (cell_id, pollutant_type_id, measurement_date)
+);
+"""
+
+# Máximo de parámetros por sentencia IN (...) en SQLite
+SQLITE_MAX_PARAMETERS = 500
+
+class SQLiteBackend(StorageBackend):
+    """
+    Backend embebido sobre un fichero SQLite (sqlite:///ruta.db).
+    
+    Reproduce la semántica del backend PostgreSQL (deduplicación de sesiones
+    con la misma tolerancia, upserts, restricciones CHECK, savepoints por
+    fila y agregados por celda) para ejecutar el flujo completo sin red: en
+    un portátil, en CI, para perfilar el código Python o como ensayo antes
+    de importar en producción. No admite carga masiva, hilos ni instantáneas.
+    """
+    
+    name = "sqlite"
+    errors = (sqlite3.Error,)
+    
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Fichero de la base de datos (":memory:" para una en memoria)
+        """
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._failed = False
+    
+    def connect(self) -> None:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # isolation_level=None: autocommit salvo dentro de BEGIN explícito
+            self._conn = sqlite3.connect(self.path, isolation_level=None)
+            self._conn.execute("PRAGMA foreign_keys = ON")
+            self._conn.executescript(SQLITE_SCHEMA)
+            logger.info(f"Base de datos SQLite abierta: {self.path}")
+    
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            logger.debug("Base de datos SQLite cerrada")
+    
+    def _execute(self, query: str, params: Any = (), many: bool = False) -> sqlite3.Cursor:
+        """
+        Ejecuta una sentencia (con many, una vez por cada juego de parámetros)
+        anotando los fallos (ver statement_failed) y su latencia.
+        """
+        self.connect()
+        started = time.perf_counter()
+        try:
+            if many:
+                return self._conn.executemany(query, params)
+            return self._conn.execute(query, params)
+        except sqlite3.Error:
+            self._failed = True
+            raise
+        finally:
+            get_importer().metrics.observe_query(time.perf_counter() - started)
+    
+    @staticmethod
+    def _timestamp(timestamp: datetime) -> str:
+        return timestamp.isoformat(sep=' ')
+    
+    def lookup(self, table: str, key_column: str, value_column: str) -> Dict[str, int]:
+        return dict(self._execute(f"SELECT {key_column}, {value_column} FROM {table} WHERE is_active = 1").fetchall())
+    
+    def load_provinces(self) -> List[Tuple[int, bytes]]:
+        return self._execute(
+            "SELECT id, geometry FROM provincias_cyl WHERE geometry IS NOT NULL ORDER BY id").fetchall()
+    
+    def sessions_between(self, start: datetime, end: datetime) -> List[tuple]:
+        rows = self._execute("""
+            SELECT id, latitude, longitude, timestamp_recorded, operator_id
+            FROM measurement_sessions
+            WHERE timestamp_recorded BETWEEN ? AND ?
+        """, (self._timestamp(start), self._timestamp(end))).fetchall()
+        return [(session_id, lat, lon, datetime.fromisoformat(timestamp), operator_id)
+                for session_id, lat, lon, timestamp, operator_id in rows]
+    
+    def find_session(self, lat: float, lon: float, timestamp: datetime, operator_id: int) -> Optional[int]:
+        result = self._execute("""
+            SELECT id FROM measurement_sessions
+            WHERE ABS(latitude - ?) < 0.00000001
+            AND ABS(longitude - ?) < 0.00000001
+            AND ABS(julianday(timestamp_recorded) - julianday(?)) * 86400 < 60
+            AND operator_id = ?
+            LIMIT 1
+        """, (lat, lon, self._timestamp(timestamp), operator_id)).fetchone()
+        return result[0] if result else None
+    
+    def insert_session(self, lat: float, lon: float, timestamp: datetime, operator_id: int,
+                       cell: Tuple[int, str, float, float], provincia_id: Optional[int]) -> Optional[int]:
+        # Misma precisión que DECIMAL(10, 8) / DECIMAL(11, 8) en PostgreSQL
+        return self._execute("""
+            INSERT INTO measurement_sessions
+            (latitude, longitude, timestamp_recorded, operator_id,
+             utm_zone, cell_id, cell_lat, cell_lng, provincia_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (round(lat, 8), round(lon, 8), self._timestamp(timestamp), operator_id,
+              *cell, provincia_id)).lastrowid
+    
+    def upsert_signal(self, session_id: int, signal_type_id: int, strength: int) -> None:
+        self._execute("""
+            INSERT INTO signal_measurements (session_id, signal_type_id, signal_strength_dbm)
+            VALUES (?, ?, ?)
+            ON CONFLICT (session_id, signal_type_id)
+            DO UPDATE SET
+                signal_strength_dbm = excluded.signal_strength_dbm,
+                updated_at = CURRENT_TIMESTAMP,
+                quality_flag = 'valid'
+        """, (session_id, signal_type_id, strength))
+    
+    def upsert_pollutant(self, session_id: int, pollutant_type_id: int, concentration: Decimal) -> None:
+        # Misma precisión que DECIMAL(10, 4) en PostgreSQL
+        self._execute("""
+            INSERT INTO pollution_measurements (session_id, pollutant_type_id, concentration)
+            VALUES (?, ?, ?)
+            ON CONFLICT (session_id, pollutant_type_id)
+            DO UPDATE SET
+                concentration = excluded.concentration,
+                updated_at = CURRENT_TIMESTAMP,
+                quality_flag = 'valid'
+        """, (session_id, pollutant_type_id, float(round(Decimal(concentration), 4))))
+    
+    def refresh_grid_cells(self, cell_ids: List[str]) -> int:
+        # Misma agregación que la función refresh_grid_cells de BBDD/04_FUNCTIONS_CORE.sql
+        refreshed = 0
+        for start in range(0, len(cell_ids), SQLITE_MAX_PARAMETERS):
+            batch = cell_ids[start:start + SQLITE_MAX_PARAMETERS]
+            placeholders = ", ".join("?" * len(batch))
+            self._execute(f"DELETE FROM signal_grid_cells WHERE cell_id IN ({placeholders})", batch)
+            self._execute(f"DELETE FROM pollution_grid_cells WHERE cell_id IN ({placeholders})", batch)
+            refreshed += self._execute(f"""
+                INSERT INTO signal_grid_cells
+                (cell_id, operator_id, signal_type_id, utm_zone, cell_lat, cell_lng, provincia_id,
+                 measurement_count, strength_sum, strength_sumsq, min_strength, max_strength,
+                 first_measurement, last_measurement)
+                SELECT ms.cell_id, ms.operator_id, sm.signal_type_id,
+                       MIN(ms.utm_zone), MIN(ms.cell_lat), MIN(ms.cell_lng), MIN(ms.provincia_id),
+                       COUNT(*), SUM(sm.signal_strength_dbm),
+                       SUM(sm.signal_strength_dbm * sm.signal_strength_dbm),
+                       MIN(sm.signal_strength_dbm), MAX(sm.signal_strength_dbm),
+                       MIN(ms.timestamp_recorded), MAX(ms.timestamp_recorded)
+                FROM measurement_sessions ms
+                JOIN signal_measurements sm ON ms.id = sm.session_id
+                WHERE ms.cell_id IN ({placeholders})
+                    AND sm.signal_strength_dbm BETWEEN -140 AND -30
+                    AND sm.quality_flag = 'valid'
+                GROUP BY ms.cell_id, ms.operator_id, sm.signal_type_id
+            """, batch).rowcount
+            self._execute(f"""
+                INSERT INTO pollution_grid_cells
+                (cell_id, pollutant_type_id, measurement_date, utm_zone, cell_lat, cell_lng, provincia_id,
+                 measurement_count, concentration_sum, concentration_sumsq, min_concentration, max_concentration,
+                 first_measurement, last_measurement)
+                SELECT ms.cell_id, pm.pollutant_type_id, date(ms.timestamp_recorded),
+                       MIN(ms.utm_zone), MIN(ms.cell_lat), MIN(ms.cell_lng), MIN(ms.provincia_id),
+                       COUNT(*), SUM(pm.concentration), SUM(pm.concentration * pm.concentration),
+                       MIN(pm.concentration), MAX(pm.concentration),
+                       MIN(ms.timestamp_recorded), MAX(ms.timestamp_recorded)
+                FROM measurement_sessions ms
+                JOIN pollution_measurements pm ON ms.id = pm.session_id
+                WHERE ms.cell_id IN ({placeholders})
+                    AND pm.concentration > 0
+                    AND pm.concentration < 9999
+                    AND pm.quality_flag = 'valid'
+                GROUP BY ms.cell_id, pm.pollutant_type_id, date(ms.timestamp_recorded)
+            """, batch)
+        return refreshed
+    
+    def backfill_grid_cells(self) -> int:
+        # Misma regla que la función backfill_grid_cells de PostgreSQL, calculada con compute_grid_cells
+        rows = self._execute("SELECT id, latitude, longitude FROM measurement_sessions WHERE cell_id IS NULL").fetchall()
+        if rows:
+            cells = compute_grid_cells(np.array([row[1] for row in rows]), np.array([row[2] for row in rows]))
+            self._execute("UPDATE measurement_sessions SET utm_zone = ?, cell_id = ?, cell_lat = ?, cell_lng = ? "
+                          "WHERE id = ?",
+                          [(int(zone), cell_id, float(lat), float(lng), row[0]) for row, zone, cell_id, lat, lng
+                           in zip(rows, cells['utm_zone'], cells['cell_id'], cells['cell_lat'], cells['cell_lng'])],
+                          many=True)
+        cell_ids = [row[0] for row in self._execute(
+            "SELECT DISTINCT cell_id FROM measurement_sessions WHERE cell_id IS NOT NULL").fetchall()]
+        self.refresh_grid_cells(cell_ids)
+        return len(rows)
+    
+    def sessions_without_province(self, after_id: int, limit: int) -> List[tuple]:
+        return self._execute("""
+            SELECT id, latitude, longitude, cell_id FROM measurement_sessions
+            WHERE provincia_id IS NULL AND id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (after_id, limit)).fetchall()
+    
+    def assign_provinces(self, session_ids: List[int], province_ids: List[int]) -> None:
+        self._execute("UPDATE measurement_sessions SET provincia_id = ? WHERE id = ?",
+                      list(zip(province_ids, session_ids)), many=True)
+    
+    def begin(self) -> None:
+        self._execute("BEGIN")
+    
+    def savepoint(self) -> None:
+        self._execute("SAVEPOINT import_row")
+        self._failed = False
+    
+    def advance_savepoint(self) -> None:
+        self._execute("RELEASE SAVEPOINT import_row")
+        self.savepoint()
+    
+    def rollback_to_savepoint(self) -> None:
+        self._execute("ROLLBACK TO SAVEPOINT import_row")
+        self._failed = False
+    
+    def statement_failed(self) -> bool:
+        # SQLite no aborta la transacción tras un error: se anota en _execute
+        return self._failed
+    
+    def commit(self) -> None:
+        self._execute("COMMIT")
+    
+    def rollback(self) -> None:
+        if self._conn is not None and self._conn.in_transaction:
+            self._conn.execute("ROLLBACK")
+    
+    def end(self) -> None:
+        self.rollback()
+        self._failed = False
+
+def create_storage_backend(db_url: str) -> StorageBackend:
+    """
+    Crea el backend de almacenamiento correspondiente a una cadena de conexión.
+    
+    Args:
+        db_url (str): "sqlite:///ruta.db" (o "sqlite://" en memoria) para el backend
+            embebido; cualquier otra cadena se trata como conexión PostgreSQL
+    
+    Returns:
+        StorageBackend: Backend sin conectar (la conexión se abre en el primer uso)
+    """
+    # Misma convención que SQLAlchemy: sqlite:///relativa.db, sqlite:////absoluta.db
+    if db_url.startswith("sqlite:///"):
+        return SQLiteBackend(db_url[len("sqlite:///"):] or ":memory:")
+    if db_url.startswith("sqlite://"):
+        return SQLiteBackend(":memory:")
+    return PostgresBackend()
+
+def get_storage() -> StorageBackend:
+    """
+    Devuelve el backend de almacenamiento del importador activo.
+    
+    Returns:
+        StorageBackend: Backend activo
+    """
+    return get_importer().storage
 
 # =========================================================================
 # CONFIGURACIÓN DE VALIDACIÓN GEOGRÁFICA
@@ -76,6 +790,315 @@ SPAIN_WFS_URL = (
 # Cache en memoria para la geometría de España
 _spain_geometry_cache = None
 
+# Directorio de caché/estado local del importador (persistente entre ejecuciones)
+IMPORT_CACHE_DIR = os.getenv(
+    "IMPORT_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".import_cache"))
+
+# Caché en disco de la geometría de España (WKB + metadatos con checksum)
+SPAIN_GEOMETRY_CACHE_FILE = os.path.join(IMPORT_CACHE_DIR, "spain_geometry.wkb")
+SPAIN_GEOMETRY_CACHE_TTL_HOURS = float(os.getenv("SPAIN_GEOMETRY_CACHE_TTL_HOURS", "720"))  # 30 días
+# Modo offline: nunca consulta el WFS (usa fixture o caché en disco aunque esté caducada)
+SPAIN_GEOMETRY_OFFLINE = os.getenv("SPAIN_GEOMETRY_OFFLINE", "false").strip().lower() in ("1", "true", "yes")
+# Fichero fijo con la geometría (WKB, WKT o GeoJSON) para importaciones y pruebas sin red
+SPAIN_GEOMETRY_FIXTURE = os.getenv("SPAIN_GEOMETRY_FIXTURE")
+# Cascada de contención: tolerancia (grados) de los polígonos interior y exterior
+# simplificados; la geometría exacta solo se consulta en la franja entre ambos (0 = desactivada)
+SPAIN_CASCADE_TOLERANCE = float(os.getenv("SPAIN_CASCADE_TOLERANCE", "0.005"))
+# Geometrías con menos vértices se consultan directamente (la cascada no compensa)
+SPAIN_CASCADE_MIN_VERTICES = int(os.getenv("SPAIN_CASCADE_MIN_VERTICES", "5000"))
+
+# =========================================================================
+# MÉTRICAS E INSTRUMENTACIÓN
+# =========================================================================
+
+# Métricas de cada ejecución: resumen JSON por ejecución y fichero textfile de Prometheus
+IMPORT_METRICS_ENABLED = os.getenv("IMPORT_METRICS", "true").strip().lower() in ("1", "true", "yes")
+IMPORT_METRICS_DIR = os.getenv("IMPORT_METRICS_DIR", os.path.join(IMPORT_CACHE_DIR, "metrics"))
+IMPORT_METRICS_TEXTFILE = os.getenv(
+    "IMPORT_METRICS_TEXTFILE", os.path.join(IMPORT_METRICS_DIR, "rurairconnect_import.prom"))
+# Resúmenes JSON que se conservan (el modo demonio genera uno por sondeo)
+IMPORT_METRICS_KEEP = int(os.getenv("IMPORT_METRICS_KEEP", "500"))
+
+# Límites superiores (segundos) de los histogramas de latencia
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class LatencyHistogram:
+    """Histograma acumulativo de latencias con los límites de LATENCY_BUCKETS."""
+    
+    def __init__(self):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        for position, upper_bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= upper_bound:
+                self.bucket_counts[position] += 1
+                break
+    
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Pares (le, recuento acumulado) al estilo de Prometheus, incluido +Inf."""
+        pairs, running = [], 0
+        for upper_bound, bucket_count in zip(LATENCY_BUCKETS, self.bucket_counts):
+            running += bucket_count
+            pairs.append((f"{upper_bound:g}", running))
+        pairs.append(("+Inf", self.count))
+        return pairs
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'total_seconds': round(self.total, 6),
+            'mean_seconds': round(self.total / self.count, 6) if self.count else 0.0,
+            'max_seconds': round(self.max, 6),
+            'buckets': dict(self.cumulative()),
+        }
+
+class ImportMetrics:
+    """
+    Tiempos por fase, latencias por función y consultas a la base de datos de
+    una ejecución. Es seguro entre hilos: los hilos de importación registran
+    sus llamadas en la misma instancia.
+    """
+    
+    def __init__(self):
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        # Pico de memoria Python (bytes) por fase; solo si tracemalloc está activo
+        self.phase_memory: Dict[str, int] = {}
+        self.functions: Dict[str, LatencyHistogram] = {}
+        self.db_queries = LatencyHistogram()
+        # Memoria de los DataFrames leídos (bytes, memory_usage(deep=True))
+        self.dataframe_memory = {'peak_chunk': 0, 'total': 0}
+        # Resultado de cada fuente (estado, filas y estadísticas); lo completa Importer.run
+        self.sources: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """
+        Acumula el tiempo de reloj del bloque en la fase indicada y, si
+        tracemalloc está activo, el pico de memoria reservada durante el bloque.
+        """
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] - baseline if tracing else None
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0.0) + elapsed
+                if peak is not None:
+                    self.phase_memory[name] = max(self.phase_memory.get(name, 0), peak)
+    
+    def timed_iter(self, iterable, name: str) -> Iterator[Any]:
+        """Recorre un iterable acumulando en la fase indicada el tiempo de cada next()."""
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+    
+    def observe(self, function: str, seconds: float) -> None:
+        """Registra la duración de una llamada a una función instrumentada."""
+        with self._lock:
+            histogram = self.functions.get(function)
+            if histogram is None:
+                histogram = self.functions[function] = LatencyHistogram()
+            histogram.observe(seconds)
+    
+    def observe_query(self, seconds: float) -> None:
+        """Registra una ida y vuelta a la base de datos."""
+        with self._lock:
+            self.db_queries.observe(seconds)
+    
+    def observe_dataframe(self, dataframe: pd.DataFrame) -> int:
+        """Registra la memoria de un bloque leído de la fuente y la devuelve en bytes."""
+        size = int(dataframe.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            self.dataframe_memory['peak_chunk'] = max(self.dataframe_memory['peak_chunk'], size)
+            self.dataframe_memory['total'] += size
+        return size
+    
+    def summary(self, statistics: Dict[str, int], pending_rows: int) -> Dict[str, Any]:
+        """
+        Resumen serializable de la ejecución.
+        
+        Args:
+            statistics (Dict[str, int]): Estadísticas de procesamiento
+            pending_rows (int): Filas nuevas o modificadas procesadas
+        
+        Returns:
+            Dict[str, Any]: Duraciones, rendimiento, consultas y contadores
+        """
+        duration = time.perf_counter() - self._started
+        with self._lock:
+            return {
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'duration_seconds': round(duration, 6),
+                'rows': pending_rows,
+                'rows_per_second': round(pending_rows / duration, 3) if duration > 0 else 0.0,
+                'processed_per_second': round(statistics.get('processed', 0) / duration, 3) if duration > 0 else 0.0,
+                'phases_seconds': {name: round(seconds, 6) for name, seconds in self.phases.items()},
+                'phases_peak_memory_bytes': dict(self.phase_memory),
+                'dataframe_memory_bytes': dict(self.dataframe_memory),
+                'db_queries': self.db_queries.to_dict(),
+                'functions': {name: histogram.to_dict() for name, histogram in sorted(self.functions.items())},
+                'statistics': dict(statistics),
+                'sources': {
+                    name: {'status': result['status'],
+                           'error': None if result['error'] is None else str(result['error']),
+                           'rows': result['rows'],
+                           'pending_rows': result['pending_rows'],
+                           'statistics': dict(result['statistics'])}
+                    for name, result in self.sources.items()
+                },
+            }
+
+def instrumented(name: str):
+    """
+    Decorador que registra la latencia de cada llamada en las métricas del importador activo.
+    
+    Args:
+        name (str): Nombre de la función en las métricas
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                get_importer().metrics.observe(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """Cursor que contabiliza cada ida y vuelta a la base de datos y su latencia."""
+    
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            get_importer().metrics.observe_query(time.perf_counter() - started)
+    
+    def copy_expert(self, sql, file, size=8192):
+        started = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            get_importer().metrics.observe_query(time.perf_counter() - started)
+
+def _prometheus_metrics(summary: Dict[str, Any]) -> str:
+    """
+    Convierte el resumen de una ejecución al formato textfile de Prometheus.
+    
+    Args:
+        summary (Dict[str, Any]): Resumen generado por ImportMetrics.summary
+    
+    Returns:
+        str: Contenido del fichero .prom
+    """
+    prefix = "rurairconnect_import"
+    lines = [
+        f"# HELP {prefix}_last_run_timestamp_seconds Inicio de la última importación",
+        f"# TYPE {prefix}_last_run_timestamp_seconds gauge",
+        f"{prefix}_last_run_timestamp_seconds {datetime.fromisoformat(summary['started_at']).timestamp():.0f}",
+        f"# HELP {prefix}_duration_seconds Duración total de la última importación",
+        f"# TYPE {prefix}_duration_seconds gauge",
+        f"{prefix}_duration_seconds {summary['duration_seconds']}",
+        f"# HELP {prefix}_rows_per_second Filas nuevas o modificadas procesadas por segundo",
+        f"# TYPE {prefix}_rows_per_second gauge",
+        f"{prefix}_rows_per_second {summary['rows_per_second']}",
+        f"# HELP {prefix}_phase_seconds Tiempo de reloj por fase",
+        f"# TYPE {prefix}_phase_seconds gauge",
+    ]
+    lines += [f'{prefix}_phase_seconds{{phase="{name}"}} {seconds}'
+              for name, seconds in summary['phases_seconds'].items()]
+    lines += [
+        f"# HELP {prefix}_dataframe_memory_bytes Memoria de los DataFrames leídos (mayor bloque y total)",
+        f"# TYPE {prefix}_dataframe_memory_bytes gauge",
+    ]
+    lines += [f'{prefix}_dataframe_memory_bytes{{scope="{scope}"}} {size}'
+              for scope, size in summary['dataframe_memory_bytes'].items()]
+    lines += [
+        f"# HELP {prefix}_statistics Contadores de procesamiento de la última importación",
+        f"# TYPE {prefix}_statistics gauge",
+    ]
+    lines += [f'{prefix}_statistics{{counter="{key}"}} {value}' for key, value in summary['statistics'].items()]
+    lines += [
+        f"# HELP {prefix}_source_up 1 si la fuente se leyó completa en la última importación",
+        f"# TYPE {prefix}_source_up gauge",
+    ]
+    lines += [f'{prefix}_source_up{{source="{name}"}} {0 if result["status"] == "error" else 1}'
+              for name, result in summary['sources'].items()]
+    lines += [
+        f"# HELP {prefix}_source_statistics Contadores de procesamiento por fuente",
+        f"# TYPE {prefix}_source_statistics gauge",
+    ]
+    lines += [f'{prefix}_source_statistics{{source="{name}",counter="{key}"}} {value}'
+              for name, result in summary['sources'].items() for key, value in result['statistics'].items()]
+    
+    def histogram(metric: str, help_text: str, label: str, data: Dict[str, Any]) -> None:
+        lines.append(f"# HELP {prefix}_{metric} {help_text}")
+        lines.append(f"# TYPE {prefix}_{metric} histogram")
+        for name, values in data.items():
+            labels = f'{label}="{name}",' if label else ""
+            for upper_bound, bucket_count in values['buckets'].items():
+                lines.append(f'{prefix}_{metric}_bucket{{{labels}le="{upper_bound}"}} {bucket_count}')
+            labels = f'{{{label}="{name}"}}' if label else ""
+            lines.append(f"{prefix}_{metric}_sum{labels} {values['total_seconds']}")
+            lines.append(f"{prefix}_{metric}_count{labels} {values['count']}")
+    
+    histogram("db_query_seconds", "Latencia de las idas y vueltas a la base de datos", None,
+              {"": summary['db_queries']})
+    histogram("function_seconds", "Latencia de las funciones instrumentadas", "function",
+              summary['functions'])
+    return "\n".join(lines) + "\n"
+
+def export_metrics(summary: Dict[str, Any]) -> None:
+    """
+    Escribe el resumen JSON de la ejecución y el textfile de Prometheus, y
+    registra en el log el reparto de tiempo por fase.
+    
+    Args:
+        summary (Dict[str, Any]): Resumen generado por ImportMetrics.summary
+    """
+    logger.info(f"RENDIMIENTO: {summary['duration_seconds']:.2f}s, {summary['rows_per_second']:.1f} filas/s, "
+                f"{summary['db_queries']['count']} consultas a la base de datos "
+                f"({summary['db_queries']['mean_seconds'] * 1000:.2f} ms de media)")
+    for name, seconds in sorted(summary['phases_seconds'].items(), key=lambda item: -item[1]):
+        logger.info(f"  • Fase {name}: {seconds:.3f}s")
+    
+    if not IMPORT_METRICS_ENABLED:
+        return
+    try:
+        json_path = os.path.join(IMPORT_METRICS_DIR, f"import_{datetime.fromisoformat(summary['started_at']):%Y%m%d_%H%M%S}.json")
+        write_file_atomically(json_path, json.dumps(summary, indent=2, ensure_ascii=False).encode("utf-8"))
+        write_file_atomically(IMPORT_METRICS_TEXTFILE, _prometheus_metrics(summary).encode("utf-8"))
+        logger.info(f"Métricas guardadas en {json_path} y {IMPORT_METRICS_TEXTFILE}")
+        
+        # Se eliminan los resúmenes más antiguos (el nombre lleva la fecha)
+        history = sorted(name for name in os.listdir(IMPORT_METRICS_DIR)
+                         if name.startswith("import_") and name.endswith(".json"))
+        for name in history[:max(0, len(history) - IMPORT_METRICS_KEEP)]:
+            os.remove(os.path.join(IMPORT_METRICS_DIR, name))
+    except OSError as e:
+        logger.warning(f"No se pudieron guardar las métricas de la ejecución: {e}")
+
 # =========================================================================
 # CACHÉS Y DICCIONARIOS DE REFERENCIA
 # =========================================================================
@@ -92,24 +1115,15 @@ def get_lookup_dict(table: str, key_column: str = "display_name", value_column:
     Returns:
         Dict[str, int]: Diccionario con mapeo clave-valor
     """
+    storage = get_storage()
     try:
-        cur.execute(f"SELECT {key_column}, {value_column} FROM {table} WHERE is_active = true")
-        result = dict(cur.fetchall())
+        result = storage.lookup(table, key_column, value_column)
         logger.debug(f"Cargado diccionario de {table}: {len(result)} registros")
         return result
-    except psycopg2.Error as e:
+    except storage.errors as e:
         logger.error(f"Error cargando diccionario de {table}: {e}")
         return {}
 
-# Inicialización de cachés de datos de referencia
-operators_dict = get_lookup_dict("operators", key_column="display_name")
-signal_types_dict = get_lookup_dict("signal_types", key_column="display_name") 
-pollutants_dict = get_lookup_dict("pollutant_types", key_column="code")
-
-logger.info(f"Datos de referencia cargados - Operadores: {len(operators_dict)}, "
-           f"Tipos de señal: {len(signal_types_dict)}, "
-           f"Contaminantes: {len(pollutants_dict)}")
-
 # =========================================================================
 # FUNCIONES DE PROCESAMIENTO Y VALIDACIÓN DE DATOS
 # =========================================================================
@@ -139,6 +1153,16 @@ def parse_location(loc_str: str) -> Tuple[Optional[float], Optional[float]]:
         logger.warning(f"Error parseando coordenadas '{loc_str}': {e}")
         return None, None
 
+# Formatos de timestamp soportados ordenados por probabilidad de uso
+TIMESTAMP_FORMATS = [
+    "%d/%m/%Y %H:%M:%S",    # Formato español completo
+    "%d/%m/%Y %H:%M",       # Formato español sin segundos
+    "%Y-%m-%d %H:%M:%S",    # Formato ISO completo
+    "%Y-%m-%d %H:%M",       # Formato ISO sin segundos
+    "%d-%m-%Y %H:%M:%S",    # Formato alternativo
+    "%d-%m-%Y %H:%M"        # Formato alternativo sin segundos
+]
+
 def parse_timestamp(ts_str: str) -> Optional[datetime]:
     """
     Parsea timestamp con soporte para múltiples formatos comunes.
@@ -149,17 +1173,7 @@ def parse_timestamp(ts_str: str) -> Optional[datetime]:
     Returns:
         Optional[datetime]: Objeto datetime o None si hay error
     """
-    # Formatos soportados ordenados por probabilidad de uso
-    formats = [
-        "%d/%m/%Y %H:%M:%S",    # Formato español completo
-        "%d/%m/%Y %H:%M",       # Formato español sin segundos
-        "%Y-%m-%d %H:%M:%S",    # Formato ISO completo
-        "%Y-%m-%d %H:%M",       # Formato ISO sin segundos
-        "%d-%m-%Y %H:%M:%S",    # Formato alternativo
-        "%d-%m-%Y %H:%M"        # Formato alternativo sin segundos
-    ]
-    
-    for fmt in formats:
+    for fmt in TIMESTAMP_FORMATS:
         try:
             return datetime.strptime(ts_str.strip(), fmt)
         except ValueError:
@@ -183,64 +1197,352 @@ def get_operator_id(operator_name: str) -> Optional[int]:
     
     # Normalización del nombre: capitaliza cada palabra
     normalized = operator_name.strip().title()
-    operator_id = operators_dict.get(normalized)
+    operator_id = get_importer().operators.get(normalized)
     
     if operator_id is None:
         logger.warning(f"Operador no encontrado en base de datos: '{operator_name}'")
     
     return operator_id
-# =========================================================================
-# FUNCIONES DE VALIDACIÓN GEOGRÁFICA
-# =========================================================================
 
-def get_spain_geometry(use_cache: bool = True):
+def parse_signal_strength(strength: Union[int, float, str]) -> Optional[int]:
     """
-    Obtiene la geometría nacional de España desde el WFS del IGN.
+    Convierte y valida una intensidad de señal en dBm.
     
     Args:
-        use_cache (bool): Si usar caché en memoria para evitar descargas repetidas
+        strength (Union[int, float, str]): Intensidad de señal en dBm
     
     Returns:
-        shapely.geometry: Geometría MultiPolygon de España
-    
-    Raises:
-        Exception: Si no se puede descargar o procesar la geometría
+        Optional[int]: Intensidad como entero o None si no es válida
     """
-    global _spain_geometry_cache
-    
-    # Verificar caché en memoria
-    if use_cache and _spain_geometry_cache is not None:
-        logger.debug("Usando geometría de España desde caché en memoria")
-        return _spain_geometry_cache
-    
-    logger.info("Descargando geometría de España desde el WFS del IGN...")
-    
     try:
-        # Descargar desde el servicio WFS
-        gdf = gpd.read_file(SPAIN_WFS_URL)
-        
-        if gdf.empty:
-            raise ValueError("No se encontró la geometría nacional de España en el WFS")
-        
-        # Verificar que tenemos el CRS correcto (WGS84)
-        if gdf.crs != 'EPSG:4326':
-            logger.info(f"Reproyectando geometría desde {gdf.crs} a EPSG:4326")
-            gdf = gdf.to_crs('EPSG:4326')
-        
-        # Extraer la geometría
-        spain_geom = gdf.geometry.iloc[0]
-        
-        # Guardar en caché
-        if use_cache:
-            _spain_geometry_cache = spain_geom
-            logger.debug("Geometría de España guardada en caché en memoria")
-        
-        logger.info("Geometría de España cargada exitosamente")
-        return spain_geom
+        if pd.isna(strength):
+            return None
+            
+        strength_int = int(float(strength))
         
-    except Exception as e:
-        logger.error(f"Error cargando geometría de España: {e}")
-        raise Exception(f"No se pudo cargar la geometría de España: {e}")
+        # Validar rango típico de potencia de señal en dBm
+        if not (-150 <= strength_int <= 0):
+            logger.warning(f"Intensidad de señal fuera de rango esperado: {strength_int} dBm")
+            return None
+            
+        return strength_int
+    except (ValueError, TypeError, OverflowError) as e:
+        logger.warning(f"Error procesando intensidad de señal '{strength}': {e}")
+        return None
+
+def parse_concentration(concentration: Union[int, float, str]) -> Optional[Decimal]:
+    """
+    Convierte y valida una concentración de contaminante.
+    
+    Args:
+        concentration (Union[int, float, str]): Concentración medida
+    
+    Returns:
+        Optional[Decimal]: Concentración como Decimal o None si no es válida
+    """
+    try:
+        if pd.isna(concentration):
+            return None
+            
+        concentration_decimal = Decimal(str(float(concentration)))
+        
+        # Validar que la concentración no sea negativa
+        if concentration_decimal < 0:
+            logger.warning(f"Concentración negativa detectada: {concentration_decimal}")
+            return None
+            
+        return concentration_decimal
+    except (ValueError, TypeError, InvalidOperation) as e:
+        logger.warning(f"Error procesando concentración '{concentration}': {e}")
+        return None
+
+# =========================================================================
+# FUNCIONES DE VALIDACIÓN GEOGRÁFICA
+# =========================================================================
+
+def write_file_atomically(path: str, data: bytes) -> None:
+    """
+    Escribe un fichero de forma atómica (fichero temporal + os.replace).
+    
+    Args:
+        path (str): Ruta de destino
+        data (bytes): Contenido a escribir
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def load_geometry_file(path: str) -> BaseGeometry:
+    """
+    Carga una geometría desde fichero según su extensión (WKB, WKT o GeoJSON).
+    
+    Args:
+        path (str): Ruta del fichero
+    
+    Returns:
+        BaseGeometry: Geometría cargada
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".wkb":
+        with open(path, "rb") as geometry_file:
+            return shapely.from_wkb(geometry_file.read())
+    if extension == ".wkt":
+        with open(path, "r", encoding="utf-8") as geometry_file:
+            return shapely.from_wkt(geometry_file.read())
+    
+    # GeoJSON u otros formatos soportados por geopandas
+    import geopandas as gpd  # importación diferida: arrastra pyproj/GDAL
+    gdf = gpd.read_file(path)
+    if gdf.crs is not None and gdf.crs != 'EPSG:4326':
+        gdf = gdf.to_crs('EPSG:4326')
+    return gdf.geometry.union_all() if len(gdf) > 1 else gdf.geometry.iloc[0]
+
+def read_spain_geometry_cache(allow_stale: bool = False) -> Optional[BaseGeometry]:
+    """
+    Lee la geometría de España desde la caché en disco si es válida.
+    
+    Args:
+        allow_stale (bool): Aceptar la caché aunque haya superado el TTL
+    
+    Returns:
+        Optional[BaseGeometry]: Geometría o None si no hay caché utilizable
+    """
+    metadata_file = SPAIN_GEOMETRY_CACHE_FILE + ".json"
+    if not (os.path.exists(SPAIN_GEOMETRY_CACHE_FILE) and os.path.exists(metadata_file)):
+        return None
+    
+    try:
+        with open(metadata_file, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        with open(SPAIN_GEOMETRY_CACHE_FILE, "rb") as f:
+            wkb = f.read()
+        
+        if hashlib.sha256(wkb).hexdigest() != metadata.get("sha256"):
+            logger.warning("Caché en disco de la geometría de España corrupta (checksum incorrecto)")
+            return None
+        
+        age_hours = (time.time() - float(metadata.get("downloaded_at", 0))) / 3600
+        if age_hours > SPAIN_GEOMETRY_CACHE_TTL_HOURS and not allow_stale:
+            logger.info(f"Caché en disco de la geometría de España caducada ({age_hours:.1f} h)")
+            return None
+        
+        logger.debug(f"Geometría de España cargada desde caché en disco ({age_hours:.1f} h de antigüedad)")
+        return shapely.from_wkb(wkb)
+    except (OSError, ValueError, shapely.errors.GEOSException) as e:
+        logger.warning(f"No se pudo leer la caché en disco de la geometría de España: {e}")
+        return None
+
+def write_spain_geometry_cache(spain_geom: BaseGeometry) -> None:
+    """
+    Guarda la geometría de España en la caché en disco junto a su checksum.
+    
+    Args:
+        spain_geom (BaseGeometry): Geometría a guardar
+    """
+    try:
+        wkb = shapely.to_wkb(spain_geom)
+        metadata = {
+            "source": SPAIN_WFS_URL,
+            "downloaded_at": time.time(),
+            "sha256": hashlib.sha256(wkb).hexdigest()
+        }
+        write_file_atomically(SPAIN_GEOMETRY_CACHE_FILE, wkb)
+        write_file_atomically(SPAIN_GEOMETRY_CACHE_FILE + ".json", json.dumps(metadata).encode("utf-8"))
+        logger.debug(f"Geometría de España guardada en caché en disco: {SPAIN_GEOMETRY_CACHE_FILE}")
+    except OSError as e:
+        logger.warning(f"No se pudo guardar la caché en disco de la geometría de España: {e}")
+
+@instrumented("get_spain_geometry")
+def get_spain_geometry(use_cache: bool = True):
+    """
+    Obtiene la geometría nacional de España.
+    
+    Orden de búsqueda: caché en memoria, fichero fijo (SPAIN_GEOMETRY_FIXTURE),
+    caché en disco dentro del TTL y, por último, el WFS del IGN. En modo
+    offline nunca se consulta el WFS; si la descarga falla se usa la caché
+    en disco aunque esté caducada.
+    
+    Args:
+        use_cache (bool): Si usar caché en memoria y en disco para evitar descargas repetidas
+    
+    Returns:
+        shapely.geometry: Geometría MultiPolygon de España
+    
+    Raises:
+        Exception: Si no se puede descargar o procesar la geometría
+    """
+    global _spain_geometry_cache
+    
+    # Verificar caché en memoria
+    if use_cache and _spain_geometry_cache is not None:
+        logger.debug("Usando geometría de España desde caché en memoria")
+        return _spain_geometry_cache
+    
+    spain_geom = None
+    try:
+        if SPAIN_GEOMETRY_FIXTURE:
+            logger.info(f"Cargando geometría de España desde fichero: {SPAIN_GEOMETRY_FIXTURE}")
+            spain_geom = load_geometry_file(SPAIN_GEOMETRY_FIXTURE)
+        elif use_cache:
+            spain_geom = read_spain_geometry_cache(allow_stale=SPAIN_GEOMETRY_OFFLINE)
+        
+        if spain_geom is None and SPAIN_GEOMETRY_OFFLINE:
+            raise ValueError("Modo offline activo y sin caché en disco ni fichero de geometría")
+        
+        if spain_geom is None:
+            spain_geom = download_spain_geometry()
+            if use_cache:
+                write_spain_geometry_cache(spain_geom)
+        
+    except Exception as e:
+        stale_geom = read_spain_geometry_cache(allow_stale=True) if use_cache and not SPAIN_GEOMETRY_FIXTURE else None
+        if stale_geom is None:
+            logger.error(f"Error cargando geometría de España: {e}")
+            raise Exception(f"No se pudo cargar la geometría de España: {e}")
+        logger.warning(f"Error cargando geometría de España ({e}); usando caché en disco caducada")
+        spain_geom = stale_geom
+    
+    # Preparar la geometría (índice interno para contains repetidos)
+    shapely.prepare(spain_geom)
+    
+    # Guardar en caché
+    if use_cache:
+        _spain_geometry_cache = spain_geom
+        logger.debug("Geometría de España guardada en caché en memoria")
+    
+    logger.info("Geometría de España cargada exitosamente")
+    return spain_geom
+
+def download_spain_geometry() -> BaseGeometry:
+    """
+    Descarga la geometría nacional de España desde el WFS del IGN.
+    
+    Returns:
+        BaseGeometry: Geometría en EPSG:4326
+    
+    Raises:
+        ValueError: Si el WFS no devuelve la geometría
+    """
+    logger.info("Descargando geometría de España desde el WFS del IGN...")
+    
+    # Descargar desde el servicio WFS
+    import geopandas as gpd  # importación diferida: arrastra pyproj/GDAL
+    gdf = gpd.read_file(SPAIN_WFS_URL)
+    
+    if gdf.empty:
+        raise ValueError("No se encontró la geometría nacional de España en el WFS")
+    
+    # Verificar que tenemos el CRS correcto (WGS84)
+    if gdf.crs != 'EPSG:4326':
+        logger.info(f"Reproyectando geometría desde {gdf.crs} a EPSG:4326")
+        gdf = gdf.to_crs('EPSG:4326')
+    
+    # Extraer la geometría
+    return gdf.geometry.iloc[0]
+
+class ContainmentCascade:
+    """
+    Comprobación de pertenencia en varias resoluciones con el mismo resultado que la geometría exacta.
+    
+    - Polígono interior (geometría simplificada y reducida hacia dentro): los
+      puntos que contiene están dentro de España sin más comprobaciones.
+    - Envolvente exterior (simplificada y ampliada): los puntos que no
+      contiene están fuera.
+    - Solo los puntos de la franja entre ambos (costa y fronteras) se
+      comprueban contra la geometría exacta.
+    
+    Al construirla se verifica que el interior está contenido en la geometría
+    y que la envolvente la cubre; si no, ese nivel se descarta y se usa la
+    geometría exacta, de modo que las respuestas nunca cambian.
+    """
+    
+    def __init__(self, geometry: BaseGeometry, tolerance: float = SPAIN_CASCADE_TOLERANCE):
+        self.geometry = geometry
+        self.inner: Optional[BaseGeometry] = None
+        self.outer: Optional[BaseGeometry] = None
+        shapely.prepare(geometry)
+        if tolerance <= 0 or shapely.get_num_coordinates(geometry) < SPAIN_CASCADE_MIN_VERTICES:
+            return
+        
+        started = time.perf_counter()
+        simplified = shapely.simplify(geometry, tolerance, preserve_topology=True)
+        # El margen (2 x tolerancia) cubre lo que la simplificación desplaza el contorno
+        inner = shapely.buffer(simplified, -2 * tolerance, quad_segs=2)
+        outer = shapely.buffer(simplified, 2 * tolerance, quad_segs=2)
+        if inner.is_empty:
+            logger.warning("Polígono interior de la cascada vacío con esta tolerancia: se descarta")
+        elif geometry.contains(inner):
+            shapely.prepare(inner)
+            self.inner = inner
+        else:
+            logger.warning("Polígono interior de la cascada no contenido en la geometría: se descarta")
+        shapely.prepare(outer)
+        if outer.covers(geometry):
+            self.outer = outer
+        else:
+            logger.warning("Envolvente de la cascada sin cubrir la geometría: se descarta")
+        logger.info(f"Cascada de contención preparada en {time.perf_counter() - started:.2f}s: "
+                    f"{shapely.get_num_coordinates(geometry)} vértices exactos, "
+                    f"{shapely.get_num_coordinates(inner)} interior, {shapely.get_num_coordinates(outer)} envolvente")
+    
+    def contains_xy(self, lons: np.ndarray, lats: np.ndarray) -> np.ndarray:
+        """
+        Equivalente a shapely.contains_xy(geometry, lons, lats).
+        
+        Args:
+            lons (np.ndarray): Longitudes
+            lats (np.ndarray): Latitudes
+        
+        Returns:
+            np.ndarray: Máscara booleana, True para los puntos contenidos
+        """
+        lons = np.asarray(lons, dtype=float)
+        lats = np.asarray(lats, dtype=float)
+        if self.inner is None and self.outer is None:
+            return shapely.contains_xy(self.geometry, lons, lats)
+        
+        # Franja pendiente: dentro de la envolvente (o todos si no hay) y fuera del interior
+        pending = (shapely.contains_xy(self.outer, lons, lats) if self.outer is not None
+                   else np.ones(lons.shape, dtype=bool))
+        inside = np.zeros(lons.shape, dtype=bool)
+        if self.inner is not None and pending.any():
+            inside[pending] = shapely.contains_xy(self.inner, lons[pending], lats[pending])
+            pending &= ~inside
+        # Se llama también punto a punto (is_point_in_spain): el resumen solo se calcula en modo depuración
+        if logger.isEnabledFor(logging.DEBUG):
+            outside = np.count_nonzero(~pending & ~inside)
+            logger.debug(f"Cascada de contención: {np.count_nonzero(inside)} aceptados por el interior, "
+                         f"{outside} descartados por la envolvente, "
+                         f"{np.count_nonzero(pending)} comprobados con la geometría exacta")
+        if pending.any():
+            inside[pending] = shapely.contains_xy(self.geometry, lons[pending], lats[pending])
+        return inside
+
+# Cascada de la última geometría usada (se reconstruye si cambia la geometría)
+_spain_cascade_cache: Optional[ContainmentCascade] = None
+
+def get_spain_cascade(spain_geom: BaseGeometry) -> ContainmentCascade:
+    """
+    Devuelve la cascada de contención de una geometría, construyéndola la primera vez.
+    
+    Args:
+        spain_geom (BaseGeometry): Geometría de España
+    
+    Returns:
+        ContainmentCascade: Cascada asociada a esa geometría
+    """
+    global _spain_cascade_cache
+    if _spain_cascade_cache is None or _spain_cascade_cache.geometry is not spain_geom:
+        _spain_cascade_cache = ContainmentCascade(spain_geom)
+    return _spain_cascade_cache
 
 def is_point_in_spain(lat: float, lon: float, spain_geom = None) -> bool:
     """
@@ -264,16 +1566,50 @@ def is_point_in_spain(lat: float, lon: float, spain_geom = None) -> bool:
             logger.error(f"Geometría inválida recibida: {type(spain_geom)}")
             return True  # Asumir válido si hay error
         
-        punto = Point(lon, lat)
-               
-        # Verificar si está contenido en España
-        return spain_geom.contains(punto) #type: ignore
+        # Verificar si está contenido en España (cascada interior / envolvente / exacta)
+        return bool(get_spain_cascade(spain_geom).contains_xy(np.array([lon]), np.array([lat]))[0])
         
     except Exception as e:
         logger.warning(f"Error validando punto ({lat}, {lon}) contra geometría de España: {e}")
         # En caso de error, asumir que el punto es válido para no bloquear la importación
         return True
 
+def points_in_spain(lats: np.ndarray, lons: np.ndarray, spain_geom = None) -> np.ndarray:
+    """
+    Verifica en bloque qué puntos están dentro del territorio español.
+    
+    Usa el predicado vectorizado shapely.contains_xy, sin crear un objeto
+    Point por fila, a través de la cascada de contención: la geometría exacta
+    solo se consulta para los puntos cercanos a la costa o la frontera.
+    
+    Args:
+        lats (np.ndarray): Latitudes de los puntos
+        lons (np.ndarray): Longitudes de los puntos
+        spain_geom (BaseGeometry, optional): Geometría de España. Se carga automáticamente si no se proporciona.
+    
+    Returns:
+        np.ndarray: Máscara booleana, True para los puntos dentro de España
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    try:
+        # Cargar geometría si no se proporciona
+        if spain_geom is None:
+            spain_geom = get_spain_geometry()
+        
+        # Verificación adicional de seguridad
+        if not isinstance(spain_geom, BaseGeometry):
+            logger.error(f"Geometría inválida recibida: {type(spain_geom)}")
+            return np.ones(lats.shape, dtype=bool)  # Asumir válidos si hay error
+        
+        return get_spain_cascade(spain_geom).contains_xy(lons, lats)
+        
+    except Exception as e:
+        logger.warning(f"Error validando {lats.size} puntos contra geometría de España: {e}")
+        # En caso de error, asumir que los puntos son válidos para no bloquear la importación
+        return np.ones(lats.shape, dtype=bool)
+
+@instrumented("validate_coordinates_spain")
 def validate_coordinates_spain(lat: float, lon: float) -> Tuple[bool, str]:
     """
     Valida que las coordenadas estén dentro de España con logging detallado.
@@ -308,139 +1644,523 @@ def validate_coordinates_spain(lat: float, lon: float) -> Tuple[bool, str]:
         # En caso de error, permitir el punto pero registrar el problema
         return True, f"Validación geográfica no disponible (permitiendo punto): {e}"
     
+@instrumented("validate_coordinates_spain_batch")
+def validate_coordinates_spain_batch(lats: np.ndarray, lons: np.ndarray) -> Tuple[np.ndarray, List[Optional[str]]]:
+    """
+    Versión vectorizada de validate_coordinates_spain para arrays de coordenadas.
+    
+    Args:
+        lats (np.ndarray): Latitudes
+        lons (np.ndarray): Longitudes
+    
+    Returns:
+        Tuple[np.ndarray, List[Optional[str]]]: (máscara de válidos, mensaje de
+        rechazo por punto o None si es válido)
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    
+    # Validación básica de rangos
+    in_range = (lats >= -90) & (lats <= 90) & (lons >= -180) & (lons <= 180)
+    # Validación específica para España (rangos aproximados, ver validate_coordinates_spain)
+    in_area = in_range & (lats >= 27) & (lats <= 44) & (lons >= -19) & (lons <= 5)
+    
+    # Validación precisa usando geometría, solo para los puntos del área aproximada
+    valid = in_area.copy()
+    if in_area.any():
+        valid[in_area] = points_in_spain(lats[in_area], lons[in_area])
+    
+    messages: List[Optional[str]] = [None] * lats.size
+    for position in np.flatnonzero(~valid):
+        lat, lon = float(lats[position]), float(lons[position])
+        if not in_range[position]:
+            messages[position] = f"Coordenadas fuera de rango geográfico válido: ({lat}, {lon})"
+        elif not in_area[position]:
+            messages[position] = f"Coordenadas fuera del área geográfica de España: ({lat}, {lon})"
+        else:
+            messages[position] = f"Coordenadas fuera del territorio español: ({lat}, {lon})"
+    return valid, messages
+
 # =========================================================================
-# FUNCIONES DE INTERACCIÓN CON BASE DE DATOS
+# CUADRÍCULA UTM DE 10 METROS
 # =========================================================================
 
-def find_existing_session(lat: float, lon: float, timestamp: datetime, operator_id: int) -> Optional[int]:
+# Lado de la celda en metros (el mismo ST_SnapToGrid que get_precise_10m_cell)
+GRID_CELL_SIZE_M = 10.0
+
+def utm_zones_for_longitudes(lons: np.ndarray) -> np.ndarray:
     """
-    Busca sesión existente con tolerancia en coordenadas y tiempo para evitar duplicados.
-    
-    La tolerancia implementada permite pequeñas diferencias que pueden surgir de:
-    - Precisión limitada en dispositivos GPS
-    - Diferencias menores en sincronización temporal
-    
+    Zona UTM de cada punto con la misma regla que get_precise_10m_cell.
+
     Args:
-        lat (float): Latitud
-        lon (float): Longitud  
-        timestamp (datetime): Timestamp de la medición
-        operator_id (int): ID del operador
-    
+        lons (np.ndarray): Longitudes
+
     Returns:
-        Optional[int]: ID de sesión existente o None si no existe
+        np.ndarray: Zonas UTM (28-31, hemisferio norte)
+    """
+    lons = np.asarray(lons, dtype=float)
+    return np.select([lons < -12, lons < -6, lons < 0], [28, 29, 30], default=31)
+
+@functools.lru_cache(maxsize=None)
+def _utm_transformers(zone: int):
+    """Transformaciones WGS84 -> UTM y UTM -> WGS84 de una zona (se crean una sola vez)."""
+    from pyproj import Transformer  # importación diferida, como geopandas
+    utm_crs = f"EPSG:{32600 + zone}"
+    return (Transformer.from_crs("EPSG:4326", utm_crs, always_xy=True),
+            Transformer.from_crs(utm_crs, "EPSG:4326", always_xy=True))
+
+@instrumented("compute_grid_cells")
+def compute_grid_cells(lats: np.ndarray, lons: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Calcula la celda UTM de 10 m de un lote de puntos.
+
+    Reproduce get_precise_10m_cell con una proyección vectorizada por zona:
+    WGS84 -> UTM, ajuste a la rejilla de 10 m (np.rint, igual que
+    ST_SnapToGrid) y vuelta a WGS84 del centro de la celda. El identificador
+    "zona:x:y" usa las coordenadas UTM ajustadas, así que es estable entre
+    ejecuciones y coincide con el de backfill_grid_cells().
+
+    Args:
+        lats (np.ndarray): Latitudes
+        lons (np.ndarray): Longitudes
+
+    Returns:
+        Dict[str, np.ndarray]: Arrays 'utm_zone', 'cell_id', 'cell_lat' y 'cell_lng'
+    """
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    zones = utm_zones_for_longitudes(lons)
+    cell_x = np.empty(lats.size)
+    cell_y = np.empty(lats.size)
+    cell_lat = np.empty(lats.size)
+    cell_lng = np.empty(lats.size)
+
+    for zone in np.unique(zones):
+        mask = zones == zone
+        to_utm, to_wgs84 = _utm_transformers(int(zone))
+        x, y = to_utm.transform(lons[mask], lats[mask])
+        cell_x[mask] = np.rint(np.asarray(x) / GRID_CELL_SIZE_M) * GRID_CELL_SIZE_M
+        cell_y[mask] = np.rint(np.asarray(y) / GRID_CELL_SIZE_M) * GRID_CELL_SIZE_M
+        cell_lng[mask], cell_lat[mask] = to_wgs84.transform(cell_x[mask], cell_y[mask])
+
+    cell_ids = np.array([f"{zone}:{x}:{y}" for zone, x, y in zip(
+        zones, cell_x.astype(np.int64), cell_y.astype(np.int64))], dtype=object)
+    return {
+        'utm_zone': zones,
+        'cell_id': cell_ids,
+        'cell_lat': np.round(cell_lat, 8),
+        'cell_lng': np.round(cell_lng, 8),
+    }
+
+@instrumented("refresh_grid_cells")
+def refresh_grid_cells(cell_ids: List[str]) -> int:
+    """
+    Recalcula los agregados (signal_grid_cells, pollution_grid_cells) de las celdas tocadas.
+
+    Se recalculan las celdas completas en lugar de sumar deltas porque los
+    upserts pueden sustituir el valor de una medición ya agregada.
+
+    Args:
+        cell_ids (List[str]): Identificadores de celda con mediciones nuevas o modificadas
+
+    Returns:
+        int: Filas de agregados de señal recalculadas (0 si no se pudo actualizar)
     """
+    if not cell_ids:
+        return 0
+    storage = get_storage()
     try:
-        cur.execute("""
-            SELECT id FROM measurement_sessions 
-            WHERE ABS(latitude - %s) < 0.00000001
-            AND ABS(longitude - %s) < 0.00000001
-            AND ABS(EXTRACT(EPOCH FROM (timestamp_recorded - %s))) < 60
-            AND operator_id = %s
-            LIMIT 1
-        """, (lat, lon, timestamp, operator_id))
-        
-        result = cur.fetchone()
-        return result[0] if result else None
-    except psycopg2.Error as e:
-        logger.error(f"Error buscando sesión existente: {e}")
-        return None
+        refreshed = storage.refresh_grid_cells(sorted(cell_ids))
+        logger.info(f"Agregados por celda actualizados: {len(cell_ids)} celdas")
+        return refreshed
+    except storage.errors as e:
+        # Las mediciones ya están guardadas: la siguiente ejecución que toque
+        # la celda (o backfill_grid_cells) recalcula el agregado
+        logger.error(f"Error actualizando agregados por celda: {e}")
+        return 0
 
-def insert_or_get_session(lat: float, lon: float, timestamp: datetime, operator_id: int) -> Tuple[Optional[int], bool]:
+def backfill_grid_cells() -> int:
     """
-    Inserta una nueva sesión de medición o retorna una existente.
+    Calcula la celda de las sesiones guardadas antes de calcularla en el
+    importador y rellena los agregados por celda.
     
-    Args:
-        lat (float): Latitud
-        lon (float): Longitud
-        timestamp (datetime): Timestamp de la medición
-        operator_id (int): ID del operador
+    Las vistas del mapa leen solo los agregados: en una instalación anterior
+    hay que ejecutarlo una vez tras actualizar el esquema (--backfill-celdas).
+    Se puede relanzar: solo toca las sesiones sin celda y recalcula los agregados.
     
     Returns:
-        Tuple[Optional[int], bool]: (session_id, is_new_session)
+        int: Sesiones actualizadas (0 si no se pudo completar)
     """
-    # Verificar si existe sesión similar
-    existing_id = find_existing_session(lat, lon, timestamp, operator_id)
-    if existing_id:
-        logger.debug(f"Sesión existente identificada: ID {existing_id}")
-        return existing_id, False
-    
-    # Crear nueva sesión
+    storage = get_storage()
     try:
-        cur.execute("""
-            INSERT INTO measurement_sessions 
-            (location, latitude, longitude, timestamp_recorded, operator_id, created_at, updated_at)
-            VALUES (ST_SetSRID(ST_MakePoint(%s, %s), 4326), %s, %s, %s, %s, NOW(), NOW())
-            RETURNING id;
-        """, (lon, lat, lat, lon, timestamp, operator_id))
+        updated = storage.backfill_grid_cells()
+    except storage.errors as e:
+        logger.error(f"Error calculando las celdas de las sesiones existentes: {e}")
+        return 0
+    logger.info(f"Celdas calculadas: {updated} sesiones actualizadas y agregados por celda recalculados")
+    return updated
+
+# =========================================================================
+# ASIGNACIÓN DE PROVINCIAS
+# =========================================================================
+
+class ProvinceIndex:
+    """
+    Índice espacial en memoria (STRtree) de los polígonos de provincias_cyl.
+    
+    Sustituye el ST_Within por sesión de las funciones de gráficas: los
+    polígonos se cargan una sola vez y cada lote de puntos se asigna con una
+    única consulta vectorizada al árbol.
+    """
+    
+    def __init__(self, province_ids: List[int], geometries: List[BaseGeometry]):
+        """
+        Args:
+            province_ids (List[int]): IDs de provincias_cyl
+            geometries (List[BaseGeometry]): Polígono de cada provincia (WGS84)
+        """
+        self.province_ids = np.asarray(province_ids, dtype=np.int64)
+        self.tree = shapely.STRtree(np.asarray(geometries, dtype=object))
+    
+    def __len__(self) -> int:
+        return len(self.province_ids)
+    
+    def lookup(self, lats: np.ndarray, lons: np.ndarray) -> List[Optional[int]]:
+        """
+        Provincia que contiene cada punto (mismo criterio que ST_Within).
         
-        result = cur.fetchone()
-        if result is not None:
-            session_id = result[0]
-            logger.debug(f"Nueva sesión de medición creada: ID {session_id}")
-            return session_id, True
-        else:
-            logger.error("Error: No se pudo obtener el ID de la sesión creada")
-            return None, False
+        Args:
+            lats (np.ndarray): Latitudes
+            lons (np.ndarray): Longitudes
         
-    except psycopg2.Error as e:
-        logger.error(f"Error creando nueva sesión: {e}")
-        return None, False
+        Returns:
+            List[Optional[int]]: ID de provincia por punto o None si no está en ninguna
+        """
+        points = shapely.points(np.asarray(lons, dtype=float), np.asarray(lats, dtype=float))
+        if len(self) == 0 or points.size == 0:
+            return [None] * points.size
+        
+        point_positions, tree_positions = self.tree.query(points, predicate="within")
+        # Con polígonos solapados prevalece el de menor ID (resultado determinista)
+        no_province = np.iinfo(np.int64).max
+        result = np.full(points.size, no_province, dtype=np.int64)
+        np.minimum.at(result, point_positions, self.province_ids[tree_positions])
+        return [None if province_id == no_province else int(province_id) for province_id in result]
 
-def upsert_signal_measurement(session_id: int, signal_type_code: str, strength: Union[int, float, str]) -> bool:
+def load_province_index() -> ProvinceIndex:
     """
-    Inserta o actualiza una medición de intensidad de señal.
+    Carga los polígonos de provincias_cyl desde la base de datos.
+    
+    Returns:
+        ProvinceIndex: Índice de provincias (vacío si no se pudieron cargar)
+    """
+    storage = get_storage()
+    try:
+        rows = storage.load_provinces()
+    except storage.errors as e:
+        logger.error(f"Error cargando provincias: {e}")
+        rows = []
+    
+    geometries = shapely.from_wkb([wkb for _, wkb in rows]) if rows else []
+    index = ProvinceIndex([province_id for province_id, _ in rows], list(geometries))
+    logger.info(f"Índice de provincias cargado: {len(index)} polígonos")
+    return index
+
+def backfill_provinces(batch_size: int = BULK_BATCH_SIZE) -> int:
+    """
+    Asigna provincia a las sesiones ya guardadas que no la tienen.
+    
+    Recorre measurement_sessions por bloques de ID (cada bloque se confirma
+    por separado, así que se puede interrumpir y relanzar) y recalcula los
+    agregados de las celdas afectadas.
     
     Args:
-        session_id (int): ID de la sesión de medición
-        signal_type_code (str): Código del tipo de señal (ej: "4G", "5G")
-        strength (Union[int, float, str]): Intensidad de señal en dBm
+        batch_size (int): Sesiones por bloque
     
     Returns:
-        bool: True si la operación fue exitosa, False en caso contrario
+        int: Sesiones actualizadas
     """
-    # Validar tipo de señal
-    signal_type_id = signal_types_dict.get(signal_type_code.upper())
-    if signal_type_id is None:
-        logger.warning(f"Tipo de señal no reconocido: {signal_type_code}")
-        return False
+    province_index = get_importer().province_index
+    if len(province_index) == 0:
+        logger.warning("No hay provincias cargadas: no se puede asignar provincia a las sesiones")
+        return 0
     
-    # Validar y convertir intensidad de señal
+    storage = get_storage()
+    last_id = 0
+    updated = 0
+    while True:
+        rows = storage.sessions_without_province(last_id, batch_size)
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        
+        provinces = province_index.lookup(np.array([float(r[1]) for r in rows]),
+                                          np.array([float(r[2]) for r in rows]))
+        assigned = [(row, province_id) for row, province_id in zip(rows, provinces) if province_id is not None]
+        if assigned:
+            storage.assign_provinces([row[0] for row, _ in assigned],
+                                     [province_id for _, province_id in assigned])
+            refresh_grid_cells(list({row[3] for row, _ in assigned if row[3] is not None}))
+            updated += len(assigned)
+        logger.info(f"Provincias asignadas: {updated} sesiones (revisadas hasta ID {last_id})")
+    
+    logger.info(f"Asignación de provincias completada: {updated} sesiones actualizadas")
+    return updated
+
+# =========================================================================
+# ÍNDICE EN MEMORIA DE SESIONES
+# =========================================================================
+# Tolerancia temporal para considerar dos filas la misma sesión (find_existing_session)
+SESSION_TIME_TOLERANCE = timedelta(seconds=60)
+
+class SessionIndex:
+    """
+    Índice espacio-temporal en memoria de measurement_sessions.
+    
+    Agrupa las sesiones por operador, coordenadas (8 decimales, la precisión
+    de las columnas) y cubeta temporal del tamaño de SESSION_TIME_TOLERANCE,
+    de modo que la búsqueda con tolerancia de find_existing_session se
+    resuelve consultando solo tres cubetas. Se carga una vez por ventana
+    temporal y se amplía con las sesiones creadas durante la importación.
+    """
+    
+    _EPOCH = datetime(1970, 1, 1)
+    
+    def __init__(self, tolerance: timedelta = SESSION_TIME_TOLERANCE):
+        self.tolerance = tolerance
+        self._buckets: Dict[tuple, List[Tuple[datetime, int]]] = {}
+        self._session_keys: Dict[int, tuple] = {}
+        self._window: Optional[Tuple[datetime, datetime]] = None
+        # Los hilos de importación registran sesiones en paralelo
+        self._lock = threading.Lock()
+    
+    def __len__(self) -> int:
+        return len(self._session_keys)
+    
+    def _bucket(self, timestamp: datetime) -> int:
+        return int((timestamp - self._EPOCH) // self.tolerance)
+    
+    def add(self, session_id: int, lat: float, lon: float, timestamp: datetime, operator_id: int) -> None:
+        """Registra una sesión en el índice."""
+        key = (operator_id, round(float(lat), 8), round(float(lon), 8), self._bucket(timestamp))
+        with self._lock:
+            if session_id in self._session_keys:
+                return
+            self._session_keys[session_id] = key
+            self._buckets.setdefault(key, []).append((timestamp, session_id))
+    
+    def discard(self, session_ids: List[int]) -> None:
+        """Elimina del índice sesiones cuya inserción se ha deshecho."""
+        with self._lock:
+            for session_id in session_ids:
+                key = self._session_keys.pop(session_id, None)
+                if key is None:
+                    continue
+                entries = [entry for entry in self._buckets[key] if entry[1] != session_id]
+                if entries:
+                    self._buckets[key] = entries
+                else:
+                    del self._buckets[key]
+    
+    def find(self, lat: float, lon: float, timestamp: datetime, operator_id: int) -> Optional[int]:
+        """Devuelve una sesión del mismo operador y coordenadas a menos de la tolerancia."""
+        lat, lon = round(float(lat), 8), round(float(lon), 8)
+        bucket = self._bucket(timestamp)
+        with self._lock:
+            for candidate_bucket in (bucket, bucket - 1, bucket + 1):
+                for session_timestamp, session_id in self._buckets.get((operator_id, lat, lon, candidate_bucket), ()):
+                    if abs(session_timestamp - timestamp) < self.tolerance:
+                        return session_id
+        return None
+    
+    def covers(self, timestamp: datetime) -> bool:
+        """Indica si el índice tiene cargadas todas las sesiones que podrían coincidir."""
+        return (self._window is not None
+                and self._window[0] <= timestamp - self.tolerance
+                and timestamp + self.tolerance <= self._window[1])
+    
+    def ensure_window(self, start: datetime, end: datetime) -> None:
+        """
+        Carga desde la base de datos las sesiones de [start, end] (más la
+        tolerancia) que aún no estén en el índice.
+        
+        Args:
+            start (datetime): Primer timestamp a cubrir
+            end (datetime): Último timestamp a cubrir
+        """
+        start, end = start - self.tolerance, end + self.tolerance
+        if self._window is None:
+            ranges = [(start, end)]
+            window = (start, end)
+        else:
+            ranges = []
+            if start < self._window[0]:
+                ranges.append((start, self._window[0]))
+            if end > self._window[1]:
+                ranges.append((self._window[1], end))
+            window = (min(start, self._window[0]), max(end, self._window[1]))
+        
+        loaded = 0
+        storage = get_storage()
+        for range_start, range_end in ranges:
+            for session_id, lat, lon, timestamp, operator_id in storage.sessions_between(range_start, range_end):
+                self.add(session_id, lat, lon, timestamp, operator_id)
+                loaded += 1
+        self._window = window
+        if ranges:
+            logger.info(f"Índice de sesiones: {loaded} sesiones cargadas para "
+                        f"{window[0]:%Y-%m-%d %H:%M} - {window[1]:%Y-%m-%d %H:%M}")
+
+def prepare_session_index(records: List[Dict[str, Any]]) -> Optional[SessionIndex]:
+    """
+    Crea o amplía el índice de sesiones para la ventana temporal de los registros.
+    
+    Args:
+        records (List[Dict[str, Any]]): Registros a guardar
+    
+    Returns:
+        Optional[SessionIndex]: Índice listo o None si está desactivado o falla la carga
+    """
+    importer = get_importer()
+    if not SESSION_INDEX_ENABLED or not records:
+        return importer.session_index
+    
+    timestamps = [record['timestamp'] for record in records]
     try:
-        if pd.isna(strength):
-            return False
-            
-        strength_int = int(float(strength))
+        if importer.session_index is None:
+            importer.session_index = SessionIndex()
+        importer.session_index.ensure_window(min(timestamps), max(timestamps))
+    except importer.storage.errors as e:
+        logger.warning(f"No se pudo cargar el índice de sesiones, se consultará la base de datos: {e}")
+        importer.session_index = None
+    return importer.session_index
+
+# =========================================================================
+# FUNCIONES DE INTERACCIÓN CON BASE DE DATOS
+# =========================================================================
+
+# Rangos admitidos por las restricciones CHECK / DECIMAL(10,4) de las tablas.
+# Los valores fuera de ellos se descartan antes de enviarlos: dentro de una
+# transacción un error de restricción abortaría la fila o el lote completo.
+DB_SIGNAL_DBM_RANGE = (-140, -30)
+DB_MAX_CONCENTRATION = Decimal("999999.9999")
+
+@instrumented("find_existing_session")
+def find_existing_session(lat: float, lon: float, timestamp: datetime, operator_id: int) -> Optional[int]:
+    """
+    Busca sesión existente con tolerancia en coordenadas y tiempo para evitar duplicados.
+    
+    La tolerancia implementada permite pequeñas diferencias que pueden surgir de:
+    - Precisión limitada en dispositivos GPS
+    - Diferencias menores en sincronización temporal
+    
+    Args:
+        lat (float): Latitud
+        lon (float): Longitud  
+        timestamp (datetime): Timestamp de la medición
+        operator_id (int): ID del operador
+    
+    Returns:
+        Optional[int]: ID de sesión existente o None si no existe
+    """
+    storage = get_storage()
+    try:
+        return storage.find_session(lat, lon, timestamp, operator_id)
+    except storage.errors as e:
+        logger.error(f"Error buscando sesión existente: {e}")
+        return None
+
+@instrumented("insert_or_get_session")
+def insert_or_get_session(lat: float, lon: float, timestamp: datetime, operator_id: int,
+                          cell: Optional[Tuple[int, str, float, float]] = None,
+                          provincia_id: Optional[int] = None) -> Tuple[Optional[int], bool]:
+    """
+    Inserta una nueva sesión de medición o retorna una existente.
+    
+    Args:
+        lat (float): Latitud
+        lon (float): Longitud
+        timestamp (datetime): Timestamp de la medición
+        operator_id (int): ID del operador
+        cell (Tuple[int, str, float, float], optional): (utm_zone, cell_id, cell_lat, cell_lng)
+            ya calculada por prepare_dataframe; si falta se calculan la celda y la provincia
+        provincia_id (int, optional): Provincia asignada por prepare_dataframe (None si no está en ninguna)
+    
+    Returns:
+        Tuple[Optional[int], bool]: (session_id, is_new_session)
+    """
+    storage = get_storage()
+    session_index = get_importer().session_index
+    # Verificar si existe sesión similar (en el índice en memoria si cubre el timestamp)
+    if session_index is not None and session_index.covers(timestamp):
+        existing_id = session_index.find(lat, lon, timestamp, operator_id)
+    else:
+        existing_id = find_existing_session(lat, lon, timestamp, operator_id)
+    if existing_id:
+        logger.debug(f"Sesión existente identificada: ID {existing_id}")
+        return existing_id, False
+    
+    # Crear nueva sesión con su celda de 10 m y su provincia
+    if cell is None:
+        grid = compute_grid_cells([lat], [lon])
+        cell = (int(grid['utm_zone'][0]), grid['cell_id'][0],
+                float(grid['cell_lat'][0]), float(grid['cell_lng'][0]))
+        provincia_id = get_importer().province_index.lookup([lat], [lon])[0]
+    try:
+        session_id = storage.insert_session(lat, lon, timestamp, operator_id, cell, provincia_id)
+        if session_id is not None:
+            if session_index is not None:
+                session_index.add(session_id, lat, lon, timestamp, operator_id)
+            logger.debug(f"Nueva sesión de medición creada: ID {session_id}")
+            return session_id, True
+        else:
+            logger.error("Error: No se pudo obtener el ID de la sesión creada")
+            return None, False
         
-        # Validar rango típico de potencia de señal en dBm
-        if not (-150 <= strength_int <= 0):
-            logger.warning(f"Intensidad de señal fuera de rango esperado: {strength_int} dBm")
-            return False
-            
-    except (ValueError, TypeError) as e:
-        logger.warning(f"Error procesando intensidad de señal '{strength}': {e}")
+    except storage.errors as e:
+        logger.error(f"Error creando nueva sesión: {e}")
+        return None, False
+
+@instrumented("upsert_signal_measurement")
+def upsert_signal_measurement(session_id: int, signal_type_code: str, strength: Union[int, float, str]) -> bool:
+    """
+    Inserta o actualiza una medición de intensidad de señal.
+    
+    Args:
+        session_id (int): ID de la sesión de medición
+        signal_type_code (str): Código del tipo de señal (ej: "4G", "5G")
+        strength (Union[int, float, str]): Intensidad de señal en dBm
+    
+    Returns:
+        bool: True si la operación fue exitosa, False en caso contrario
+    """
+    storage = get_storage()
+    # Validar tipo de señal
+    signal_type_id = get_importer().signal_types.get(signal_type_code.upper())
+    if signal_type_id is None:
+        logger.warning(f"Tipo de señal no reconocido: {signal_type_code}")
+        return False
+    
+    # Validar y convertir intensidad de señal
+    strength_int = parse_signal_strength(strength)
+    if strength_int is None:
+        return False
+    if not (DB_SIGNAL_DBM_RANGE[0] <= strength_int <= DB_SIGNAL_DBM_RANGE[1]):
+        logger.error(f"Error procesando medición de señal {signal_type_code}: "
+                     f"{strength_int} dBm fuera del rango admitido por la base de datos")
         return False
     
     # Realizar upsert en base de datos
     try:
-        cur.execute("""
-            INSERT INTO signal_measurements 
-            (session_id, signal_type_id, signal_strength_dbm, created_at, updated_at, 
-             data_source, measurement_method, quality_flag)
-            VALUES (%s, %s, %s, NOW(), NOW(), 'forms', 'mobile', 'valid')
-            ON CONFLICT (session_id, signal_type_id) 
-            DO UPDATE SET 
-                signal_strength_dbm = EXCLUDED.signal_strength_dbm,
-                updated_at = NOW(),
-                quality_flag = 'valid';
-        """, (session_id, signal_type_id, strength_int))
-        
+        storage.upsert_signal(session_id, signal_type_id, strength_int)
         logger.debug(f"Medición de señal {signal_type_code} procesada: {strength_int} dBm")
         return True
         
-    except psycopg2.Error as e:
+    except storage.errors as e:
         logger.error(f"Error procesando medición de señal {signal_type_code}: {e}")
         return False
 
+@instrumented("upsert_pollutant_measurement")
 def upsert_pollutant_measurement(session_id: int, pollutant_code: str, concentration: Union[int, float, str]) -> bool:
     """
     Inserta o actualiza una medición de concentración de contaminante.
@@ -453,46 +2173,29 @@ def upsert_pollutant_measurement(session_id: int, pollutant_code: str, concentra
     Returns:
         bool: True si la operación fue exitosa, False en caso contrario
     """
+    storage = get_storage()
     # Validar tipo de contaminante
-    pollutant_id = pollutants_dict.get(pollutant_code.lower())
+    pollutant_id = get_importer().pollutants.get(pollutant_code.lower())
     if pollutant_id is None:
         logger.warning(f"Tipo de contaminante no reconocido: {pollutant_code}")
         return False
     
     # Validar y convertir concentración
-    try:
-        if pd.isna(concentration):
-            return False
-            
-        concentration_decimal = Decimal(str(float(concentration)))
-        
-        # Validar que la concentración no sea negativa
-        if concentration_decimal < 0:
-            logger.warning(f"Concentración negativa detectada: {concentration_decimal}")
-            return False
-            
-    except (ValueError, TypeError, InvalidOperation) as e:
-        logger.warning(f"Error procesando concentración '{concentration}': {e}")
+    concentration_decimal = parse_concentration(concentration)
+    if concentration_decimal is None:
+        return False
+    if concentration_decimal > DB_MAX_CONCENTRATION:
+        logger.error(f"Error procesando medición de contaminante {pollutant_code}: "
+                     f"{concentration_decimal} excede la precisión de la columna")
         return False
     
     # Realizar upsert en base de datos
     try:
-        cur.execute("""
-            INSERT INTO pollution_measurements 
-            (session_id, pollutant_type_id, concentration, created_at, updated_at,
-             data_source, measurement_method, quality_flag)
-            VALUES (%s, %s, %s, NOW(), NOW(), 'forms', 'domestic_sensor', 'valid')
-            ON CONFLICT (session_id, pollutant_type_id)
-            DO UPDATE SET 
-                concentration = EXCLUDED.concentration,
-                updated_at = NOW(),
-                quality_flag = 'valid';
-        """, (session_id, pollutant_id, concentration_decimal))
-        
+        storage.upsert_pollutant(session_id, pollutant_id, concentration_decimal)
         logger.debug(f"Medición de contaminante {pollutant_code.upper()} procesada: {concentration_decimal}")
         return True
         
-    except psycopg2.Error as e:
+    except storage.errors as e:
         logger.error(f"Error procesando medición de contaminante {pollutant_code}: {e}")
         return False
 
@@ -500,10 +2203,15 @@ def upsert_pollutant_measurement(session_id: int, pollutant_code: str, concentra
 # FUNCIONES DE CARGA Y PROCESAMIENTO DE DATOS
 # =========================================================================
 
+@instrumented("load_csv_from_sheets")
 def load_csv_from_sheets(url: str) -> pd.DataFrame:
     """
     Descarga y carga datos CSV desde Google Sheets.
     
+    La codificación se decide una sola vez sobre los bytes descargados
+    (detect_encoding), se decodifica y se analiza el CSV en una única pasada
+    y los textos con mojibake se reparan con repair_mojibake_dataframe.
+    
     Args:
         url (str): URL del CSV exportable de Google Sheets
     
@@ -519,33 +2227,17 @@ def load_csv_from_sheets(url: str) -> pd.DataFrame:
         response = requests.get(url, timeout=30)
         response.raise_for_status()
         
-        # Detectar y manejar diferentes encodings
-        encodings_to_try = ['utf-8', 'utf-8-sig', 'latin1', 'cp1252', 'iso-8859-1']
-        df = None
+        content = response.content
+        encoding = detect_encoding(content, get_remembered_encoding(url), complete=True)
+        logger.info(f"CSV decodificado con encoding: {encoding}")
+        remember_encoding(url, encoding)
         
-        for encoding in encodings_to_try:
-            try:
-                logger.debug(f"Intentando cargar CSV con encoding: {encoding}")
-                # Usar response.content y controlar la decodificación
-                content = response.content.decode(encoding)
-                df = pd.read_csv(StringIO(content))
-                logger.info(f"CSV cargado exitosamente con encoding: {encoding}")
-                break
-            except (UnicodeDecodeError, pd.errors.ParserError) as e:
-                logger.debug(f"Encoding {encoding} falló: {e}")
-                continue
-        
-        if df is None:
-            logger.warning("Todos los encodings estándar fallaron, usando limpieza de caracteres")
-            content = response.content.decode(errors="replace")  # Decodificar reemplazando errores
-            # Reemplazar manualmente caracteres malformados comunes
-            content = (content.replace('Ã³', 'ó').replace('Ã¡', 'á')
-                             .replace('Ã©', 'é').replace('Ã­', 'í')
-                             .replace('Ãº', 'ú'))
-            df = pd.read_csv(StringIO(content))
-        
-        df.columns = df.columns.str.strip()
-        logger.debug(f"Columnas después de limpieza: {list(df.columns)}")
+        text = content.decode(encoding)
+        if CSV_ENGINE == "pyarrow":
+            df = read_csv_pyarrow(text)
+        else:
+            df = pd.read_csv(StringIO(text), dtype=str, usecols=is_import_column)
+        df = apply_column_types(repair_mojibake_dataframe(df))
         
         logger.info(f"Datos cargados exitosamente: {len(df)} registros, {len(df.columns)} columnas")
         logger.debug(f"Columnas finales: {list(df.columns)}")
@@ -562,223 +2254,2610 @@ def load_csv_from_sheets(url: str) -> pd.DataFrame:
         logger.error(f"Error procesando CSV: {e}")
         raise
 
-def validate_row_data(row: pd.Series) -> Tuple[bool, str]:
+# =========================================================================
+# LECTURA EN STREAMING (URL, FICHERO LOCAL O STDIN)
+# =========================================================================
+
+@contextmanager
+def open_csv_source(source: str) -> Iterator[io.BufferedReader]:
+    """
+    Abre una fuente CSV como flujo binario sin cargarla entera en memoria.
+    
+    Args:
+        source (str): URL http(s), ruta a un fichero local o "-" para stdin
+    
+    Yields:
+        io.BufferedReader: Flujo binario con soporte de peek()
+    
+    Raises:
+        Exception: Si la descarga falla o el fichero no existe
+    """
+    if source == "-":
+        logger.info("Leyendo CSV desde la entrada estándar")
+        yield sys.stdin.buffer
+    elif source.startswith(("http://", "https://")):
+        logger.info("Iniciando descarga en streaming de datos desde Google Sheets")
+        try:
+            response = requests.get(source, timeout=30, stream=True)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logger.error(f"Error descargando CSV: {e}")
+            raise Exception(f"Error de conectividad: {e}")
+        try:
+            response.raw.decode_content = True
+            yield io.BufferedReader(response.raw, buffer_size=CSV_ENCODING_SAMPLE_BYTES)
+        finally:
+            response.close()
+    else:
+        logger.info(f"Leyendo CSV desde fichero local: {source}")
+        with open(source, "rb") as csv_file:
+            yield io.BufferedReader(csv_file, buffer_size=CSV_ENCODING_SAMPLE_BYTES)
+
+# Codificaciones de un solo byte probadas si la muestra no es UTF-8 válido
+# (latin1 acepta cualquier secuencia de bytes, por eso va la última)
+FALLBACK_ENCODINGS = ["cp1252", "latin1"]
+
+@instrumented("detect_encoding")
+def detect_encoding(sample: bytes, preferred: Optional[str] = None, complete: bool = False) -> str:
+    """
+    Detecta la codificación de un CSV a partir de sus bytes, sin decodificar el contenido.
+    
+    Orden de decisión: BOM; si la muestra es ASCII puro no aporta información y
+    se usa la codificación recordada de la última ejecución (o UTF-8); si no,
+    UTF-8 estricto, la codificación recordada y las de FALLBACK_ENCODINGS.
+    
+    Args:
+        sample (bytes): Primeros bytes del fichero (o el contenido completo)
+        preferred (str, optional): Codificación usada con éxito en la ejecución anterior
+        complete (bool): La muestra es el contenido completo, no un prefijo
+    
+    Returns:
+        str: Codificación a usar para decodificar el flujo completo
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if sample.isascii():
+        return preferred or "utf-8"
+    
+    candidates = ["utf-8"] + [preferred] + FALLBACK_ENCODINGS
+    for encoding in dict.fromkeys(c for c in candidates if c and c != "utf-8-sig"):
+        try:
+            # Decodificador incremental: una secuencia multibyte cortada al final
+            # de la muestra no cuenta como error
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=complete)
+            return encoding
+        except (UnicodeDecodeError, LookupError):
+            continue
+    return "latin1"
+
+# Bytes no UTF-8 encontrados más allá de la muestra (el flujo no se puede releer):
+# se decodifican como latin-1 y se cuentan para recordar la codificación
+_decode_fallbacks = threading.local()
+LATIN1_FALLBACK_ERRORS = "latin1_fallback"
+# El registro de manejadores de codecs es global del proceso: se registra en el
+# primer uso, no al importar el módulo
+_latin1_fallback_registered = False
+
+def _latin1_fallback(error: UnicodeDecodeError) -> Tuple[str, int]:
+    _decode_fallbacks.count = getattr(_decode_fallbacks, "count", 0) + (error.end - error.start)
+    return error.object[error.start:error.end].decode("latin-1"), error.end
+
+def latin1_fallback_errors() -> str:
+    """
+    Registra (la primera vez) el manejador de errores de decodificación latin1_fallback.
+    
+    Returns:
+        str: Nombre del manejador para el parámetro errors de los decodificadores
+    """
+    global _latin1_fallback_registered
+    if not _latin1_fallback_registered:
+        codecs.register_error(LATIN1_FALLBACK_ERRORS, _latin1_fallback)
+        _latin1_fallback_registered = True
+    return LATIN1_FALLBACK_ERRORS
+
+# Caracteres con los que empieza un carácter UTF-8 de dos bytes leído como latin-1/cp1252
+# ("Ã³" en lugar de "ó", "Â·" en lugar de "·")
+MOJIBAKE_MARKERS = ("Ã", "Â")
+_MOJIBAKE_PATTERN = "|".join(MOJIBAKE_MARKERS)
+
+def repair_mojibake(text: str) -> str:
+    """
+    Repara un texto UTF-8 que se decodificó como latin-1/cp1252 ("ConcentraciÃ³n").
+    
+    El texto se vuelve a codificar en la codificación de un byte y se decodifica
+    como UTF-8; si esa ida y vuelta no es válida el texto no era mojibake y se
+    devuelve sin cambios.
+    
+    Args:
+        text (str): Texto a reparar
+    
+    Returns:
+        str: Texto reparado o el original
+    """
+    if not isinstance(text, str) or not any(marker in text for marker in MOJIBAKE_MARKERS):
+        return text
+    for encoding in ("latin-1", "cp1252"):
+        try:
+            return text.encode(encoding).decode("utf-8")
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            continue
+    return text
+
+def repair_mojibake_dataframe(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normaliza los nombres de columna (espacios y mojibake) y repara las celdas con mojibake.
+    
+    Args:
+        dataframe (pd.DataFrame): Datos leídos como texto
+    
+    Returns:
+        pd.DataFrame: El mismo DataFrame con columnas y textos reparados
+    """
+    dataframe.columns = [repair_mojibake(str(column).strip()) for column in dataframe.columns]
+    for column in dataframe.columns:
+        values = dataframe[column]
+        if not (pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)):
+            continue
+        suspicious = values.str.contains(_MOJIBAKE_PATTERN, regex=True, na=False)
+        if suspicious.any():
+            dataframe.loc[suspicious, column] = values[suspicious].map(repair_mojibake)
+    return dataframe
+
+def read_csv_pyarrow(text: str) -> pd.DataFrame:
+    """
+    Analiza un CSV completo con el motor pyarrow de pandas (dependencia opcional).
+    
+    El motor pyarrow no admite usecols como función: las columnas se eligen
+    a partir de la cabecera.
+    
+    Args:
+        text (str): CSV ya decodificado
+    
+    Returns:
+        pd.DataFrame: Columnas del importador como texto
+    """
+    header = next(csv.reader(StringIO(text)), [])
+    return pd.read_csv(BytesIO(text.encode("utf-8")), dtype=str, engine="pyarrow",
+                       usecols=[name for name in header if is_import_column(name)])
+
+def iter_csv_chunks(source: str, chunk_size: int = CSV_CHUNK_SIZE, engine: str = "c") -> Iterator[pd.DataFrame]:
+    """
+    Lee una fuente CSV por bloques de filas de tamaño fijo.
+    
+    La memoria máxima depende del tamaño de bloque y no del tamaño de la
+    hoja. El índice de las filas es continuo entre bloques, de modo que los
+    números de registro de los logs coinciden con la carga completa. Solo se
+    cargan las columnas que usa el importador (is_import_column).
+    
+    Args:
+        source (str): URL http(s), ruta a un fichero local o "-" para stdin
+        chunk_size (int): Filas por bloque
+        engine (str): "c" o "pyarrow"; pyarrow no lee por bloques y carga la fuente completa
+    
+    Yields:
+        pd.DataFrame: Bloques de filas con las columnas tipadas (apply_column_types)
+    """
+    with open_csv_source(source) as stream:
+        encoding = detect_encoding(stream.peek(CSV_ENCODING_SAMPLE_BYTES), get_remembered_encoding(source))
+        logger.info(f"Leyendo CSV por bloques de {chunk_size} filas con encoding: {encoding}")
+        remember_encoding(source, encoding)
+        
+        _decode_fallbacks.count = 0
+        text_stream = io.TextIOWrapper(stream, encoding=encoding, newline="",
+                                       errors=latin1_fallback_errors() if encoding.startswith("utf-8") else "strict")
+        try:
+            if engine == "pyarrow":
+                yield apply_column_types(repair_mojibake_dataframe(read_csv_pyarrow(text_stream.read())))
+            else:
+                with pd.read_csv(text_stream, dtype=str, usecols=is_import_column, chunksize=chunk_size) as reader:
+                    for chunk in reader:
+                        yield apply_column_types(repair_mojibake_dataframe(chunk))
+            if _decode_fallbacks.count:
+                logger.warning(f"{_decode_fallbacks.count} bytes no válidos en {encoding} tras la muestra inicial; "
+                               f"decodificados como latin1 (se usará latin1 en la próxima ejecución)")
+                remember_encoding(source, "latin1")
+        except pd.errors.EmptyDataError:
+            logger.error("El archivo CSV está vacío")
+            raise Exception("Archivo CSV vacío")
+        finally:
+            text_stream.detach()
+
+# =========================================================================
+# DESCARGA CONDICIONAL (ETAG / LAST-MODIFIED) CON COPIA LOCAL
+# =========================================================================
+
+# Descargar las fuentes http(s) a una copia local con peticiones condicionales
+CONDITIONAL_DOWNLOAD = os.getenv("IMPORT_CONDITIONAL_DOWNLOAD", "true").strip().lower() in ("1", "true", "yes")
+
+def is_remote_source(source: str) -> bool:
+    """Indica si la fuente es una URL http(s)."""
+    return source.startswith(("http://", "https://"))
+
+def get_snapshot_path(source: str) -> str:
+    """
+    Ruta de la copia local de una fuente remota.
+    
+    Args:
+        source (str): URL de la fuente
+    
+    Returns:
+        str: Ruta del CSV dentro de IMPORT_CACHE_DIR
+    """
+    return os.path.join(IMPORT_CACHE_DIR, f"snapshot_{_source_key(source)}.csv")
+
+@instrumented("fetch_source_snapshot")
+def fetch_source_snapshot(url: str) -> Tuple[str, str]:
+    """
+    Actualiza la copia local de una fuente remota con una petición condicional.
+    
+    Si ya hay copia, se envían If-None-Match / If-Modified-Since con los
+    validadores de la descarga anterior; ante un 304 se reutiliza la copia.
+    Si no, el cuerpo se escribe en disco en streaming calculando su SHA-256 y
+    sustituye a la copia de forma atómica.
+    
+    Args:
+        url (str): URL del CSV
+    
+    Returns:
+        Tuple[str, str]: (ruta de la copia local, SHA-256 del contenido)
+    
+    Raises:
+        Exception: Si la descarga falla
+    """
+    metadata = load_source_metadata(url)
+    snapshot_path = get_snapshot_path(url)
+    has_snapshot = bool(metadata.get('sha256')) and os.path.exists(snapshot_path)
+    
+    headers = {}
+    if has_snapshot and metadata.get('etag'):
+        headers['If-None-Match'] = metadata['etag']
+    if has_snapshot and metadata.get('last_modified'):
+        headers['If-Modified-Since'] = metadata['last_modified']
+    
+    logger.info(f"Descargando datos desde Google Sheets{' (petición condicional)' if headers else ''}")
+    try:
+        response = requests.get(url, timeout=30, stream=True, headers=headers)
+        try:
+            if response.status_code == 304 and has_snapshot:
+                logger.info("Sin cambios en el servidor (304 Not Modified): se usa la copia local")
+                return snapshot_path, metadata['sha256']
+            response.raise_for_status()
+            
+            os.makedirs(IMPORT_CACHE_DIR, exist_ok=True)
+            digest = hashlib.sha256()
+            size = 0
+            descriptor, temp_path = tempfile.mkstemp(dir=IMPORT_CACHE_DIR, prefix=".snapshot_")
+            try:
+                with os.fdopen(descriptor, "wb") as snapshot_file:
+                    for block in response.iter_content(chunk_size=CSV_ENCODING_SAMPLE_BYTES):
+                        digest.update(block)
+                        snapshot_file.write(block)
+                        size += len(block)
+                os.replace(temp_path, snapshot_path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+        finally:
+            response.close()
+    except requests.RequestException as e:
+        logger.error(f"Error descargando CSV: {e}")
+        raise Exception(f"Error de conectividad: {e}")
+    
+    content_hash = digest.hexdigest()
+    save_source_metadata(url, etag=response.headers.get('ETag'),
+                         last_modified=response.headers.get('Last-Modified'),
+                         sha256=content_hash, size=size,
+                         downloaded_at=datetime.now().isoformat(timespec='seconds'))
+    unchanged = content_hash == metadata.get('sha256')
+    logger.info(f"Hoja descargada: {size} bytes{' (contenido idéntico a la copia anterior)' if unchanged else ''}")
+    return snapshot_path, content_hash
+
+# Columnas del formulario con mediciones y su código en la base de datos
+SIGNAL_COLUMNS = [("Intensidad 4G", "4G"), ("Intensidad 5G", "5G")]
+POLLUTANT_COLUMNS = {
+    "Concentración PM 2.5": "pm25",
+    "ConcentraciÃ³n PM 2.5": "pm25",
+    "Concentración PM 10": "pm10",
+    "ConcentraciÃ³n PM 10": "pm10", 
+    "Concentración CO": "co",
+    "ConcentraciÃ³n CO": "co",
+    "Concentración CO2": "co2",
+    "ConcentraciÃ³n CO2": "co2"
+}
+REQUIRED_COLUMNS = ["Marca temporal", "OPERADOR", "COORDENADAS_LIMPIAS"]
+# Tipos de las mediciones: las intensidades (dBm enteros) caben exactas en
+# float32; las concentraciones necesitan float64 para las 10 cifras de DECIMAL(10, 4)
+SIGNAL_DTYPE = np.float32
+CONCENTRATION_DTYPE = np.float64
+
+def is_import_column(name: str) -> bool:
+    """
+    Indica si una columna de la cabecera la usa el importador.
+    
+    Solo se cargan las columnas obligatorias y las de mediciones (en ambas
+    grafías); el texto libre y las columnas auxiliares de la hoja no se leen.
+    
+    Args:
+        name (str): Nombre de la columna tal y como aparece en el CSV
+    
+    Returns:
+        bool: True si la columna se carga
+    """
+    used = REQUIRED_COLUMNS + [field for field, _ in SIGNAL_COLUMNS] + list(POLLUTANT_COLUMNS)
+    return repair_mojibake(str(name).strip()) in {repair_mojibake(field) for field in used}
+
+def apply_column_types(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convierte las columnas leídas como texto a los tipos del esquema.
+    
+    OPERADOR pasa a categórica (unos pocos valores repetidos en todas las
+    filas) y las mediciones a SIGNAL_DTYPE / CONCENTRATION_DTYPE. Los valores
+    no numéricos se registran y quedan vacíos, igual que los descartaban
+    parse_signal_strength y parse_concentration.
+    
+    Args:
+        dataframe (pd.DataFrame): Datos leídos como texto (con mojibake ya reparado)
+    
+    Returns:
+        pd.DataFrame: El mismo DataFrame con las columnas tipadas
+    """
+    if "OPERADOR" in dataframe.columns:
+        dataframe["OPERADOR"] = dataframe["OPERADOR"].astype("category")
+    
+    numeric_columns = {field: SIGNAL_DTYPE for field, _ in SIGNAL_COLUMNS}
+    numeric_columns.update({field: CONCENTRATION_DTYPE for field in POLLUTANT_COLUMNS})
+    for column, dtype in numeric_columns.items():
+        if column not in dataframe.columns or pd.api.types.is_numeric_dtype(dataframe[column]):
+            continue
+        raw = dataframe[column]
+        numeric = pd.to_numeric(raw, errors='coerce')
+        for index in raw.index[raw.notna() & numeric.isna()]:
+            try:
+                numeric[index] = float(raw[index])
+            except ValueError:
+                logger.warning(f"Registro {int(index) + 1}: valor no numérico en '{column}': '{raw[index]}'")
+        dataframe[column] = numeric.astype(dtype)
+    return dataframe
+
+def validate_row_data(row: pd.Series) -> Tuple[bool, str]:
+    """
+    Valida que una fila contenga los datos mínimos requeridos.
+    
+    Args:
+        row (pd.Series): Fila de datos del DataFrame
+    
+    Returns:
+        Tuple[bool, str]: (is_valid, error_message)
+    """
+    # Campos obligatorios
+    missing_fields = []
+    
+    for field in REQUIRED_COLUMNS:
+        if field not in row or pd.isna(row[field]) or not str(row[field]).strip():
+            missing_fields.append(field)
+    
+    if missing_fields:
+        return False, f"Campos obligatorios faltantes: {', '.join(missing_fields)}"
+    
+    # Verificar que exista al menos una medición válida
+    signal_fields = [field for field, _ in SIGNAL_COLUMNS]
+    pollutant_fields = list(POLLUTANT_COLUMNS)
+    
+    has_signal = any(field in row and not pd.isna(row[field]) for field in signal_fields)
+    has_pollutant = any(field in row and not pd.isna(row[field]) for field in pollutant_fields)
+    
+    if not (has_signal or has_pollutant):
+        return False, "No se encontraron mediciones válidas (señal o contaminantes)"
+    
+    return True, "Validación exitosa"
+
+# =========================================================================
+# PROCESAMIENTO COLUMNAR (VECTORIZADO)
+# =========================================================================
+
+def detect_timestamp_format(values: pd.Series, sample_size: int = 50) -> Optional[str]:
+    """
+    Detecta el formato de timestamp dominante de una columna a partir de una muestra.
+    
+    Args:
+        values (pd.Series): Columna de timestamps como texto
+        sample_size (int): Número de valores no vacíos a examinar
+    
+    Returns:
+        Optional[str]: Formato de TIMESTAMP_FORMATS con más aciertos o None
+    """
+    sample = values.dropna().astype(str).str.strip()
+    sample = sample[sample != ""].head(sample_size)
+    
+    best_format, best_hits = None, 0
+    for fmt in TIMESTAMP_FORMATS:
+        hits = int(pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum())
+        if hits > best_hits:
+            best_format, best_hits = fmt, hits
+    return best_format
+
+def parse_timestamp_column(values: pd.Series) -> pd.Series:
+    """
+    Convierte una columna de timestamps detectando el formato una sola vez.
+    
+    Las filas con otro formato se convierten de forma vectorizada con el resto
+    de TIMESTAMP_FORMATS y solo las que siguen sin convertirse pasan por
+    parse_timestamp, que registra el aviso correspondiente.
+    
+    Args:
+        values (pd.Series): Columna "Marca temporal"
+    
+    Returns:
+        pd.Series: Objetos datetime (None donde el timestamp no es válido)
+    """
+    text = values.astype(str).str.strip()
+    detected = detect_timestamp_format(text)
+    
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    for fmt in ([detected] if detected else []) + [f for f in TIMESTAMP_FORMATS if f != detected]:
+        pending = parsed.isna()
+        if not pending.any():
+            break
+        parsed[pending] = pd.to_datetime(text[pending], format=fmt, errors='coerce')
+    
+    result = pd.Series([None] * len(values), index=values.index, dtype=object)
+    valid = parsed.notna()
+    result[valid] = list(parsed[valid].dt.to_pydatetime())
+    for index in values.index[~valid]:
+        result[index] = parse_timestamp(values[index])
+    return result
+
+def parse_location_column(values: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """
+    Separa "COORDENADAS_LIMPIAS" en dos columnas numéricas en una sola pasada.
+    
+    Los valores que no se pueden convertir de forma vectorizada se procesan
+    con parse_location para conservar exactamente sus reglas y avisos.
+    
+    Args:
+        values (pd.Series): Columna con coordenadas "latitud,longitud"
+    
+    Returns:
+        Tuple[pd.Series, pd.Series]: (latitudes, longitudes) con NaN si no son válidas
+    """
+    text = values.astype(str)
+    parts = text.str.split(",", n=1, expand=True).reindex(columns=[0, 1])
+    single_comma = text.str.count(",") == 1
+    
+    lats = pd.to_numeric(parts[0].str.strip(), errors='coerce').where(single_comma)
+    lons = pd.to_numeric(parts[1].str.strip(), errors='coerce').where(single_comma)
+    # round() de Python como parse_location: Series.round escala con numpy y
+    # con más de 8 decimales puede dar un float distinto en la última cifra
+    lats = lats.map(lambda value: round(value, 8), na_action='ignore')
+    lons = lons.map(lambda value: round(value, 8), na_action='ignore')
+    
+    # Validación de rangos geográficos válidos
+    in_range = lats.between(-90, 90) & lons.between(-180, 180)
+    for index in values.index[lats.notna() & lons.notna() & ~in_range]:
+        logger.warning(f"Coordenadas fuera de rango válido: {lats[index]}, {lons[index]}")
+    unparsed = lats.isna() | lons.isna()
+    lats, lons = lats.where(in_range), lons.where(in_range)
+    
+    for index in values.index[unparsed]:
+        lat, lon = parse_location(text[index])
+        lats[index] = np.nan if lat is None else lat
+        lons[index] = np.nan if lon is None else lon
+    return lats, lons
+
+def parse_signal_column(values: pd.Series) -> pd.Series:
+    """
+    Convierte una columna de intensidades de señal (equivalente a parse_signal_strength).
+    
+    Args:
+        values (pd.Series): Columna de intensidades en dBm
+    
+    Returns:
+        pd.Series: Enteros válidos o None
+    """
+    numeric = pd.to_numeric(values, errors='coerce')
+    strengths = np.trunc(numeric)
+    fast = numeric.notna() & strengths.between(-150, 0)
+    
+    result = pd.Series([None] * len(values), index=values.index, dtype=object)
+    result[fast] = [int(v) for v in strengths[fast]]
+    for index in values.index[values.notna() & ~fast]:
+        result[index] = parse_signal_strength(values[index])
+    return result
+
+def parse_concentration_column(values: pd.Series) -> pd.Series:
+    """
+    Convierte una columna de concentraciones (equivalente a parse_concentration).
+    
+    Args:
+        values (pd.Series): Columna de concentraciones
+    
+    Returns:
+        pd.Series: Valores Decimal válidos o None
+    """
+    numeric = pd.to_numeric(values, errors='coerce')
+    fast = numeric.notna() & np.isfinite(numeric) & (numeric >= 0)
+    
+    result = pd.Series([None] * len(values), index=values.index, dtype=object)
+    result[fast] = [Decimal(str(float(v))) for v in numeric[fast]]
+    for index in values.index[values.notna() & ~fast]:
+        result[index] = parse_concentration(values[index])
+    return result
+
+@instrumented("prepare_dataframe")
+def prepare_dataframe(dataframe: pd.DataFrame, statistics: Dict[str, int],
+                      rejections: Optional[Dict[int, str]] = None) -> List[Dict[str, Any]]:
+    """
+    Valida y normaliza todas las filas de un DataFrame trabajando por columnas.
+    
+    Aplica las mismas comprobaciones y en el mismo orden que el procesamiento
+    fila a fila (datos obligatorios, timestamp, operador, coordenadas y
+    territorio), actualizando las mismas categorías de estadísticas.
+    
+    Args:
+        dataframe (pd.DataFrame): Datos cargados desde la hoja
+        statistics (Dict[str, int]): Diccionario de estadísticas para actualizar
+        rejections (Dict[int, str], optional): Se completa con índice de fila -> categoría de rechazo
+    
+    Returns:
+        List[Dict[str, Any]]: Registros normalizados listos para guardar
+    """
+    if dataframe.empty:
+        return []
+    
+    def reject(mask: pd.Series, category: str, message) -> None:
+        nonlocal alive
+        for index in dataframe.index[mask]:
+            logger.warning(f"Registro {int(index) + 1}{message(index)}")
+            if rejections is not None:
+                rejections[int(index)] = category
+        statistics[category] = statistics.get(category, 0) + int(mask.sum())
+        alive = alive & ~mask
+    
+    alive = pd.Series(True, index=dataframe.index)
+    
+    # Validación inicial de datos: campos obligatorios y al menos una medición
+    missing = pd.Series(False, index=dataframe.index)
+    for field in REQUIRED_COLUMNS:
+        if field not in dataframe.columns:
+            missing[:] = True
+            continue
+        column = dataframe[field]
+        missing |= column.isna() | (column.astype(str).str.strip() == "")
+    
+    measurement_fields = [f for f, _ in SIGNAL_COLUMNS if f in dataframe.columns]
+    measurement_fields += [f for f in POLLUTANT_COLUMNS if f in dataframe.columns]
+    has_measurement = (dataframe[measurement_fields].notna().any(axis=1)
+                       if measurement_fields else pd.Series(False, index=dataframe.index))
+    
+    reject(missing | ~has_measurement, 'skipped',
+           lambda i: f" omitido: {validate_row_data(dataframe.loc[i])[1]}")
+    if not alive.any():
+        return []
+    
+    # Procesamiento de timestamp
+    timestamps = pd.Series([None] * len(dataframe), index=dataframe.index, dtype=object)
+    timestamps[alive] = parse_timestamp_column(dataframe.loc[alive, "Marca temporal"])
+    reject(alive & timestamps.isna(), 'invalid_timestamp', lambda i: ": timestamp inválido")
+    
+    # Procesamiento de operador: se normaliza y busca una vez por valor distinto
+    importer = get_importer()
+    operators = dataframe["OPERADOR"]
+    if not isinstance(operators.dtype, pd.CategoricalDtype):
+        operators = operators.astype("category")
+    names = pd.Series(operators.cat.categories.astype(str)).str.strip()
+    codes = operators.cat.codes.to_numpy()
+    # El código -1 (celda vacía) apunta al último elemento: 'nan' sin operador
+    operator_names = pd.Series(np.append(names.to_numpy(dtype=object), "nan")[codes], index=dataframe.index)
+    operator_ids = pd.Series(np.append(names.str.title().map(importer.operators).to_numpy(dtype=float), np.nan)[codes],
+                             index=dataframe.index)
+    unknown = alive & operator_ids.isna()
+    for name in operator_names[unknown].unique():
+        logger.warning(f"Operador no encontrado en base de datos: '{name}'")
+    reject(unknown, 'unknown_operator', lambda i: f": operador no reconocido '{operator_names[i]}'")
+    
+    # Procesamiento de coordenadas
+    lats = pd.Series(np.nan, index=dataframe.index)
+    lons = pd.Series(np.nan, index=dataframe.index)
+    if alive.any():
+        lats[alive], lons[alive] = parse_location_column(dataframe.loc[alive, "COORDENADAS_LIMPIAS"])
+    reject(alive & (lats.isna() | lons.isna()), 'invalid_coords',
+           lambda i: f": coordenadas inválidas '{dataframe.at[i, 'COORDENADAS_LIMPIAS']}'")
+    
+    # Verificar que los puntos están en España (una sola consulta vectorizada)
+    outside = pd.Series(False, index=dataframe.index)
+    messages = {}
+    if alive.any():
+        candidates = dataframe.index[alive]
+        coords_valid, coords_messages = validate_coordinates_spain_batch(
+            lats[candidates].to_numpy(), lons[candidates].to_numpy())
+        outside[candidates[~coords_valid]] = True
+        messages = dict(zip(candidates, coords_messages))
+    reject(outside, 'outside_spain', lambda i: f": {messages[i]}")
+    
+    selected = dataframe.index[alive]
+    if len(selected) == 0:
+        return []
+    
+    # Celda UTM de 10 m y provincia de todas las filas válidas (consultas vectorizadas)
+    cells = compute_grid_cells(lats[selected].to_numpy(), lons[selected].to_numpy())
+    provinces = importer.province_index.lookup(lats[selected].to_numpy(), lons[selected].to_numpy())
+    
+    # Mediciones de señal y contaminantes convertidas por columna
+    measurement_columns = []
+    for field_name, signal_code in SIGNAL_COLUMNS:
+        if field_name not in dataframe.columns:
+            continue
+        if importer.signal_types.get(signal_code.upper()) is None:
+            logger.warning(f"Tipo de señal no reconocido: {signal_code}")
+            continue
+        parsed = parse_signal_column(dataframe.loc[selected, field_name])
+        measurement_columns.append(('signals', signal_code, parsed.to_numpy()))
+    for field_name, pollutant_code in POLLUTANT_COLUMNS.items():
+        if field_name not in dataframe.columns:
+            continue
+        if importer.pollutants.get(pollutant_code.lower()) is None:
+            logger.warning(f"Tipo de contaminante no reconocido: {pollutant_code}")
+            continue
+        raw = dataframe.loc[selected, field_name]
+        parsed = parse_concentration_column(raw)
+        failed = raw.notna() & parsed.isna()
+        for index in selected[failed.to_numpy()]:
+            logger.warning(f"Registro {int(index) + 1} - ✗ Falló procesamiento de {pollutant_code}")
+        measurement_columns.append(('pollutants', pollutant_code, parsed.to_numpy()))
+    
+    records = []
+    for position, (index, lat, lon, timestamp, operator_id) in enumerate(zip(
+            selected, lats[selected], lons[selected], timestamps[selected], operator_ids[selected])):
+        record = {
+            'row_index': int(index),
+            'latitude': float(lat),
+            'longitude': float(lon),
+            'timestamp': timestamp,
+            'operator_id': int(operator_id),
+            'utm_zone': int(cells['utm_zone'][position]),
+            'cell_id': cells['cell_id'][position],
+            'cell_lat': float(cells['cell_lat'][position]),
+            'cell_lng': float(cells['cell_lng'][position]),
+            'provincia_id': provinces[position],
+            'signals': [],
+            'pollutants': []
+        }
+        for kind, code, values in measurement_columns:
+            value = values[position]
+            if value is not None:
+                record[kind].append((code, value))
+        records.append(record)
+    
+    logger.info(f"Validación columnar: {len(records)} de {len(dataframe)} registros válidos")
+    return records
+
+def store_session_record(record: Dict[str, Any], statistics: Dict[str, int],
+                         created_sessions: Optional[List[int]] = None) -> bool:
+    """
+    Guarda un registro validado con consultas individuales por fila.
+    
+    Args:
+        record (Dict[str, Any]): Registro generado por prepare_dataframe
+        statistics (Dict[str, int]): Diccionario de estadísticas para actualizar
+        created_sessions (List[int], optional): Lista donde anotar las sesiones creadas
+    
+    Returns:
+        bool: False si no se pudo crear u obtener la sesión
+    """
+    row_index = record['row_index']
+    
+    # Crear o encontrar sesión de medición
+    session_id, is_new_session = insert_or_get_session(
+        record['latitude'], record['longitude'], record['timestamp'], record['operator_id'],
+        (record['utm_zone'], record['cell_id'], record['cell_lat'], record['cell_lng']), record['provincia_id'])
+    if session_id is None:
+        logger.error(f"Registro {row_index + 1}: error creando sesión")
+        statistics['db_errors'] += 1
+        return False
+    
+    # Actualizar estadísticas de sesiones
+    if is_new_session:
+        statistics['new_sessions'] += 1
+        if created_sessions is not None:
+            created_sessions.append(session_id)
+    else:
+        statistics['existing_sessions'] += 1
+    
+    # Procesar mediciones de señal
+    signal_measurements = 0
+    for signal_code, strength in record['signals']:
+        if upsert_signal_measurement(session_id, signal_code, strength):
+            signal_measurements += 1
+    
+    # Procesar mediciones de contaminantes
+    pollutant_measurements = 0
+    for pollutant_code, concentration in record['pollutants']:
+        if upsert_pollutant_measurement(session_id, pollutant_code, concentration):
+            pollutant_measurements += 1
+            logger.debug(f"Registro {row_index + 1} - ✓ Contaminante {pollutant_code} procesado exitosamente")
+        else:
+            logger.warning(f"Registro {row_index + 1} - ✗ Falló procesamiento de {pollutant_code}")
+    
+    # Actualizar estadísticas finales
+    statistics['processed'] += 1
+    statistics['total_signals'] += signal_measurements
+    statistics['total_pollutants'] += pollutant_measurements
+    
+    logger.debug(f"Registro {row_index + 1} procesado exitosamente: "
+                f"{signal_measurements} señales, {pollutant_measurements} contaminantes")
+    return True
+
+# =========================================================================
+# CARGA MASIVA (COPY + SQL POR CONJUNTOS)
+# =========================================================================
+
+def _copy_rows(db_cursor, table: str, columns: List[str], rows: List[tuple]) -> None:
+    """
+    Envía filas a una tabla mediante COPY FROM STDIN en formato CSV.
+    
+    Args:
+        db_cursor: Cursor de psycopg2 a utilizar
+        table (str): Tabla de destino
+        columns (List[str]): Columnas en el orden de las tuplas
+        rows (List[tuple]): Filas a copiar
+    """
+    buffer = StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(rows)
+    buffer.seek(0)
+    db_cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+def _link_batch_sessions(records: List[Dict[str, Any]], matched: Dict[int, int]) -> Dict[int, int]:
+    """
+    Resuelve los duplicados dentro del propio lote para las filas sin sesión previa.
+    
+    Reproduce el orden del modo fila a fila: cada fila se asocia a la primera
+    sesión creada antes en el lote con las mismas coordenadas y operador y a
+    menos de SESSION_TIME_TOLERANCE; si no existe, crea una sesión nueva.
+    
+    Args:
+        records (List[Dict[str, Any]]): Registros del lote en orden de la hoja
+        matched (Dict[int, int]): row_index -> session_id de sesiones ya existentes
+    
+    Returns:
+        Dict[int, int]: row_index seguidor -> row_index de la fila que crea la sesión.
+        Las filas que crean sesión se apuntan a sí mismas.
+    """
+    leaders: Dict[tuple, List[Dict[str, Any]]] = {}
+    links = {}
+    for record in records:
+        if record['row_index'] in matched:
+            continue
+        key = (record['operator_id'], record['latitude'], record['longitude'])
+        candidates = leaders.setdefault(key, [])
+        leader = next((c for c in candidates
+                       if abs(c['timestamp'] - record['timestamp']) < SESSION_TIME_TOLERANCE), None)
+        if leader is None:
+            candidates.append(record)
+            links[record['row_index']] = record['row_index']
+        else:
+            links[record['row_index']] = leader['row_index']
+    return links
+
+@instrumented("bulk_load_records")
+def bulk_load_records(records: List[Dict[str, Any]], statistics: Dict[str, int]) -> List[int]:
+    """
+    Carga un lote de registros validados con COPY y sentencias por conjuntos.
+    
+    Sustituye las 4-8 consultas por fila del modo individual por un número
+    fijo de sentencias por lote. Todo el lote se ejecuta en una transacción;
+    si falla, se deshace y se reprocesa fila a fila para aislar los errores.
+    
+    Args:
+        records (List[Dict[str, Any]]): Registros generados por prepare_dataframe
+        statistics (Dict[str, int]): Diccionario de estadísticas para actualizar
+    
+    Returns:
+        List[int]: Índices de las filas que no se pudieron guardar
+    """
+    if not records:
+        return []
+    
+    logger.info(f"Carga masiva de {len(records)} registros")
+    
+    # Mediciones que superarían las restricciones de la base de datos
+    importer = get_importer()
+    signal_rows = []
+    pollutant_rows = []
+    for record in records:
+        for signal_code, strength in record['signals']:
+            if not (DB_SIGNAL_DBM_RANGE[0] <= strength <= DB_SIGNAL_DBM_RANGE[1]):
+                logger.error(f"Error procesando medición de señal {signal_code}: "
+                             f"{strength} dBm fuera del rango admitido por la base de datos")
+                continue
+            signal_rows.append((len(signal_rows), record['row_index'],
+                                importer.signal_types[signal_code.upper()], strength))
+        for pollutant_code, concentration in record['pollutants']:
+            if concentration > DB_MAX_CONCENTRATION:
+                logger.error(f"Error procesando medición de contaminante {pollutant_code}: "
+                             f"{concentration} excede la precisión de la columna")
+                continue
+            pollutant_rows.append((len(pollutant_rows), record['row_index'],
+                                   importer.pollutants[pollutant_code.lower()], concentration))
+    
+    # Índice en memoria solo si tiene cargada la ventana temporal de todo el lote
+    session_index = importer.session_index
+    db_conn, db_cursor = get_connection(), get_cursor()
+    if session_index is not None and not all(session_index.covers(r['timestamp']) for r in records):
+        session_index = None
+    
+    db_conn.autocommit = False
+    try:
+        # Tablas temporales de la conexión; se vacían en cada COMMIT
+        db_cursor.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS staging_sessions (
+                row_idx INTEGER PRIMARY KEY,
+                latitude DECIMAL(10, 8) NOT NULL,
+                longitude DECIMAL(11, 8) NOT NULL,
+                timestamp_recorded TIMESTAMPTZ NOT NULL,
+                operator_id INTEGER NOT NULL,
+                utm_zone SMALLINT,
+                cell_id VARCHAR(24),
+                cell_lat DECIMAL(10, 8),
+                cell_lng DECIMAL(11, 8),
+                provincia_id INTEGER,
+                session_id BIGINT
+            ) ON COMMIT DELETE ROWS;
+            CREATE TEMP TABLE IF NOT EXISTS staging_signals (
+                seq INTEGER, row_idx INTEGER, signal_type_id INTEGER, signal_strength_dbm INTEGER
+            ) ON COMMIT DELETE ROWS;
+            CREATE TEMP TABLE IF NOT EXISTS staging_pollutants (
+                seq INTEGER, row_idx INTEGER, pollutant_type_id INTEGER, concentration DECIMAL(10, 4)
+            ) ON COMMIT DELETE ROWS;
+        """)
+        
+        # Sesiones ya existentes: se resuelven con el índice en memoria si cubre el lote
+        matched = {}
+        if session_index is not None:
+            for r in records:
+                session_id = session_index.find(r['latitude'], r['longitude'], r['timestamp'], r['operator_id'])
+                if session_id is not None:
+                    matched[r['row_index']] = session_id
+        
+        _copy_rows(db_cursor, "staging_sessions",
+                   ["row_idx", "latitude", "longitude", "timestamp_recorded", "operator_id",
+                    "utm_zone", "cell_id", "cell_lat", "cell_lng", "provincia_id", "session_id"],
+                   [(r['row_index'], r['latitude'], r['longitude'], r['timestamp'].isoformat(sep=' '),
+                     r['operator_id'], r['utm_zone'], r['cell_id'], r['cell_lat'], r['cell_lng'],
+                     r['provincia_id'], matched.get(r['row_index'])) for r in records])
+        _copy_rows(db_cursor, "staging_signals", ["seq", "row_idx", "signal_type_id", "signal_strength_dbm"], signal_rows)
+        _copy_rows(db_cursor, "staging_pollutants", ["seq", "row_idx", "pollutant_type_id", "concentration"], pollutant_rows)
+        
+        if session_index is None:
+            # Sesiones ya existentes en la base de datos (misma tolerancia que find_existing_session)
+            db_cursor.execute("""
+                UPDATE staging_sessions s SET session_id = (
+                    SELECT ms.id FROM measurement_sessions ms
+                    WHERE ABS(ms.latitude - s.latitude) < 0.00000001
+                    AND ABS(ms.longitude - s.longitude) < 0.00000001
+                    AND ABS(EXTRACT(EPOCH FROM (ms.timestamp_recorded - s.timestamp_recorded))) < 60
+                    AND ms.operator_id = s.operator_id
+                    LIMIT 1
+                )
+                RETURNING row_idx, session_id;
+            """)
+            matched = {row_idx: session_id for row_idx, session_id in db_cursor.fetchall() if session_id is not None}
+        
+        # Duplicados dentro del lote: una sesión nueva por grupo
+        links = _link_batch_sessions(records, matched)
+        leader_rows = [row_idx for row_idx, leader in links.items() if row_idx == leader]
+        created_sessions = {}
+        
+        if leader_rows:
+            db_cursor.execute("""
+                WITH inserted AS (
+                    INSERT INTO measurement_sessions
+                    (location, latitude, longitude, timestamp_recorded, operator_id,
+                     utm_zone, cell_id, cell_lat, cell_lng, provincia_id, created_at, updated_at)
+                    SELECT ST_SetSRID(ST_MakePoint(longitude, latitude), 4326), latitude, longitude,
+                           timestamp_recorded, operator_id, utm_zone, cell_id, cell_lat, cell_lng, provincia_id,
+                           NOW(), NOW()
+                    FROM staging_sessions
+                    WHERE row_idx = ANY(%s)
+                    ORDER BY row_idx
+                    RETURNING id, latitude, longitude, timestamp_recorded, operator_id
+                )
+                UPDATE staging_sessions s SET session_id = i.id
+                FROM inserted i
+                WHERE s.row_idx = ANY(%s)
+                AND s.latitude = i.latitude AND s.longitude = i.longitude
+                AND s.timestamp_recorded = i.timestamp_recorded AND s.operator_id = i.operator_id
+                RETURNING s.row_idx, s.session_id;
+            """, (leader_rows, leader_rows))
+            created_sessions = dict(db_cursor.fetchall())
+            
+            follower_rows = [row_idx for row_idx, leader in links.items() if row_idx != leader]
+            if follower_rows:
+                db_cursor.execute("""
+                    UPDATE staging_sessions f SET session_id = l.session_id
+                    FROM unnest(%s::int[], %s::int[]) AS link(row_idx, leader_idx)
+                    JOIN staging_sessions l ON l.row_idx = link.leader_idx
+                    WHERE f.row_idx = link.row_idx;
+                """, (follower_rows, [links[row_idx] for row_idx in follower_rows]))
+        
+        # Upserts de mediciones; si varias filas del lote apuntan a la misma
+        # sesión y tipo, prevalece la última (igual que en modo fila a fila)
+        db_cursor.execute("""
+            INSERT INTO signal_measurements 
+            (session_id, signal_type_id, signal_strength_dbm, created_at, updated_at, 
+             data_source, measurement_method, quality_flag)
+            SELECT DISTINCT ON (s.session_id, ss.signal_type_id)
+                   s.session_id, ss.signal_type_id, ss.signal_strength_dbm, NOW(), NOW(),
+                   'forms', 'mobile', 'valid'
+            FROM staging_signals ss
+            JOIN staging_sessions s ON s.row_idx = ss.row_idx
+            ORDER BY s.session_id, ss.signal_type_id, ss.seq DESC
+            ON CONFLICT (session_id, signal_type_id) 
+            DO UPDATE SET 
+                signal_strength_dbm = EXCLUDED.signal_strength_dbm,
+                updated_at = NOW(),
+                quality_flag = 'valid';
+        """)
+        db_cursor.execute("""
+            INSERT INTO pollution_measurements 
+            (session_id, pollutant_type_id, concentration, created_at, updated_at,
+             data_source, measurement_method, quality_flag)
+            SELECT DISTINCT ON (s.session_id, sp.pollutant_type_id)
+                   s.session_id, sp.pollutant_type_id, sp.concentration, NOW(), NOW(),
+                   'forms', 'domestic_sensor', 'valid'
+            FROM staging_pollutants sp
+            JOIN staging_sessions s ON s.row_idx = sp.row_idx
+            ORDER BY s.session_id, sp.pollutant_type_id, sp.seq DESC
+            ON CONFLICT (session_id, pollutant_type_id)
+            DO UPDATE SET 
+                concentration = EXCLUDED.concentration,
+                updated_at = NOW(),
+                quality_flag = 'valid';
+        """)
+        
+        db_conn.commit()
+    except psycopg2.Error as e:
+        db_conn.rollback()
+        db_conn.autocommit = True
+        logger.error(f"Error en la carga masiva, reprocesando el lote fila a fila: {e}")
+        return store_records(records, statistics)
+    finally:
+        db_conn.autocommit = True
+    
+    # Las sesiones creadas se registran en el índice solo tras el COMMIT
+    if importer.session_index is not None:
+        for record in records:
+            session_id = created_sessions.get(record['row_index'])
+            if session_id is not None:
+                importer.session_index.add(session_id, record['latitude'], record['longitude'],
+                                           record['timestamp'], record['operator_id'])
+    
+    # Estadísticas equivalentes al modo fila a fila
+    statistics['processed'] += len(records)
+    statistics['new_sessions'] += len(leader_rows)
+    statistics['existing_sessions'] += len(records) - len(leader_rows)
+    statistics['total_signals'] += len(signal_rows)
+    statistics['total_pollutants'] += len(pollutant_rows)
+    
+    logger.info(f"Lote cargado: {len(leader_rows)} sesiones nuevas, "
+                f"{len(records) - len(leader_rows)} existentes")
+    return []
+
+def store_records(records: List[Dict[str, Any]], statistics: Dict[str, int]) -> List[int]:
+    """
+    Guarda registros validados fila a fila aislando los errores de cada una.
+    
+    Con Importer.commit_every > 0 las filas se agrupan en transacciones de ese
+    tamaño y cada una se protege con un SAVEPOINT: una fila que falla se
+    deshace (estadísticas e índice de sesiones incluidos) sin perder el resto
+    del lote. Con 0 se mantiene el modo autocommit (una transacción por sentencia).
+    
+    Args:
+        records (List[Dict[str, Any]]): Registros generados por prepare_dataframe
+        statistics (Dict[str, int]): Diccionario de estadísticas para actualizar
+    
+    Returns:
+        List[int]: Índices de las filas que no se pudieron guardar
+    """
+    commit_every = get_importer().commit_every
+    if commit_every > 0:
+        failed_rows = []
+        for start in range(0, len(records), commit_every):
+            failed_rows += store_records_transaction(records[start:start + commit_every], statistics)
+        return failed_rows
+    
+    failed_rows = []
+    for record in records:
+        try:
+            if not store_session_record(record, statistics):
+                failed_rows.append(record['row_index'])
+        except Exception as e:
+            logger.error(f"Error procesando registro {record['row_index'] + 1}: {e}")
+            statistics['db_errors'] += 1
+            failed_rows.append(record['row_index'])
+    return failed_rows
+
+def store_records_transaction(records: List[Dict[str, Any]], statistics: Dict[str, int]) -> List[int]:
+    """
+    Guarda un lote de registros en una única transacción con un SAVEPOINT por fila.
+    
+    Args:
+        records (List[Dict[str, Any]]): Registros del lote
+        statistics (Dict[str, int]): Diccionario de estadísticas para actualizar
+    
+    Returns:
+        List[int]: Índices de las filas que no se pudieron guardar
+    """
+    storage = get_storage()
+    session_index = get_importer().session_index
+    batch_statistics = dict(statistics)
+    batch_sessions: List[int] = []
+    failed_rows = []
+    
+    try:
+        storage.begin()
+        storage.savepoint()
+        for record in records:
+            row_statistics = dict(statistics)
+            row_sessions: List[int] = []
+            try:
+                stored = store_session_record(record, statistics, row_sessions)
+            except Exception as e:
+                logger.error(f"Error procesando registro {record['row_index'] + 1}: {e}")
+                stored = False
+            
+            # Las funciones de acceso capturan sus propios errores: el backend
+            # indica si alguna sentencia de la fila ha fallado
+            if stored and not storage.statement_failed():
+                batch_sessions += row_sessions
+                storage.advance_savepoint()
+                continue
+            
+            storage.rollback_to_savepoint()
+            if session_index is not None:
+                session_index.discard(row_sessions)
+            statistics.clear()
+            statistics.update(row_statistics)
+            statistics['db_errors'] += 1
+            failed_rows.append(record['row_index'])
+        
+        storage.commit()
+        logger.debug(f"Lote de {len(records)} registros confirmado ({len(failed_rows)} filas deshechas)")
+        return failed_rows
+    except storage.errors as e:
+        # Fallo del propio lote (p. ej. conexión perdida): se deshace completo
+        logger.error(f"Error confirmando lote de {len(records)} registros: {e}")
+        storage.rollback()
+        if session_index is not None:
+            session_index.discard(batch_sessions)
+        statistics.clear()
+        statistics.update(batch_statistics)
+        statistics['db_errors'] += len(records)
+        return [record['row_index'] for record in records]
+    finally:
+        storage.end()
+
+# =========================================================================
+# IMPORTACIÓN EN PARALELO
+# =========================================================================
+
+def create_processing_stats() -> Dict[str, int]:
+    """
+    Crea un diccionario de estadísticas de procesamiento a cero.
+    
+    Returns:
+        Dict[str, int]: Contadores de la importación
+    """
+    return {
+        'processed': 0,
+        'new_sessions': 0,
+        'existing_sessions': 0,
+        'skipped': 0,
+        'invalid_timestamp': 0,
+        'invalid_coords': 0,
+        'unknown_operator': 0,
+        'db_errors': 0,
+        'total_signals': 0,
+        'total_pollutants': 0,
+        'unchanged': 0
+    }
+
+def merge_statistics(statistics: Dict[str, int], partial: Dict[str, int]) -> None:
+    """
+    Acumula en statistics los contadores de un hilo de importación.
+    
+    Args:
+        statistics (Dict[str, int]): Estadísticas globales a actualizar
+        partial (Dict[str, int]): Estadísticas de un hilo
+    """
+    for key, value in partial.items():
+        statistics[key] = statistics.get(key, 0) + value
+
+def partition_records(records: List[Dict[str, Any]], partitions: int) -> List[List[Dict[str, Any]]]:
+    """
+    Reparte los registros entre hilos sin separar filas de una misma sesión.
+    
+    Los registros se agrupan por operador y coordenadas, y dentro de cada grupo
+    se corta cuando entre dos timestamps consecutivos hay al menos
+    SESSION_TIME_TOLERANCE: filas de bloques distintos nunca pueden compartir
+    sesión, así que cada hilo deduplica sus sesiones sin coordinarse con el
+    resto. Los bloques se asignan de mayor a menor al hilo menos cargado.
+    
+    Args:
+        records (List[Dict[str, Any]]): Registros generados por prepare_dataframe
+        partitions (int): Número de particiones
+    
+    Returns:
+        List[List[Dict[str, Any]]]: Particiones no vacías, cada una en el orden original de filas
+    """
+    def session_key(record):
+        return (record['operator_id'], round(record['latitude'], 8), round(record['longitude'], 8))
+    
+    clusters: List[List[Dict[str, Any]]] = []
+    previous = None
+    for record in sorted(records, key=lambda r: (session_key(r), r['timestamp'])):
+        if (previous is None or session_key(record) != session_key(previous)
+                or record['timestamp'] - previous['timestamp'] >= SESSION_TIME_TOLERANCE):
+            clusters.append([])
+        clusters[-1].append(record)
+        previous = record
+    
+    buckets: List[List[Dict[str, Any]]] = [[] for _ in range(partitions)]
+    for cluster in sorted(clusters, key=len, reverse=True):
+        min(buckets, key=len).extend(cluster)
+    return [sorted(bucket, key=lambda r: r['row_index']) for bucket in buckets if bucket]
+
+def _store_partition(records: List[Dict[str, Any]], pool: psycopg2.pool.ThreadedConnectionPool,
+                     worker: int) -> Tuple[Dict[str, int], List[int]]:
+    """
+    Guarda una partición de registros con una conexión propia del pool.
+    
+    Args:
+        records (List[Dict[str, Any]]): Registros de la partición
+        pool (ThreadedConnectionPool): Pool del que tomar la conexión
+        worker (int): Número de hilo (para el log)
+    
+    Returns:
+        Tuple[Dict[str, int], List[int]]: (estadísticas del hilo, filas fallidas)
+    """
+    statistics = create_processing_stats()
+    worker_conn = pool.getconn()
+    try:
+        worker_conn.autocommit = True
+        _db_local.conn, _db_local.cur = worker_conn, worker_conn.cursor()
+        
+        started = time.monotonic()
+        failed_rows = []
+        if BULK_LOAD_MODE:
+            for start in range(0, len(records), BULK_BATCH_SIZE):
+                failed_rows += bulk_load_records(records[start:start + BULK_BATCH_SIZE], statistics)
+        else:
+            failed_rows = store_records(records, statistics)
+        logger.info(f"Hilo {worker}: {len(records)} registros en {time.monotonic() - started:.1f}s "
+                    f"({statistics['new_sessions']} sesiones nuevas, {statistics['db_errors']} errores)")
+        return statistics, failed_rows
+    finally:
+        _db_local.cur.close()
+        _db_local.conn = _db_local.cur = None
+        # Una conexión que quedó en mitad de una transacción no vuelve al pool
+        pool.putconn(worker_conn, close=worker_conn.closed or not worker_conn.autocommit)
+
+def store_records_parallel(records: List[Dict[str, Any]], statistics: Dict[str, int],
+                           workers: int) -> List[int]:
+    """
+    Guarda los registros repartidos entre varios hilos con conexiones independientes.
+    
+    Args:
+        records (List[Dict[str, Any]]): Registros generados por prepare_dataframe
+        statistics (Dict[str, int]): Diccionario de estadísticas para actualizar
+        workers (int): Número de hilos
+    
+    Returns:
+        List[int]: Índices de las filas que no se pudieron guardar
+    """
+    partitions = partition_records(records, workers)
+    pool = get_importer().connection_pool(len(partitions))
+    failed_rows = []
+    with ThreadPoolExecutor(max_workers=len(partitions), thread_name_prefix="importer") as executor:
+        futures = [executor.submit(_store_partition, partition, pool, worker)
+                   for worker, partition in enumerate(partitions, start=1)]
+        for future in futures:
+            partial_stats, partial_failed = future.result()
+            merge_statistics(statistics, partial_stats)
+            failed_rows += partial_failed
+    return sorted(failed_rows)
+
+# =========================================================================
+# IMPORTACIÓN INCREMENTAL
+# =========================================================================
+
+# Categorías de rechazo que dependen de datos de referencia (p. ej. un operador
+# que se da de alta después) y por tanto se reintentan en la siguiente ejecución
+RETRYABLE_REJECTIONS = {'unknown_operator'}
+
+def _source_key(source: str) -> str:
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+
+def get_import_state_path(source: str) -> str:
+    """
+    Ruta del fichero de estado incremental asociado a una fuente de datos.
+    
+    Args:
+        source (str): URL o ruta de la fuente
+    
+    Returns:
+        str: Ruta del fichero de huellas dentro de IMPORT_CACHE_DIR
+    """
+    return os.path.join(IMPORT_CACHE_DIR, f"import_state_{_source_key(source)}.npy")
+
+def load_source_metadata(source: str) -> Dict[str, Any]:
+    """
+    Carga los metadatos recordados de una fuente (p. ej. su codificación).
+    
+    Args:
+        source (str): URL o ruta de la fuente
+    
+    Returns:
+        Dict[str, Any]: Metadatos guardados (vacío si no hay)
+    """
+    path = os.path.join(IMPORT_CACHE_DIR, f"source_{_source_key(source)}.json")
+    try:
+        with open(path, encoding="utf-8") as metadata_file:
+            return json.load(metadata_file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Metadatos de la fuente ilegibles, se ignoran: {e}")
+        return {}
+
+def save_source_metadata(source: str, **values: Any) -> None:
+    """
+    Actualiza de forma atómica los metadatos recordados de una fuente.
+    
+    Args:
+        source (str): URL o ruta de la fuente
+        **values: Campos a guardar
+    """
+    metadata = load_source_metadata(source)
+    metadata.update(values)
+    try:
+        write_file_atomically(os.path.join(IMPORT_CACHE_DIR, f"source_{_source_key(source)}.json"),
+                              json.dumps(metadata, indent=2, ensure_ascii=False).encode("utf-8"))
+    except OSError as e:
+        logger.warning(f"No se pudieron guardar los metadatos de la fuente: {e}")
+
+def get_remembered_encoding(source: str) -> Optional[str]:
+    """Codificación detectada en la última lectura de la fuente ("-" no se recuerda)."""
+    return None if source == "-" else load_source_metadata(source).get('encoding')
+
+def remember_encoding(source: str, encoding: str) -> None:
+    """Recuerda la codificación de la fuente para probarla primero en la siguiente ejecución."""
+    if source != "-" and get_remembered_encoding(source) != encoding:
+        save_source_metadata(source, encoding=encoding)
+
+def compute_row_fingerprints(dataframe: pd.DataFrame) -> np.ndarray:
+    """
+    Calcula una huella de 64 bits por fila sobre las columnas que usa el importador.
+    
+    Las columnas auxiliares o de texto libre no participan, de modo que
+    editarlas no provoca el reprocesado de la fila. La huella no depende del
+    tipo con que se cargó cada columna: las numéricas se comparan como
+    float64 y el resto (categóricas incluidas) como texto.
+    
+    Args:
+        dataframe (pd.DataFrame): Datos cargados desde la hoja
+    
+    Returns:
+        np.ndarray: Huellas uint64 en el orden de las filas
+    """
+    columns = [c for c in REQUIRED_COLUMNS if c in dataframe.columns]
+    columns += [f for f, _ in SIGNAL_COLUMNS if f in dataframe.columns]
+    columns += [f for f in POLLUTANT_COLUMNS if f in dataframe.columns]
+    if not columns:
+        return np.zeros(len(dataframe), dtype=np.uint64)
+    canonical = pd.DataFrame({
+        column: (dataframe[column].astype(np.float64) if pd.api.types.is_numeric_dtype(dataframe[column])
+                 else dataframe[column].astype(object))
+        for column in columns
+    }, index=dataframe.index)
+    return pd.util.hash_pandas_object(canonical, index=False).to_numpy(dtype=np.uint64)
+
+def load_import_state(source: str) -> np.ndarray:
+    """
+    Carga las huellas de las filas ya importadas de una fuente.
+    
+    Args:
+        source (str): URL o ruta de la fuente
+    
+    Returns:
+        np.ndarray: Huellas uint64 ordenadas (vacío si no hay estado previo)
+    """
+    state_path = get_import_state_path(source)
+    try:
+        fingerprints = np.load(state_path)
+        logger.info(f"Estado incremental cargado: {len(fingerprints)} filas ya importadas")
+        return fingerprints
+    except FileNotFoundError:
+        logger.info("Sin estado incremental previo: se procesarán todas las filas")
+    except (OSError, ValueError) as e:
+        logger.warning(f"Estado incremental ilegible, se procesarán todas las filas: {e}")
+    return np.array([], dtype=np.uint64)
+
+def save_import_state(source: str, fingerprints: np.ndarray) -> None:
+    """
+    Guarda de forma atómica las huellas de las filas importadas de una fuente.
+    
+    Args:
+        source (str): URL o ruta de la fuente
+        fingerprints (np.ndarray): Huellas de las filas en estado final
+    """
+    buffer = BytesIO()
+    np.save(buffer, np.unique(fingerprints.astype(np.uint64)))
+    try:
+        write_file_atomically(get_import_state_path(source), buffer.getvalue())
+        logger.debug(f"Estado incremental guardado: {len(fingerprints)} filas")
+    except OSError as e:
+        logger.warning(f"No se pudo guardar el estado incremental: {e}")
+
+# =========================================================================
+# FILAS RECHAZADAS (DEAD LETTER)
+# =========================================================================
+
+# Guardar las filas rechazadas para poder reintentarlas con --retry-rejected
+DEAD_LETTER_ENABLED = os.getenv("IMPORT_DEAD_LETTER", "1").lower() not in ("0", "false", "no")
+# Motivos de rechazo que se guardan (las filas 'skipped' no tienen datos que reintentar)
+DEAD_LETTER_REASONS = {'unknown_operator', 'invalid_timestamp', 'invalid_coords', 'outside_spain', 'db_errors'}
+
+def get_dead_letter_path(source: str) -> str:
+    """
+    Ruta del fichero de filas rechazadas de una fuente.
+    
+    Args:
+        source (str): URL o ruta de la fuente
+    
+    Returns:
+        str: Ruta del fichero JSON Lines dentro de IMPORT_CACHE_DIR
+    """
+    return os.path.join(IMPORT_CACHE_DIR, f"dead_letter_{_source_key(source)}.jsonl")
+
+def _json_value(value: Any) -> Any:
+    """Valor de una celda serializable en JSON (vacío -> None, escalares numpy -> Python)."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+class DeadLetterStore:
+    """
+    Filas rechazadas de una fuente con su motivo y su huella.
+    
+    Se guarda como JSON Lines (una fila por línea, con los valores de las
+    columnas que usa el importador) para poder revisarlo a mano y volver a
+    enviar solo esas filas con --retry-rejected. Las entradas se identifican
+    por la huella de compute_row_fingerprints: una fila que vuelve a fallar
+    actualiza su entrada y una que se guarda la elimina.
+    
+    Cada posición de la fuente tiene como mucho una entrada: si la fila se
+    corrige en la hoja, su nueva versión sustituye a la rechazada (o la
+    elimina si se guarda), y --retry-rejected no reenvía versiones antiguas.
+    """
+    
+    def __init__(self, source: str, entries: Optional[Dict[str, Dict[str, Any]]] = None):
+        self.source = source
+        self.path = get_dead_letter_path(source)
+        self.entries: Dict[str, Dict[str, Any]] = entries or {}
+        self.changed = False
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    @classmethod
+    def load(cls, source: str) -> "DeadLetterStore":
+        """
+        Carga las filas rechazadas guardadas de una fuente.
+        
+        Args:
+            source (str): URL o ruta de la fuente
+        
+        Returns:
+            DeadLetterStore: Almacén con las entradas guardadas (vacío si no hay fichero)
+        """
+        by_row = {}
+        try:
+            with open(get_dead_letter_path(source), encoding="utf-8") as dead_letter_file:
+                for line in dead_letter_file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        # Ficheros anteriores pueden tener varias versiones de una fila: vale la última
+                        previous = by_row.get(entry['row'])
+                        if previous is None or entry['rejected_at'] >= previous['rejected_at']:
+                            by_row[entry['row']] = entry
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Fichero de filas rechazadas ilegible, se ignora: {e}")
+        return cls(source, {entry['fingerprint']: entry for entry in by_row.values()})
+    
+    def record(self, dataframe: pd.DataFrame, fingerprints: np.ndarray, rejections: Dict[int, str]) -> None:
+        """
+        Anota el resultado de un bloque procesado.
+        
+        Args:
+            dataframe (pd.DataFrame): Filas enviadas al pipeline
+            fingerprints (np.ndarray): Huellas de esas filas, en el mismo orden
+            rejections (Dict[int, str]): Índice de fila -> motivo de rechazo (sin entrada si se guardó)
+        """
+        columns = [c for c in dataframe.columns if is_import_column(c)]
+        rejected_at = datetime.now().isoformat(timespec="seconds")
+        keys_by_row = {entry['row']: key for key, entry in self.entries.items()}
+        for index, fingerprint in zip(dataframe.index, fingerprints):
+            key = f"{int(fingerprint):016x}"
+            row = int(index) + 1
+            # Versión anterior de la fila (editada en la hoja): la nueva la sustituye
+            stale = keys_by_row.pop(row, None)
+            if stale is not None and stale != key and self.entries.get(stale, {}).get('row') == row:
+                del self.entries[stale]
+                self.changed = True
+            reason = rejections.get(int(index))
+            if reason not in DEAD_LETTER_REASONS:
+                if self.entries.pop(key, None) is not None:
+                    self.changed = True
+                continue
+            previous = self.entries.get(key)
+            keys_by_row[row] = key
+            self.entries[key] = {
+                'fingerprint': key,
+                'source': self.source,
+                'row': row,
+                'reason': reason,
+                'first_rejected_at': previous['first_rejected_at'] if previous else rejected_at,
+                'rejected_at': rejected_at,
+                'values': {column: _json_value(dataframe.at[index, column]) for column in columns},
+            }
+            self.changed = True
+    
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Reconstruye las filas guardadas con los tipos del esquema.
+        
+        Returns:
+            pd.DataFrame: Filas indexadas por su posición original en la fuente
+        """
+        entries = list(self.entries.values())
+        dataframe = pd.DataFrame.from_records([entry['values'] for entry in entries],
+                                              index=[entry['row'] - 1 for entry in entries])
+        return apply_column_types(dataframe)
+    
+    def save(self) -> None:
+        """Guarda de forma atómica las entradas (borra el fichero si no queda ninguna)."""
+        if not self.changed:
+            return
+        try:
+            if self.entries:
+                lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in self.entries.values())
+                write_file_atomically(self.path, lines.encode("utf-8"))
+                logger.info(f"Filas rechazadas pendientes de reintento: {len(self.entries)} ({self.path})")
+            elif os.path.exists(self.path):
+                os.remove(self.path)
+            self.changed = False
+        except OSError as e:
+            logger.warning(f"No se pudieron guardar las filas rechazadas: {e}")
+
+def dead_letter_sources() -> List[str]:
+    """
+    Fuentes con filas rechazadas guardadas en IMPORT_CACHE_DIR.
+    
+    Returns:
+        List[str]: URL o ruta de cada fuente
+    """
+    sources = []
+    try:
+        names = sorted(os.listdir(IMPORT_CACHE_DIR))
+    except FileNotFoundError:
+        return sources
+    for name in names:
+        if not (name.startswith("dead_letter_") and name.endswith(".jsonl")):
+            continue
+        try:
+            with open(os.path.join(IMPORT_CACHE_DIR, name), encoding="utf-8") as dead_letter_file:
+                sources.append(json.loads(dead_letter_file.readline())['source'])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Fichero de filas rechazadas ilegible ({name}): {e}")
+    return sources
+
+# =========================================================================
+# FUNCIÓN PRINCIPAL DEL SISTEMA
+# =========================================================================
+
+def load_source_chunks(source: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """
+    Devuelve los datos de una fuente por bloques (o en un único bloque).
+    
+    Args:
+        source (str): URL http(s), ruta a un fichero local o "-" para stdin
+        chunk_size (int): Filas por bloque; 0 carga la fuente completa
+    
+    Yields:
+        pd.DataFrame: Bloques de datos
+    """
+    if chunk_size > 0:
+        yield from iter_csv_chunks(source, chunk_size)
+    elif source.startswith(("http://", "https://")):
+        yield load_csv_from_sheets(source)
+    else:
+        yield from iter_csv_chunks(source, sys.maxsize, engine=CSV_ENGINE)
+
+def process_dataframe(dataframe: pd.DataFrame, statistics: Dict[str, int],
+                      known_fingerprints: np.ndarray, workers: int = 1,
+                      dead_letters: Optional[DeadLetterStore] = None) -> Tuple[np.ndarray, int]:
+    """
+    Valida y guarda un bloque de filas, omitiendo las ya importadas.
+    
+    Args:
+        dataframe (pd.DataFrame): Bloque de datos
+        statistics (Dict[str, int]): Diccionario de estadísticas para actualizar
+        known_fingerprints (np.ndarray): Huellas de filas importadas en ejecuciones anteriores
+        workers (int): Hilos de escritura en base de datos
+        dead_letters (DeadLetterStore, optional): Almacén donde anotar las filas rechazadas
+    
+    Returns:
+        Tuple[np.ndarray, int]: (huellas de las filas en estado final, filas procesadas)
+    """
+    metrics = get_importer().metrics
+    storage = get_storage()
+    memory = metrics.observe_dataframe(dataframe)
+    logger.debug(f"Bloque de {len(dataframe)} filas: {memory / 1024:.0f} KiB en memoria")
+    
+    # Filas nuevas o modificadas desde la última ejecución
+    with metrics.phase("huellas"):
+        fingerprints = compute_row_fingerprints(dataframe)
+        changed = ~np.isin(fingerprints, known_fingerprints)
+    statistics['unchanged'] += int((~changed).sum())
+    pending_rows = dataframe[changed]
+    
+    rejections: Dict[int, str] = {}
+    with metrics.phase("validacion"):
+        records = prepare_dataframe(pending_rows, statistics, rejections)
+    
+    with metrics.phase("indice_sesiones"):
+        prepare_session_index(records)
+    
+    failed_rows = []
+    with metrics.phase("escritura"):
+        if workers > 1 and len(records) > 1 and storage.supports_parallel:
+            failed_rows = store_records_parallel(records, statistics, workers)
+        elif BULK_LOAD_MODE and storage.supports_bulk_load:
+            for start in range(0, len(records), BULK_BATCH_SIZE):
+                failed_rows += bulk_load_records(records[start:start + BULK_BATCH_SIZE], statistics)
+        else:
+            failed_rows = store_records(records, statistics)
+    
+    # Agregados de las celdas tocadas por el bloque y archivo (solo las filas guardadas)
+    failed = set(failed_rows)
+    stored_records = [r for r in records if r['row_index'] not in failed]
+    with metrics.phase("agregados_celdas"):
+        refresh_grid_cells(list({r['cell_id'] for r in stored_records}))
+    if PARQUET_ARCHIVE_ENABLED:
+        with metrics.phase("archivo"):
+            archive_records(stored_records)
+    if dead_letters is not None:
+        rejections.update((i, 'db_errors') for i in failed)
+        dead_letters.record(pending_rows, fingerprints[changed], rejections)
+    
+    # Solo se recuerdan las filas en estado final: las fallidas y las
+    # rechazadas por datos de referencia se vuelven a intentar
+    retry_rows = set(failed_rows)
+    retry_rows.update(i for i, category in rejections.items() if category in RETRYABLE_REJECTIONS)
+    completed = ~dataframe.index.isin(list(retry_rows))
+    return fingerprints[completed], len(pending_rows)
+
+# =========================================================================
+# INSTANTÁNEAS GEOJSON
+# =========================================================================
+
+# Tras cada importación se escriben las capas del mapa ya renderizadas y
+# comprimidas en un directorio que la web sirve como ficheros estáticos
+SNAPSHOT_EXPORT_ENABLED = os.getenv("IMPORT_SNAPSHOTS", "true").strip().lower() in ("1", "true", "yes")
+SNAPSHOT_DIR = os.getenv("IMPORT_SNAPSHOT_DIR", os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "public", "data", "geojson")))
+SNAPSHOT_MANIFEST_FILE = "manifest.json"
+# Categoría de contaminación tal y como la devuelve get_geojson_categories()
+POLLUTION_CATEGORY = "contaminación aérea"
+
+def _snapshot_slug(text: str) -> str:
+    """Nombre de fichero ASCII para una categoría o capa (p. ej. 'contaminación aérea' -> 'contaminacion_aerea')."""
+    ascii_text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return "_".join("".join(c if c.isalnum() else " " for c in ascii_text.lower()).split())
+
+def snapshot_layers() -> List[Dict[str, Any]]:
+    """
+    Capas que publica el mapa: cada tipo de señal (todos los operadores y uno
+    a uno) y la contaminación (todos los contaminantes y uno a uno), con los
+    mismos parámetros por defecto que usa public/api/get_geojson.php.
+    
+    Returns:
+        List[Dict[str, Any]]: Capas con su clave, consulta y parámetros
+    """
+    layers = []
+    signal_sql = "SELECT get_signal_geojson_optimized(%s::text[], %s::text[], NULL, NULL)::text"
+    operators = sorted(get_lookup_dict("operators", key_column="name"))
+    for code in sorted(get_lookup_dict("signal_types", key_column="code")):
+        category = code.lower()
+        layers.append({'key': category, 'category': category, 'layer': None,
+                       'sql': signal_sql, 'params': ([code], None)})
+        for operator in operators:
+            layers.append({'key': f"{category}/{operator.lower()}", 'category': category, 'layer': operator,
+                           'sql': signal_sql, 'params': ([code], [operator])})
+    
+    pollution_sql = "SELECT get_pollution_geojson_optimized(%s::text[], NULL, NULL, NULL, NULL, 1)::text"
+    layers.append({'key': POLLUTION_CATEGORY, 'category': POLLUTION_CATEGORY, 'layer': None,
+                   'sql': pollution_sql, 'params': (None,)})
+    for code in sorted(get_importer().pollutants):
+        layers.append({'key': f"{POLLUTION_CATEGORY}/{code.lower()}", 'category': POLLUTION_CATEGORY,
+                       'layer': code, 'sql': pollution_sql, 'params': ([code],)})
+    return layers
+
+def render_snapshot(sql: str, params: tuple) -> bytes:
+    """
+    Obtiene una capa de la base de datos y la serializa de forma compacta.
+    
+    Se retira metadata.generated_at (cambia en cada llamada) para que el
+    contenido, y por tanto el ETag, solo cambie cuando cambian los datos;
+    la fecha de generación se publica en el manifiesto.
+    
+    Args:
+        sql (str): Consulta a la función GeoJSON de la API
+        params (tuple): Parámetros de la consulta
+    
+    Returns:
+        bytes: FeatureCollection en JSON UTF-8
+    """
+    db_cursor = get_cursor()
+    db_cursor.execute(sql, params)
+    row = db_cursor.fetchone()
+    collection = json.loads(row[0]) if row and row[0] else {"type": "FeatureCollection", "features": []}
+    collection.get('metadata', {}).pop('generated_at', None)
+    return json.dumps(collection, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _brotli_compress(data: bytes) -> Optional[bytes]:
+    """Comprime con brotli si el paquete está instalado (dependencia opcional)."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=11)
+
+def write_snapshot(directory: str, stem: str, data: bytes,
+                   previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Escribe una capa comprimida (gzip y, si está disponible, brotli) de forma atómica.
+    
+    Si el ETag coincide con el de la instantánea anterior y sus ficheros siguen
+    ahí, no se reescriben: la web conserva su caché y su fecha de modificación.
+    
+    Args:
+        directory (str): Directorio de instantáneas
+        stem (str): Nombre base del fichero
+        data (bytes): GeoJSON sin comprimir
+        previous (Dict[str, Any], optional): Entrada de la capa en el manifiesto anterior
+    
+    Returns:
+        Dict[str, Any]: Entrada del manifiesto (etag, tamaño y ficheros por codificación)
+    """
+    etag = f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+    if previous and previous.get('etag') == etag and all(
+            os.path.exists(os.path.join(directory, name)) for name in previous['encodings'].values()):
+        return previous
+    
+    encodings = {'gzip': f"{stem}.geojson.gz"}
+    write_file_atomically(os.path.join(directory, encodings['gzip']), gzip.compress(data, compresslevel=9, mtime=0))
+    compressed = _brotli_compress(data)
+    if compressed is not None:
+        encodings['br'] = f"{stem}.geojson.br"
+        write_file_atomically(os.path.join(directory, encodings['br']), compressed)
+    return {'etag': etag, 'size': len(data), 'encodings': encodings}
+
+@instrumented("export_geojson_snapshots")
+def export_geojson_snapshots(directory: str = SNAPSHOT_DIR) -> Optional[Dict[str, Any]]:
+    """
+    Genera las instantáneas GeoJSON de todas las capas y su manifiesto.
+    
+    El manifiesto (clave de capa -> etag y ficheros) se escribe el último y de
+    forma atómica: quien lo lee siempre encuentra los ficheros que anuncia.
+    Los ficheros de capas que ya no existen se eliminan después.
+    
+    Args:
+        directory (str): Directorio servido por la web
+    
+    Returns:
+        Optional[Dict[str, Any]]: Manifiesto escrito o None si no se pudo generar
+    """
+    manifest_path = os.path.join(directory, SNAPSHOT_MANIFEST_FILE)
+    try:
+        with open(manifest_path, encoding="utf-8") as manifest_file:
+            previous_layers = json.load(manifest_file).get('layers', {})
+    except (OSError, ValueError):
+        previous_layers = {}
+    
+    try:
+        layers = {}
+        for layer in snapshot_layers():
+            stem = _snapshot_slug(layer['category'])
+            if layer['layer'] is not None:
+                stem += "__" + _snapshot_slug(layer['layer'])
+            entry = write_snapshot(directory, stem, render_snapshot(layer['sql'], layer['params']),
+                                   previous_layers.get(layer['key']))
+            layers[layer['key']] = {'category': layer['category'], 'layer': layer['layer'], **entry}
+    except (psycopg2.Error, OSError) as e:
+        # Las mediciones ya están guardadas: la web sigue con el manifiesto anterior
+        logger.error(f"Error generando instantáneas GeoJSON: {e}")
+        return None
+    
+    generated_at = datetime.now().astimezone().isoformat(timespec="seconds")
+    manifest = {'generated_at': generated_at, 'checked_at': generated_at, 'layers': layers}
+    write_file_atomically(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+    
+    current_files = {name for entry in layers.values() for name in entry['encodings'].values()}
+    for entry in previous_layers.values():
+        for name in entry.get('encodings', {}).values():
+            if name not in current_files and os.path.exists(os.path.join(directory, name)):
+                os.remove(os.path.join(directory, name))
+    
+    logger.info(f"Instantáneas GeoJSON actualizadas: {len(layers)} capas en {directory}")
+    return manifest
+
+def touch_snapshot_manifest(directory: str = SNAPSHOT_DIR) -> bool:
+    """
+    Renueva checked_at en el manifiesto sin regenerar las capas.
+    
+    La web descarta las instantáneas que ninguna importación ha confirmado en
+    el último día; una importación sin cambios las confirma como vigentes.
+    generated_at (fecha de los datos) no cambia.
+    
+    Args:
+        directory (str): Directorio servido por la web
+    
+    Returns:
+        bool: False si no hay manifiesto o no se pudo actualizar
+    """
+    manifest_path = os.path.join(directory, SNAPSHOT_MANIFEST_FILE)
+    try:
+        with open(manifest_path, encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+        manifest['checked_at'] = datetime.now().astimezone().isoformat(timespec="seconds")
+        write_file_atomically(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+    except (OSError, ValueError) as e:
+        logger.warning(f"No se pudo confirmar el manifiesto de instantáneas: {e}")
+        return False
+    logger.debug(f"Instantáneas GeoJSON confirmadas sin cambios: {manifest['checked_at']}")
+    return True
+
+# =========================================================================
+# ARCHIVO PARQUET
+# =========================================================================
+
+# Copia columnar de las filas guardadas para análisis sin cargar la base de
+# datos: <dir>/month=AAAA-MM/operator_id=N/*.parquet (particionado Hive,
+# legible con pyarrow.dataset, pandas, DuckDB o Spark)
+PARQUET_ARCHIVE_ENABLED = os.getenv("IMPORT_ARCHIVE", "true").strip().lower() in ("1", "true", "yes")
+PARQUET_ARCHIVE_DIR = os.getenv("IMPORT_ARCHIVE_DIR", os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "archive"))
+# Una partición se compacta cuando acumula al menos este número de ficheros pequeños
+PARQUET_COMPACT_MIN_FILES = int(os.getenv("IMPORT_ARCHIVE_COMPACT_FILES", "8"))
+PARQUET_SMALL_FILE_BYTES = int(os.getenv("IMPORT_ARCHIVE_SMALL_FILE_MB", "16")) * 1024 * 1024
+
+def _pyarrow():
+    """Importa pyarrow si está instalado (dependencia opcional del archivo)."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+def archive_schema(pa) -> Any:
+    """
+    Esquema de los ficheros del archivo (sin las columnas de partición).
+    
+    Las columnas de medición se derivan de SIGNAL_COLUMNS y POLLUTANT_COLUMNS:
+    una por tipo, nula si la fila no trae ese valor.
+    
+    Args:
+        pa: Módulo pyarrow
+    
+    Returns:
+        pyarrow.Schema: Esquema tipado del archivo
+    """
+    fields = [
+        pa.field('timestamp_recorded', pa.timestamp('us'), nullable=False),
+        pa.field('latitude', pa.float64(), nullable=False),
+        pa.field('longitude', pa.float64(), nullable=False),
+        pa.field('utm_zone', pa.int8()),
+        pa.field('cell_id', pa.string()),
+        pa.field('cell_lat', pa.float64()),
+        pa.field('cell_lng', pa.float64()),
+        pa.field('provincia_id', pa.int32()),
+    ]
+    fields += [pa.field(f"signal_{code.lower()}_dbm", pa.int16()) for _, code in SIGNAL_COLUMNS]
+    fields += [pa.field(f"concentration_{code}", pa.float64()) for code in dict.fromkeys(POLLUTANT_COLUMNS.values())]
+    fields.append(pa.field('imported_at', pa.timestamp('us', tz='UTC'), nullable=False))
+    return pa.schema(fields)
+
+def _archive_table(pa, records: List[Dict[str, Any]], imported_at: datetime) -> Any:
+    """
+    Convierte registros de prepare_dataframe en una tabla con el esquema del archivo.
+    
+    Los valores que la base de datos no admite (ver DB_SIGNAL_DBM_RANGE y
+    DB_MAX_CONCENTRATION) se archivan como nulos, igual que no se guardan.
+    """
+    schema = archive_schema(pa)
+    columns: Dict[str, List[Any]] = {name: [] for name in schema.names}
+    for record in records:
+        values = {
+            'timestamp_recorded': record['timestamp'],
+            'latitude': record['latitude'],
+            'longitude': record['longitude'],
+            'utm_zone': record['utm_zone'],
+            'cell_id': record['cell_id'],
+            'cell_lat': record['cell_lat'],
+            'cell_lng': record['cell_lng'],
+            'provincia_id': record['provincia_id'],
+            'imported_at': imported_at,
+        }
+        for code, strength in record['signals']:
+            if DB_SIGNAL_DBM_RANGE[0] <= strength <= DB_SIGNAL_DBM_RANGE[1]:
+                values[f"signal_{code.lower()}_dbm"] = strength
+        for code, concentration in record['pollutants']:
+            if concentration <= DB_MAX_CONCENTRATION:
+                values[f"concentration_{code.lower()}"] = float(concentration)
+        for name in schema.names:
+            columns[name].append(values.get(name))
+    return pa.table(columns, schema=schema)
+
+def _conform_table(pa, table: Any, schema: Any) -> Any:
+    """Ajusta una tabla leída al esquema actual (columnas nuevas a nulo, orden y tipos)."""
+    for field in schema:
+        if field.name not in table.column_names:
+            table = table.append_column(field.name, pa.nulls(table.num_rows, type=field.type))
+    return table.select(schema.names).cast(schema)
+
+def write_parquet_atomically(pa, table: Any, path: str) -> None:
+    """
+    Escribe un fichero Parquet de forma atómica (fichero temporal + os.replace).
+    
+    Los temporales empiezan por "." y los lectores de datasets los ignoran.
+    
+    Args:
+        pa: Módulo pyarrow
+        table (pyarrow.Table): Datos a escribir
+        path (str): Ruta de destino
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=".parquet")
+    os.close(fd)
+    try:
+        pa.parquet.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+@instrumented("archive_records")
+def archive_records(records: List[Dict[str, Any]], directory: str = PARQUET_ARCHIVE_DIR) -> int:
+    """
+    Añade al archivo Parquet los registros ya guardados en la base de datos.
+    
+    Cada partición (mes, operador) recibe un fichero nuevo escrito de forma
+    atómica. Si una ejecución se interrumpe y las filas se vuelven a
+    importar, las copias idénticas se eliminan al compactar.
+    
+    Args:
+        records (List[Dict[str, Any]]): Registros guardados (generados por prepare_dataframe)
+        directory (str): Raíz del archivo
+    
+    Returns:
+        int: Filas archivadas
+    """
+    if not records:
+        return 0
+    pa = _pyarrow()
+    if pa is None:
+        logger.warning("pyarrow no está instalado: no se actualiza el archivo Parquet")
+        return 0
+    
+    partitions: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+    for record in records:
+        key = (record['timestamp'].strftime("%Y-%m"), record['operator_id'])
+        partitions.setdefault(key, []).append(record)
+    
+    imported_at = datetime.now(timezone.utc)
+    file_name = f"part-{imported_at:%Y%m%dT%H%M%S}-{os.getpid()}-{os.urandom(4).hex()}.parquet"
+    try:
+        for (month, operator_id), rows in sorted(partitions.items()):
+            path = os.path.join(directory, f"month={month}", f"operator_id={operator_id}", file_name)
+            write_parquet_atomically(pa, _archive_table(pa, rows, imported_at), path)
+    except OSError as e:
+        # Las mediciones ya están guardadas: el archivo es una copia para análisis
+        logger.error(f"Error escribiendo el archivo Parquet: {e}")
+        return 0
+    
+    logger.info(f"Archivo Parquet: {len(records)} filas en {len(partitions)} particiones")
+    return len(records)
+
+@instrumented("compact_parquet_archive")
+def compact_parquet_archive(directory: str = PARQUET_ARCHIVE_DIR,
+                            min_files: int = PARQUET_COMPACT_MIN_FILES) -> int:
+    """
+    Une los ficheros pequeños de cada partición en uno solo.
+    
+    Las filas repetidas (mismos valores salvo imported_at) se guardan una
+    vez y el resultado se ordena por timestamp_recorded. El fichero
+    compactado se escribe antes de borrar los originales: una interrupción
+    deja, como mucho, copias duplicadas que elimina la siguiente compactación.
+    
+    Args:
+        directory (str): Raíz del archivo
+        min_files (int): Ficheros pequeños a partir de los que se compacta una partición
+    
+    Returns:
+        int: Ficheros sustituidos
+    """
+    pa = _pyarrow()
+    if pa is None or not os.path.isdir(directory):
+        return 0
+    
+    schema = archive_schema(pa)
+    keys = [name for name in schema.names if name != 'imported_at']
+    replaced = 0
+    for month_dir in sorted(os.scandir(directory), key=lambda entry: entry.name):
+        if not (month_dir.is_dir() and month_dir.name.startswith("month=")):
+            continue
+        for partition_dir in sorted(os.scandir(month_dir.path), key=lambda entry: entry.name):
+            if not (partition_dir.is_dir() and partition_dir.name.startswith("operator_id=")):
+                continue
+            small_files = sorted(
+                entry.path for entry in os.scandir(partition_dir.path)
+                if entry.is_file() and entry.name.endswith(".parquet")
+                and not entry.name.startswith((".", "_")) and entry.stat().st_size < PARQUET_SMALL_FILE_BYTES)
+            if len(small_files) < max(2, min_files):
+                continue
+            
+            try:
+                table = pa.concat_tables(
+                    [_conform_table(pa, pa.parquet.ParquetFile(path).read(), schema) for path in small_files])
+                table = table.group_by(keys, use_threads=False).aggregate([('imported_at', 'max')])
+                table = table.rename_columns([name if name != 'imported_at_max' else 'imported_at'
+                                              for name in table.column_names])
+                table = table.select(schema.names).cast(schema).sort_by('timestamp_recorded')
+                stamp = datetime.now(timezone.utc)
+                write_parquet_atomically(pa, table, os.path.join(
+                    partition_dir.path, f"compact-{stamp:%Y%m%dT%H%M%S}-{os.urandom(4).hex()}.parquet"))
+                for path in small_files:
+                    os.remove(path)
+            except (OSError, pa.ArrowException) as e:
+                logger.error(f"Error compactando {partition_dir.path}: {e}")
+                continue
+            replaced += len(small_files)
+            logger.info(f"Partición {month_dir.name}/{partition_dir.name} compactada: "
+                        f"{len(small_files)} ficheros -> 1 ({table.num_rows} filas)")
+    return replaced
+
+# =========================================================================
+# IMPORTACIÓN DE VARIAS FUENTES
+# =========================================================================
+
+# Fuentes de cada ejecución (formularios de distintas campañas), separadas por
+# comas y con nombre opcional: "colegios=https://...,grupos=/datos/grupos.csv".
+# Sin definir se importa GOOGLE_SHEET_CSV_URL
+IMPORT_SOURCES = os.getenv("IMPORT_SOURCES", "")
+# Hilos que descargan y decodifican fuentes a la vez
+SOURCE_FETCH_WORKERS = max(1, int(os.getenv("IMPORT_SOURCE_WORKERS", "4")))
+# Bloques leídos a la espera de ser procesados (limita la memoria de la lectura adelantada)
+SOURCE_QUEUE_SIZE = max(1, int(os.getenv("IMPORT_SOURCE_QUEUE", "4")))
+
+def source_label(source: str) -> str:
     """
-    Valida que una fila contenga los datos mínimos requeridos.
+    Nombre por defecto de una fuente en logs y métricas.
     
     Args:
-        row (pd.Series): Fila de datos del DataFrame
+        source (str): URL, ruta local o "-" (stdin)
     
     Returns:
-        Tuple[bool, str]: (is_valid, error_message)
+        str: "stdin", el nombre del fichero local o "hoja_<clave>" para URLs
     """
-    # Campos obligatorios
-    required_fields = ["Marca temporal", "OPERADOR", "COORDENADAS_LIMPIAS"]
-    missing_fields = []
+    if source == "-":
+        return "stdin"
+    if is_remote_source(source):
+        return f"hoja_{_source_key(source)[:8]}"
+    return os.path.splitext(os.path.basename(source))[0] or source
+
+def parse_source_list(items: List[str]) -> Dict[str, str]:
+    """
+    Interpreta una lista de fuentes con nombre opcional ("nombre=fuente").
     
-    for field in required_fields:
-        if field not in row or pd.isna(row[field]) or not str(row[field]).strip():
-            missing_fields.append(field)
+    Args:
+        items (List[str]): Elementos de IMPORT_SOURCES o de --source
     
-    if missing_fields:
-        return False, f"Campos obligatorios faltantes: {', '.join(missing_fields)}"
+    Returns:
+        Dict[str, str]: Nombre -> fuente, en el orden indicado (nombres repetidos con sufijo)
+    """
+    sources: Dict[str, str] = {}
+    for item in (item.strip() for item in items):
+        if not item:
+            continue
+        name, separator, location = item.partition("=")
+        if not (separator and name and all(c.isalnum() or c in "_-" for c in name)):
+            name, location = source_label(item), item
+        unique_name, suffix = name, 2
+        while unique_name in sources:
+            unique_name, suffix = f"{name}_{suffix}", suffix + 1
+        sources[unique_name] = location
+    return sources
+
+def configured_sources() -> Dict[str, str]:
+    """Fuentes de IMPORT_SOURCES o, si no hay, la hoja GOOGLE_SHEET_CSV_URL."""
+    return parse_source_list(IMPORT_SOURCES.split(",")) or parse_source_list([GOOGLE_SHEET_CSV_URL])
+
+def read_source(name: str, source: str, chunk_size: int, full_reprocess: bool,
+                output: "queue.Queue", cancelled: threading.Event, row_limit: Optional[int] = None) -> None:
+    """
+    Descarga y lee una fuente en un hilo propio, entregando sus bloques a la cola común.
     
-    # Verificar que exista al menos una medición válida
-    signal_fields = ["Intensidad 4G", "Intensidad 5G"]
-    pollutant_fields = [
-        "Concentración PM 2.5", "ConcentraciÃ³n PM 2.5",
-        "Concentración PM 10", "ConcentraciÃ³n PM 10", 
-        "Concentración CO", "ConcentraciÃ³n CO",
-        "Concentración CO2", "ConcentraciÃ³n CO2"
-    ]
+    Mensajes (nombre, tipo, contenido) que recibe Importer.run:
+    - ("unchanged", metadatos): la hoja no ha cambiado desde la última importación
+    - ("start", (hash del contenido, huellas conocidas)): antes del primer bloque
+    - ("chunk", DataFrame): un bloque de filas tipado
+    - ("done", None) o ("error", excepción): fin de la fuente
     
-    has_signal = any(field in row and not pd.isna(row[field]) for field in signal_fields)
-    has_pollutant = any(field in row and not pd.isna(row[field]) for field in pollutant_fields)
+    Los errores se entregan como mensaje en lugar de propagarse: una fuente
+    que falla no interrumpe a las demás.
     
-    if not (has_signal or has_pollutant):
-        return False, "No se encontraron mediciones válidas (señal o contaminantes)"
+    Args:
+        name (str): Nombre de la fuente
+        source (str): URL, ruta local o "-" (stdin)
+        chunk_size (int): Filas por bloque (0 = fuente completa)
+        full_reprocess (bool): Ignorar el estado incremental
+        output (queue.Queue): Cola común de bloques
+        cancelled (threading.Event): Se activa si la importación se interrumpe
+        row_limit (int, optional): Leer solo las primeras filas de la fuente (muestra)
+    """
+    metrics = get_importer().metrics
     
-    return True, "Validación exitosa"
+    def send(kind: str, payload: Any) -> bool:
+        # Espera con tiempo límite para poder abandonar si la importación se interrumpe
+        while not cancelled.is_set():
+            try:
+                output.put((name, kind, payload), timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    try:
+        read_from, content_hash = source, None
+        if CONDITIONAL_DOWNLOAD and is_remote_source(source):
+            with metrics.phase("descarga"):
+                read_from, content_hash = fetch_source_snapshot(source)
+            metadata = load_source_metadata(source)
+            # Solo se omite si ese contenido ya se importó por completo (sin filas pendientes de reintento)
+            if (not full_reprocess and content_hash == metadata.get('imported_sha256')
+                    and not metadata.get('pending_retries')):
+                send("unchanged", metadata)
+                return
+        
+        if full_reprocess:
+            known_fingerprints = np.array([], dtype=np.uint64)
+        else:
+            with metrics.phase("estado_incremental"):
+                known_fingerprints = load_import_state(source)
+        if not send("start", (content_hash, known_fingerprints)):
+            return
+        
+        if row_limit:
+            # Bloques no mayores que la muestra: no se decodifica más de lo necesario
+            chunk_size = min(chunk_size, row_limit) if chunk_size > 0 else row_limit
+        remaining = row_limit
+        for chunk in metrics.timed_iter(load_source_chunks(read_from, chunk_size), "lectura"):
+            if remaining is not None:
+                chunk, remaining = chunk.iloc[:remaining], remaining - min(remaining, len(chunk))
+            if not send("chunk", chunk):
+                return
+            if remaining == 0:
+                break
+        send("done", None)
+    except Exception as e:
+        logger.error(f"Fuente '{name}': error de lectura: {e}")
+        send("error", e)
 
-def process_data_row(row: pd.Series, row_index: int, statistics: Dict[str, int]) -> None:
+def generate_sources_report(results: Dict[str, Dict[str, Any]]) -> None:
     """
-    Procesa una fila individual de datos con validación completa y logging.
+    Resumen por fuente de una importación de varias fuentes.
     
     Args:
-        row (pd.Series): Fila de datos a procesar
-        row_index (int): Índice de la fila para logging
-        statistics (Dict[str, int]): Diccionario de estadísticas para actualizar
+        results (Dict[str, Dict[str, Any]]): Resultado de cada fuente (ver ImportMetrics.sources)
+    """
+    logger.info("RESULTADOS POR FUENTE:")
+    for name, result in results.items():
+        statistics = result['statistics']
+        if result['status'] == "error":
+            detail = f"ERROR ({result['error']})"
+        elif result['status'] == "unchanged":
+            detail = "sin cambios"
+        else:
+            detail = (f"{statistics.get('processed', 0)} procesados, "
+                      f"{statistics.get('db_errors', 0)} errores de base de datos")
+        logger.info(f"  • {name}: {result['rows']} filas leídas, {result['pending_rows']} nuevas o modificadas - {detail}")
+
+# =========================================================================
+# IMPORTADOR
+# =========================================================================
+
+class Importer:
     """
-    logger.debug(f"Procesando registro {row_index + 1}")
+    Estado de larga duración del sistema de importación.
     
-    # Validación inicial de datos
-    is_valid, validation_message = validate_row_data(row)
-    if not is_valid:
-        logger.warning(f"Registro {row_index + 1} omitido: {validation_message}")
-        statistics['skipped'] += 1
-        return
+    Agrupa la conexión a la base de datos, el backend de almacenamiento, los
+    diccionarios de referencia, el índice de sesiones y el pool de conexiones
+    de los hilos. Todo se crea
+    bajo demanda, así que importar el módulo no abre conexiones, y un proceso
+    que reutiliza la misma instancia conserva la conexión y las cachés entre
+    importaciones. Las funciones del módulo trabajan con el importador activo
+    (ver get_importer).
+    """
     
-    # Procesamiento de timestamp
-    timestamp = parse_timestamp(row["Marca temporal"])
-    if not timestamp:
-        logger.warning(f"Registro {row_index + 1}: timestamp inválido")
-        statistics['invalid_timestamp'] += 1
-        return
+    def __init__(self, db_url: Optional[str] = None, connection_factory: Optional[Callable[[], Any]] = None,
+                 commit_every: int = COMMIT_BATCH_SIZE):
+        """
+        Args:
+            db_url (str, optional): Cadena de conexión. Por defecto SUPABASE_DB_URL;
+                "sqlite:///ruta.db" usa el backend embebido (ver create_storage_backend)
+            connection_factory (Callable, optional): Función que abre la conexión principal
+                (p. ej. una conexión simulada para pruebas); por defecto psycopg2.connect(db_url)
+            commit_every (int): Filas por transacción en el modo fila a fila (0 = autocommit)
+        """
+        self.db_url = db_url or SUPABASE_DB_URL
+        self.connection_factory = connection_factory
+        self.commit_every = commit_every
+        self.session_index: Optional[SessionIndex] = None
+        self.metrics = ImportMetrics()
+        self._storage: Optional[StorageBackend] = None
+        self._conn = None
+        self._cur = None
+        self._reference: Optional[Dict[str, Dict[str, int]]] = None
+        self._reference_loaded_at = 0.0
+        self._province_index: Optional[ProvinceIndex] = None
+        self._pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+        self._pool_lock = threading.Lock()
     
-    # Procesamiento de operador
-    operator_name = str(row["OPERADOR"]).strip()
-    operator_id = get_operator_id(operator_name)
-    if operator_id is None:
-        logger.warning(f"Registro {row_index + 1}: operador no reconocido '{operator_name}'")
-        statistics['unknown_operator'] += 1
-        return
+    @property
+    def storage(self) -> StorageBackend:
+        """Backend de almacenamiento correspondiente a db_url."""
+        if self._storage is None:
+            self._storage = create_storage_backend(self.db_url)
+        return self._storage
     
-    # Procesamiento de coordenadas
-    location_str = str(row["COORDENADAS_LIMPIAS"])
-    lat, lon = parse_location(location_str)
-    if lat is None or lon is None:
-        logger.warning(f"Registro {row_index + 1}: coordenadas inválidas '{location_str}'")
-        statistics['invalid_coords'] += 1
-        return
+    @property
+    def conn(self):
+        """Conexión principal (autocommit), abierta en el primer uso."""
+        if self._conn is None or self._conn.closed:
+            try:
+                if self.connection_factory is not None:
+                    self._conn = self.connection_factory()
+                else:
+                    self._conn = psycopg2.connect(self.db_url, cursor_factory=InstrumentedCursor)
+                self._conn.autocommit = True
+                self._cur = None
+                logger.info("Conexión a la base de datos establecida exitosamente")
+            except psycopg2.Error as e:
+                logger.error(f"Error al conectar con la base de datos: {e}")
+                raise
+        return self._conn
     
-    logger.debug(f"Registro {row_index + 1} - Coordenadas: ({lat}, {lon}), "
-                f"Timestamp: {timestamp}, Operador: {operator_name}")
-    # NUEVA VALIDACIÓN: Verificar que el punto está en España
-    coords_valid, coords_message = validate_coordinates_spain(lat, lon)
-    if not coords_valid:
-        logger.warning(f"Registro {row_index + 1}: {coords_message}")
-        # Añadir nueva estadística para puntos fuera de España
-        if 'outside_spain' not in statistics:
-            statistics['outside_spain'] = 0
-        statistics['outside_spain'] += 1
-        return
+    @property
+    def cur(self):
+        """Cursor de la conexión principal."""
+        connection = self.conn
+        if self._cur is None or self._cur.closed:
+            self._cur = connection.cursor()
+        return self._cur
     
-    logger.debug(f"Registro {row_index + 1} - Coordenadas validadas en España: ({lat}, {lon}), "
-                f"Timestamp: {timestamp}, Operador: {operator_name}")
+    def _reference_data(self) -> Dict[str, Dict[str, int]]:
+        if self._reference is None:
+            self._reference = {
+                'operators': get_lookup_dict("operators", key_column="display_name"),
+                'signal_types': get_lookup_dict("signal_types", key_column="display_name"),
+                'pollutants': get_lookup_dict("pollutant_types", key_column="code"),
+            }
+            self._reference_loaded_at = time.monotonic()
+            logger.info(f"Datos de referencia cargados - Operadores: {len(self._reference['operators'])}, "
+                        f"Tipos de señal: {len(self._reference['signal_types'])}, "
+                        f"Contaminantes: {len(self._reference['pollutants'])}")
+        return self._reference
     
-    # Crear o encontrar sesión de medición
-    session_id, is_new_session = insert_or_get_session(lat, lon, timestamp, operator_id)
-    if session_id is None:
-        logger.error(f"Registro {row_index + 1}: error creando sesión")
-        statistics['db_errors'] += 1
-        return
+    @property
+    def operators(self) -> Dict[str, int]:
+        """Operadores activos por display_name."""
+        return self._reference_data()['operators']
     
-    # Actualizar estadísticas de sesiones
-    if is_new_session:
-        statistics['new_sessions'] += 1
-    else:
-        statistics['existing_sessions'] += 1
+    @property
+    def signal_types(self) -> Dict[str, int]:
+        """Tipos de señal activos por display_name."""
+        return self._reference_data()['signal_types']
     
-    # Procesar mediciones de señal
-    signal_measurements = 0
-    signal_types = [("Intensidad 4G", "4G"), ("Intensidad 5G", "5G")]
+    @property
+    def pollutants(self) -> Dict[str, int]:
+        """Contaminantes activos por código."""
+        return self._reference_data()['pollutants']
     
-    for field_name, signal_code in signal_types:
-        if field_name in row and not pd.isna(row[field_name]):
-            if upsert_signal_measurement(session_id, signal_code, row[field_name]):
-                signal_measurements += 1
+    @property
+    def province_index(self) -> ProvinceIndex:
+        """Índice espacial de provincias, cargado en el primer uso."""
+        if self._province_index is None:
+            self._province_index = load_province_index()
+        return self._province_index
     
-    # Procesar mediciones de contaminantes
-    pollutant_measurements = 0
-    pollutant_mapping = {
-        "Concentración PM 2.5": "pm25",
-        "ConcentraciÃ³n PM 2.5": "pm25",
-        "Concentración PM 10": "pm10",
-        "ConcentraciÃ³n PM 10": "pm10", 
-        "Concentración CO": "co",
-        "ConcentraciÃ³n CO": "co",
-        "Concentración CO2": "co2",
-        "ConcentraciÃ³n CO2": "co2"
-    }
-    logger.debug(f"Registro {row_index + 1} - Columnas disponibles: {list(row.index)}")
-    logger.debug(f"Registro {row_index + 1} - Diccionario de contaminantes cargado: {list(pollutants_dict.keys())}")
+    def refresh_reference_data(self, max_age: Optional[float] = None) -> bool:
+        """
+        Descarta los diccionarios de referencia y las provincias para recargarlos en el siguiente uso.
+        
+        Args:
+            max_age (float, optional): Solo si se cargaron hace más de estos segundos
+        
+        Returns:
+            bool: True si se han descartado
+        """
+        if (max_age is not None and self._reference is not None
+                and time.monotonic() - self._reference_loaded_at < max_age):
+            return False
+        self._reference = None
+        self._province_index = None
+        return True
+    
+    def connection_pool(self, max_connections: int) -> psycopg2.pool.ThreadedConnectionPool:
+        """
+        Obtiene (creándolo si es necesario) el pool de conexiones de los hilos.
+        
+        Args:
+            max_connections (int): Número máximo de conexiones del pool
+        
+        Returns:
+            psycopg2.pool.ThreadedConnectionPool: Pool compartido por los hilos
+        """
+        with self._pool_lock:
+            if self._pool is None or self._pool.closed or self._pool.maxconn < max_connections:
+                if self._pool is not None and not self._pool.closed:
+                    self._pool.closeall()
+                self._pool = psycopg2.pool.ThreadedConnectionPool(
+                    1, max_connections, self.db_url, cursor_factory=InstrumentedCursor)
+                logger.info(f"Pool de conexiones creado ({max_connections} conexiones máximo)")
+            return self._pool
     
-    for field_name, pollutant_code in pollutant_mapping.items():
-        if field_name in row:
-            field_value = row[field_name]
-            logger.debug(f"Registro {row_index + 1} - Campo '{field_name}': valor='{field_value}', es_na={pd.isna(field_value)}")
+    def run(self, full_reprocess: bool = False, source: Optional[str] = None,
+            chunk_size: int = CSV_CHUNK_SIZE, workers: int = IMPORT_WORKERS,
+            sources: Optional[Dict[str, str]] = None, row_limit: Optional[int] = None) -> Dict[str, int]:
+        """
+        Ejecuta una importación completa con este importador como importador activo.
+        
+        Las fuentes se descargan y leen en paralelo (read_source) y sus bloques
+        pasan, según van llegando, por la misma validación y escritura en esta
+        conexión. Cada fuente conserva sus estadísticas y su estado incremental;
+        una fuente que falla no detiene a las demás.
+        
+        Args:
+            full_reprocess (bool): Ignorar el estado incremental y reprocesar todas las filas
+            source (str, optional): URL, fichero local o "-" (stdin) a importar como única fuente
+            chunk_size (int): Filas por bloque de lectura (0 = hoja completa en memoria)
+            workers (int): Hilos de escritura en paralelo, cada uno con su conexión
+            sources (Dict[str, str], optional): Nombre -> fuente. Por defecto configured_sources()
+            row_limit (int, optional): Importar solo las primeras filas de cada fuente, sin
+                guardar su estado incremental (muestra para --profile)
+        
+        Returns:
+            Dict[str, int]: Estadísticas de procesamiento (suma de todas las fuentes)
+        
+        Raises:
+            Exception: El error de lectura de la primera fuente si han fallado todas
+        """
+        set_importer(self)
+        if source is not None:
+            sources = parse_source_list([source])
+        sources = sources or configured_sources()
+        workers = max(1, workers)
+        if workers > 1 and not self.storage.supports_parallel:
+            logger.warning(f"El backend {self.storage.name} no admite escritura en paralelo: se usará un hilo")
+            workers = 1
+        bulk_load = BULK_LOAD_MODE and self.storage.supports_bulk_load
+        # Otras escrituras pueden haber cambiado las sesiones desde la ejecución anterior
+        self.session_index = None
+        self.metrics = ImportMetrics()
+        
+        logger.info("="*80)
+        logger.info("SISTEMA DE IMPORTACIÓN DE DATOS DE MEDICIONES AMBIENTALES")
+        logger.info("Trabajo Final de Grado - Análisis de Calidad Ambiental y Conectividad")
+        logger.info("="*80)
+        
+        # Inicialización de estadísticas de procesamiento
+        processing_stats = create_processing_stats()
+        results = {name: {'source': location, 'status': "pending", 'error': None, 'rows': 0, 'pending_rows': 0,
+                          'statistics': create_processing_stats()} for name, location in sources.items()}
+        self.metrics.sources = results
+        prefix = "" if len(sources) == 1 else "[{}] "
+        
+        try:
+            # Fases 1 y 2: descarga y lectura en paralelo, procesamiento de los bloques según llegan
+            logger.info(f"FASE 1: Carga de datos desde {'la fuente' if len(sources) == 1 else f'{len(sources)} fuentes'}")
+            if full_reprocess:
+                logger.info("Reprocesado completo solicitado (--full)")
+            if row_limit:
+                logger.info(f"Muestra: primeras {row_limit} filas de cada fuente (no se guarda el estado incremental)")
+            logger.info(f"FASE 2: Procesamiento de registros nuevos o modificados"
+                        f"{' (carga masiva)' if bulk_load else ''}"
+                        f"{f' con {workers} hilos' if workers > 1 else ''}")
             
-            if not pd.isna(field_value):
-                logger.debug(f"Registro {row_index + 1} - Intentando procesar {pollutant_code} con valor {field_value}")
-                if upsert_pollutant_measurement(session_id, pollutant_code, field_value):
-                    pollutant_measurements += 1
-                    logger.debug(f"Registro {row_index + 1} - ✓ Contaminante {pollutant_code} procesado exitosamente")
-                else:
-                    logger.warning(f"Registro {row_index + 1} - ✗ Falló procesamiento de {pollutant_code}")
+            chunk_queue: queue.Queue = queue.Queue(maxsize=SOURCE_QUEUE_SIZE)
+            cancelled = threading.Event()
+            readers = ThreadPoolExecutor(max_workers=min(SOURCE_FETCH_WORKERS, len(sources)),
+                                         thread_name_prefix="source")
+            progress: Dict[str, Dict[str, Any]] = {}
+            try:
+                for name, location in sources.items():
+                    readers.submit(read_source, name, location, chunk_size, full_reprocess, chunk_queue,
+                                   cancelled, row_limit)
+                remaining = len(sources)
+                while remaining:
+                    name, kind, payload = chunk_queue.get()
+                    result = results[name]
+                    if kind == "start":
+                        content_hash, known_fingerprints = payload
+                        progress[name] = {'content_hash': content_hash, 'known': known_fingerprints, 'completed': [],
+                                          'dead_letters': DeadLetterStore.load(sources[name]) if DEAD_LETTER_ENABLED else None}
+                        result['status'] = "reading"
+                    elif kind == "chunk":
+                        state = progress[name]
+                        result['rows'] += len(payload)
+                        fingerprints, chunk_pending = process_dataframe(
+                            payload, result['statistics'], state['known'], workers, state['dead_letters'])
+                        state['completed'].append(fingerprints)
+                        result['pending_rows'] += chunk_pending
+                        logger.info(f"{prefix.format(name)}Bloque procesado: {result['rows']} filas leídas, "
+                                    f"{result['pending_rows']} nuevas o modificadas")
+                    else:
+                        remaining -= 1
+                        if kind == "unchanged":
+                            result['status'] = "unchanged"
+                            generate_no_changes_report(payload)
+                        elif kind == "error":
+                            result['status'], result['error'] = "error", payload
+                        else:
+                            result['status'] = "done"
+                            if not row_limit:
+                                self._save_source_state(name, sources[name], result, progress[name])
+            finally:
+                cancelled.set()
+                readers.shutdown(wait=False, cancel_futures=True)
+            
+            for result in results.values():
+                merge_statistics(processing_stats, result['statistics'])
+            failed = [result for result in results.values() if result['status'] == "error"]
+            if failed and len(failed) == len(results):
+                raise failed[0]['error']
+            for name, result in results.items():
+                if result['status'] == "error":
+                    logger.error(f"Fuente '{name}' no importada: {result['error']}")
+            
+            total_rows = sum(result['rows'] for result in results.values())
+            pending_rows = sum(result['pending_rows'] for result in results.values())
+            if all(result['status'] == "unchanged" for result in results.values()):
+                self._publish_snapshots(processing_stats['processed'])
+                export_metrics(self.metrics.summary(processing_stats, 0))
+                return processing_stats
+            if total_rows == 0:
+                logger.warning("No se encontraron datos para procesar")
+                self._publish_snapshots(processing_stats['processed'])
+                return processing_stats
+            dataframe_memory = self.metrics.dataframe_memory
+            logger.info(f"Memoria de los DataFrames: {dataframe_memory['peak_chunk'] / 1048576:.1f} MiB "
+                        f"el mayor bloque, {dataframe_memory['total'] / 1048576:.1f} MiB en total")
+            
+            # Fase 3: Generación de informe final
+            logger.info("FASE 3: Generación de informe de resultados")
+            generate_processing_report(processing_stats, pending_rows)
+            if len(results) > 1:
+                generate_sources_report(results)
+            
+            # Fase 4: Instantáneas del mapa
+            self._publish_snapshots(processing_stats['processed'])
+            
+            # Fase 5: Compactación de los ficheros pequeños del archivo Parquet
+            if PARQUET_ARCHIVE_ENABLED and processing_stats['processed'] > 0:
+                logger.info("FASE 5: Compactación del archivo Parquet")
+                with self.metrics.phase("archivo"):
+                    compact_parquet_archive()
+            
+            export_metrics(self.metrics.summary(processing_stats, pending_rows))
+            return processing_stats
+            
+        except Exception as e:
+            logger.error(f"Error crítico en el proceso de importación: {e}")
+            raise
+    
+    def _publish_snapshots(self, processed: int) -> None:
+        """
+        Regenera las instantáneas del mapa si han cambiado los datos (o no
+        existen) y, si no, renueva su checked_at para que la web las siga usando.
+        """
+        if not (SNAPSHOT_EXPORT_ENABLED and self.storage.supports_snapshots):
+            return
+        if processed > 0 or not os.path.exists(os.path.join(SNAPSHOT_DIR, SNAPSHOT_MANIFEST_FILE)):
+            logger.info("FASE 4: Generación de instantáneas GeoJSON")
+            with self.metrics.phase("instantaneas"):
+                export_geojson_snapshots(SNAPSHOT_DIR)
         else:
-            logger.debug(f"Registro {row_index + 1} - Campo '{field_name}' no encontrado en CSV")
+            touch_snapshot_manifest(SNAPSHOT_DIR)
     
-    # Actualizar estadísticas finales
-    statistics['processed'] += 1
-    statistics['total_signals'] += signal_measurements
-    statistics['total_pollutants'] += pollutant_measurements
+    def _save_source_state(self, name: str, source: str, result: Dict[str, Any], state: Dict[str, Any]) -> None:
+        """Guarda el estado incremental de una fuente leída por completo."""
+        if result['rows'] == 0:
+            logger.warning(f"Fuente '{name}': no se encontraron datos para procesar")
+            return
+        with self.metrics.phase("estado_incremental"):
+            if state['dead_letters'] is not None:
+                state['dead_letters'].save()
+            completed = np.concatenate(state['completed'])
+            save_import_state(source, completed)
+            if state['content_hash'] is not None:
+                save_source_metadata(source, imported_sha256=state['content_hash'],
+                                     pending_retries=result['rows'] - len(completed))
     
-    logger.debug(f"Registro {row_index + 1} procesado exitosamente: "
-                f"{signal_measurements} señales, {pollutant_measurements} contaminantes")
+    def retry_rejected(self, sources: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+        """
+        Vuelve a enviar por el pipeline solo las filas rechazadas guardadas.
+        
+        Pensado para después de corregir datos de referencia (p. ej. dar de
+        alta un alias de operador). Las filas que ahora se guardan salen del
+        fichero de rechazadas y se añaden al estado incremental de su fuente;
+        las que vuelven a fallar siguen en él con el nuevo motivo.
+        
+        Args:
+            sources (Dict[str, str], optional): Nombre -> fuente. Por defecto todas las que tienen filas rechazadas
+        
+        Returns:
+            Dict[str, int]: Estadísticas de procesamiento de las filas reintentadas
+        """
+        set_importer(self)
+        self.session_index = None
+        self.metrics = ImportMetrics()
+        locations = list(sources.values()) if sources else dead_letter_sources()
+        processing_stats = create_processing_stats()
+        total_rows = 0
+        
+        logger.info("REINTENTO DE FILAS RECHAZADAS")
+        for location in locations:
+            dead_letters = DeadLetterStore.load(location)
+            if not dead_letters:
+                logger.info(f"Sin filas rechazadas en {location}")
+                continue
+            rows = len(dead_letters)
+            statistics = create_processing_stats()
+            completed, _ = process_dataframe(dead_letters.to_dataframe(), statistics,
+                                             np.array([], dtype=np.uint64), dead_letters=dead_letters)
+            with self.metrics.phase("estado_incremental"):
+                save_import_state(location, np.concatenate([load_import_state(location), completed]))
+                dead_letters.save()
+            logger.info(f"{location}: {rows - len(dead_letters)} de {rows} filas recuperadas, "
+                        f"{len(dead_letters)} siguen rechazadas")
+            merge_statistics(processing_stats, statistics)
+            total_rows += rows
+        
+        if total_rows:
+            generate_processing_report(processing_stats, total_rows)
+            self._publish_snapshots(processing_stats['processed'])
+            export_metrics(self.metrics.summary(processing_stats, total_rows))
+        return processing_stats
+    
+    def close(self) -> None:
+        """Cierra el cursor, la conexión principal, el pool de conexiones y el backend."""
+        if self._cur is not None and not self._cur.closed:
+            self._cur.close()
+            logger.debug("Cursor de base de datos cerrado")
+        if self._conn is not None and not self._conn.closed:
+            self._conn.close()
+            logger.debug("Conexión a base de datos cerrada")
+        if self._pool is not None and not self._pool.closed:
+            self._pool.closeall()
+            logger.debug("Pool de conexiones cerrado")
+        if self._storage is not None:
+            self._storage.close()
+        self._cur = self._conn = self._pool = None
 
-# =========================================================================
-# FUNCIÓN PRINCIPAL DEL SISTEMA
-# =========================================================================
+# Importador activo del proceso (se crea en el primer uso)
+_importer: Optional[Importer] = None
 
-def main() -> None:
+def get_importer() -> Importer:
     """
-    Función principal del sistema de importación.
+    Devuelve el importador activo, creando uno con la configuración por defecto si no existe.
     
-    Ejecuta el proceso completo de descarga, validación, procesamiento e 
-    inserción de datos con logging y estadísticas detalladas.
+    Returns:
+        Importer: Importador activo
     """
-    logger.info("="*80)
-    logger.info("SISTEMA DE IMPORTACIÓN DE DATOS DE MEDICIONES AMBIENTALES")
-    logger.info("Trabajo Final de Grado - Análisis de Calidad Ambiental y Conectividad")
-    logger.info("="*80)
+    global _importer
+    if _importer is None:
+        _importer = Importer()
+    return _importer
+
+def set_importer(importer: Importer) -> None:
+    """
+    Establece el importador activo que usan las funciones del módulo.
     
-    # Inicialización de estadísticas de procesamiento
-    processing_stats = {
-        'processed': 0,
-        'new_sessions': 0,
-        'existing_sessions': 0,
-        'skipped': 0,
-        'invalid_timestamp': 0,
-        'invalid_coords': 0,
-        'unknown_operator': 0,
-        'db_errors': 0,
-        'total_signals': 0,
-        'total_pollutants': 0
-    }
+    Args:
+        importer (Importer): Importador a activar
+    """
+    global _importer
+    _importer = importer
+
+def main(full_reprocess: bool = False, source: Optional[str] = None,
+         chunk_size: int = CSV_CHUNK_SIZE, workers: int = IMPORT_WORKERS,
+         sources: Optional[Dict[str, str]] = None, row_limit: Optional[int] = None) -> Dict[str, int]:
+    """
+    Función principal del sistema de importación.
+    
+    Configura el logging y ejecuta una importación con el importador activo,
+    liberando sus recursos al terminar.
+    
+    Args:
+        full_reprocess (bool): Ignorar el estado incremental y reprocesar todas las filas
+        source (str, optional): URL, fichero local o "-" (stdin) a importar como única fuente
+        chunk_size (int): Filas por bloque de lectura (0 = hoja completa en memoria)
+        workers (int): Hilos de escritura en paralelo, cada uno con su conexión
+        sources (Dict[str, str], optional): Nombre -> fuente. Por defecto configured_sources()
+        row_limit (int, optional): Importar solo las primeras filas de cada fuente
     
+    Returns:
+        Dict[str, int]: Estadísticas de procesamiento
+    """
+    setup_logging()
     try:
-        # Fase 1: Carga de datos
-        logger.info("FASE 1: Carga de datos desde Google Sheets")
-        dataframe = load_csv_from_sheets(GOOGLE_SHEET_CSV_URL)
-        
-        if dataframe.empty:
-            logger.warning("No se encontraron datos para procesar")
-            return
-        
-        # Fase 2: Procesamiento de datos
-        logger.info(f"FASE 2: Procesamiento de {len(dataframe)} registros")
-        
-        for index, row in dataframe.iterrows():
-            # Convertir el índice a int para evitar problemas de tipo
-            row_number = int(index) if isinstance(index, (int, float)) else 0
-            try:
-                process_data_row(row, row_number, processing_stats)
-            except Exception as e:
-                logger.error(f"Error procesando registro {row_number + 1}: {e}")
-                processing_stats['db_errors'] += 1
-                continue
-        
-        # Fase 3: Generación de informe final
-        logger.info("FASE 3: Generación de informe de resultados")
-        generate_processing_report(processing_stats, len(dataframe))
-        
-    except Exception as e:
-        logger.error(f"Error crítico en el proceso de importación: {e}")
-        raise
+        return get_importer().run(full_reprocess=full_reprocess, source=source, chunk_size=chunk_size,
+                                  workers=workers, sources=sources, row_limit=row_limit)
     finally:
         # Limpieza y cierre de recursos
         cleanup_resources()
 
+def retry_rejected(sources: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+    """
+    Reintenta las filas rechazadas guardadas con el importador activo.
+    
+    Args:
+        sources (Dict[str, str], optional): Nombre -> fuente. Por defecto todas las que tienen filas rechazadas
+    
+    Returns:
+        Dict[str, int]: Estadísticas de procesamiento
+    """
+    setup_logging()
+    try:
+        return get_importer().retry_rejected(sources)
+    finally:
+        cleanup_resources()
+
+def generate_no_changes_report(metadata: Dict[str, Any]) -> None:
+    """
+    Informe de una ejecución que termina sin procesar filas porque la hoja no ha cambiado.
+    
+    Args:
+        metadata (Dict[str, Any]): Metadatos recordados de la fuente
+    """
+    logger.info("="*80)
+    logger.info("INFORME DE RESULTADOS DE IMPORTACIÓN")
+    logger.info("="*80)
+    logger.info("SIN CAMBIOS: la hoja es idéntica a la última importada, no hay registros que procesar")
+    logger.info(f"  • Última descarga: {metadata.get('downloaded_at', 'desconocida')} "
+                f"({metadata.get('size', 0)} bytes, SHA-256 {str(metadata.get('sha256'))[:12]})")
+    if metadata.get('etag') or metadata.get('last_modified'):
+        logger.info(f"  • Validadores HTTP: ETag={metadata.get('etag')}, Last-Modified={metadata.get('last_modified')}")
+    logger.info("="*80)
+
 def generate_processing_report(stats: Dict[str, int], total_rows: int) -> None:
     """
     Genera un informe detallado de los resultados del procesamiento.
@@ -798,6 +4877,8 @@ def generate_processing_report(stats: Dict[str, int], total_rows: int) -> None:
     logger.info(f"  • Sesiones existentes actualizadas: {stats['existing_sessions']}")
     logger.info(f"  • Total de mediciones de señal registradas: {stats['total_signals']}")
     logger.info(f"  • Total de mediciones de contaminantes registradas: {stats['total_pollutants']}")
+    if stats.get('unchanged'):
+        logger.info(f"  • Registros sin cambios desde la última importación (omitidos): {stats['unchanged']}")
     
     # Análisis de errores
     total_errors = (stats['skipped'] + stats['invalid_timestamp'] + 
@@ -832,26 +4913,404 @@ def cleanup_resources() -> None:
     Limpia y cierra todos los recursos utilizados.
     """
     try:
-        if 'cur' in globals() and cur:
-            cur.close()
-            logger.debug("Cursor de base de datos cerrado")
-        
-        if 'conn' in globals() and conn:
-            conn.close()
-            logger.debug("Conexión a base de datos cerrada")
-            
+        if _importer is not None:
+            _importer.close()
         logger.info("Recursos del sistema liberados correctamente")
         
     except Exception as e:
         logger.error(f"Error durante la limpieza de recursos: {e}")
 
+# =========================================================================
+# MODO DEMONIO
+# =========================================================================
+
+# Segundos entre sondeos de la hoja y variación aleatoria (fracción del intervalo)
+DAEMON_INTERVAL_SECONDS = float(os.getenv("IMPORT_DAEMON_INTERVAL", "60"))
+DAEMON_JITTER = float(os.getenv("IMPORT_DAEMON_JITTER", "0.1"))
+# Antigüedad máxima de los diccionarios de referencia y las provincias (SIGHUP los recarga antes)
+REFERENCE_DATA_TTL_SECONDS = float(os.getenv("IMPORT_REFERENCE_TTL", "3600"))
+
+class ImportDaemon:
+    """
+    Proceso de larga duración que sondea la fuente a intervalos regulares.
+    
+    Mantiene calientes entre sondeos la conexión, los diccionarios de
+    referencia, el índice de provincias y la geometría de España preparada,
+    así que cada sondeo solo paga la descarga condicional y las filas nuevas.
+    SIGTERM/SIGINT terminan el proceso al acabar la importación en curso y
+    SIGHUP fuerza la recarga de los datos de referencia.
+    """
+    
+    def __init__(self, importer: Optional[Importer] = None, interval: float = DAEMON_INTERVAL_SECONDS,
+                 jitter: float = DAEMON_JITTER, reference_ttl: float = REFERENCE_DATA_TTL_SECONDS):
+        """
+        Args:
+            importer (Importer, optional): Importador a reutilizar. Por defecto el activo
+            interval (float): Segundos entre sondeos
+            jitter (float): Variación aleatoria del intervalo (0.1 = ±10 %)
+            reference_ttl (float): Segundos tras los que se recargan los datos de referencia
+        """
+        self.importer = importer or get_importer()
+        self.interval = max(0.0, interval)
+        self.jitter = min(max(0.0, jitter), 1.0)
+        self.reference_ttl = reference_ttl
+        self.stop_event = threading.Event()
+        self.refresh_requested = threading.Event()
+        self.runs = 0
+    
+    def install_signal_handlers(self) -> None:
+        """Registra SIGTERM/SIGINT (parada ordenada) y SIGHUP (recarga de referencias)."""
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stop())
+        signal.signal(signal.SIGINT, lambda signum, frame: self.stop())
+        if hasattr(signal, "SIGHUP"):  # no existe en Windows
+            signal.signal(signal.SIGHUP, lambda signum, frame: self.refresh_requested.set())
+    
+    def stop(self) -> None:
+        """Pide la parada: el sondeo en curso termina y no se inicia otro."""
+        if not self.stop_event.is_set():
+            logger.info("Parada solicitada: se terminará al acabar la importación en curso")
+        self.stop_event.set()
+    
+    def next_delay(self) -> float:
+        """
+        Espera hasta el siguiente sondeo, con variación aleatoria para no
+        sincronizar varias instancias contra la hoja.
+        
+        Returns:
+            float: Segundos de espera
+        """
+        return max(0.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+    
+    def warm_up(self) -> None:
+        """Abre la conexión y carga referencias, provincias y geometría antes del primer sondeo."""
+        set_importer(self.importer)
+        self.importer.storage.connect()
+        self.importer.operators
+        self.importer.province_index
+        get_spain_geometry()
+        logger.info("Demonio de importación preparado (conexión y cachés cargadas)")
+    
+    def run_once(self, **run_options: Any) -> Optional[Dict[str, int]]:
+        """
+        Ejecuta un sondeo aislando sus errores: un fallo no detiene el demonio.
+        
+        Args:
+            **run_options: Opciones de Importer.run (source, sources, chunk_size, workers)
+        
+        Returns:
+            Optional[Dict[str, int]]: Estadísticas del sondeo o None si ha fallado
+        """
+        if self.refresh_requested.is_set():
+            self.refresh_requested.clear()
+            self.importer.refresh_reference_data()
+            logger.info("Datos de referencia recargados por señal")
+        elif self.importer.refresh_reference_data(max_age=self.reference_ttl):
+            logger.info("Datos de referencia caducados: se recargan en este sondeo")
+        
+        self.runs += 1
+        try:
+            return self.importer.run(**run_options)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            # Conexión perdida: se reabre en el siguiente sondeo
+            logger.error(f"Sondeo {self.runs}: error de conexión con la base de datos ({e}); se reconectará")
+            self.importer.close()
+        except Exception as e:
+            logger.error(f"Sondeo {self.runs} fallido: {e}")
+        return None
+    
+    def serve(self, **run_options: Any) -> None:
+        """
+        Sondea la fuente hasta recibir una señal de parada.
+        
+        Args:
+            **run_options: Opciones de Importer.run (source, sources, chunk_size, workers)
+        """
+        self.install_signal_handlers()
+        self.warm_up()
+        logger.info(f"Modo demonio: sondeo cada {self.interval:g}s (±{self.jitter:.0%}), "
+                    f"referencias cada {self.reference_ttl:g}s")
+        while not self.stop_event.is_set():
+            self.run_once(**run_options)
+            self.stop_event.wait(self.next_delay())
+        logger.info(f"Demonio de importación detenido tras {self.runs} sondeos")
+
+def run_daemon(source: Optional[str] = None, chunk_size: int = CSV_CHUNK_SIZE,
+               workers: int = IMPORT_WORKERS, interval: float = DAEMON_INTERVAL_SECONDS,
+               jitter: float = DAEMON_JITTER, sources: Optional[Dict[str, str]] = None) -> None:
+    """
+    Ejecuta el importador en modo demonio con el importador activo.
+    
+    Args:
+        source (str, optional): URL, fichero local o "-" (stdin) a importar como única fuente
+        chunk_size (int): Filas por bloque de lectura (0 = hoja completa en memoria)
+        workers (int): Hilos de escritura en paralelo, cada uno con su conexión
+        interval (float): Segundos entre sondeos
+        jitter (float): Variación aleatoria del intervalo
+        sources (Dict[str, str], optional): Nombre -> fuente. Por defecto configured_sources()
+    """
+    setup_logging()
+    try:
+        ImportDaemon(interval=interval, jitter=jitter).serve(
+            source=source, chunk_size=chunk_size, workers=workers, sources=sources)
+    finally:
+        cleanup_resources()
+
+# =========================================================================
+# PERFILADO (--profile)
+# =========================================================================
+
+# Directorio de los informes de perfilado (pstats, pilas colapsadas y resumen)
+PROFILE_DIR = os.getenv("IMPORT_PROFILE_DIR", os.path.join(IMPORT_CACHE_DIR, "profiles"))
+# Segundos entre muestras de las pilas de los hilos
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("IMPORT_PROFILE_INTERVAL", "0.005"))
+# Funciones del camino crítico resumidas en el informe, por etapa. El procesamiento
+# por columnas sustituye a las funciones de fila por sus versiones vectorizadas
+PROFILE_HOT_FUNCTIONS = {
+    "timestamp": ("parse_timestamp", "parse_timestamp_column", "detect_timestamp_format"),
+    "ubicacion": ("parse_location", "parse_location_column"),
+    "espana": ("is_point_in_spain", "points_in_spain",
+               "validate_coordinates_spain", "validate_coordinates_spain_batch"),
+    "sesiones": ("find_existing_session", "insert_or_get_session", "prepare_session_index"),
+    "upserts": ("upsert_signal_measurement", "upsert_pollutant_measurement", "bulk_load_records"),
+}
+
+class StackSampler:
+    """
+    Perfilador por muestreo: anota periódicamente la pila de cada hilo.
+    
+    A diferencia de cProfile, que solo ve el hilo que lo activa, cubre también
+    los hilos de lectura de fuentes y de escritura en paralelo. Las pilas se
+    acumulan en el formato colapsado de flamegraph.pl y speedscope
+    ("hilo;modulo:funcion;... muestras").
+    """
+    
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self.stacks: Dict[Tuple[str, ...], int] = {}
+        # Muestras en las que alguna pila pasa por cada etapa de PROFILE_HOT_FUNCTIONS
+        self.stage_samples = {stage: 0 for stage in PROFILE_HOT_FUNCTIONS}
+        self._stages = {function: stage for stage, functions in PROFILE_HOT_FUNCTIONS.items()
+                        for function in functions}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+    
+    def _sample_loop(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stages = set()
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    if code.co_filename == __file__ and code.co_name in self._stages:
+                        stages.add(self._stages[code.co_name])
+                    stack.append(f"{os.path.splitext(os.path.basename(code.co_filename))[0]}:{code.co_name}")
+                    frame = frame.f_back
+                stack.append(thread_names.get(ident, str(ident)))
+                key = tuple(reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+            for stage in stages:
+                self.stage_samples[stage] += 1
+            self.samples += 1
+    
+    def collapsed(self) -> str:
+        """Pilas en formato colapsado, una por línea."""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+def hot_path_breakdown(stats: pstats.Stats, sampler: StackSampler, elapsed: float) -> List[Dict[str, Any]]:
+    """
+    Resume el tiempo de las funciones de PROFILE_HOT_FUNCTIONS.
+    
+    El tiempo de cada etapa sale del muestreo (inclusivo y sin contar dos veces
+    las funciones anidadas de una misma etapa); las llamadas y los tiempos por
+    función, de cProfile (solo el hilo principal).
+    
+    Args:
+        stats (pstats.Stats): Estadísticas de cProfile
+        sampler (StackSampler): Muestreo de la misma ejecución
+        elapsed (float): Duración de la ejecución en segundos
+    
+    Returns:
+        List[Dict[str, Any]]: Una entrada por etapa, de mayor a menor tiempo
+    """
+    functions_by_name = {}
+    for (filename, _, function), (_, calls, own_time, cumulative_time, _) in stats.stats.items():
+        if filename == __file__:
+            functions_by_name[function] = {'function': function, 'calls': calls,
+                                           'own_seconds': own_time, 'cumulative_seconds': cumulative_time}
+    breakdown = []
+    for stage, functions in PROFILE_HOT_FUNCTIONS.items():
+        share = sampler.stage_samples[stage] / sampler.samples if sampler.samples else 0.0
+        breakdown.append({
+            'stage': stage,
+            'share': share,
+            'seconds': share * elapsed,
+            'functions': [functions_by_name[function] for function in functions if function in functions_by_name],
+        })
+    return sorted(breakdown, key=lambda entry: entry['seconds'], reverse=True)
+
+def generate_profile_report(breakdown: List[Dict[str, Any]], elapsed: float) -> str:
+    """
+    Tabla del camino crítico para el log y el informe de texto.
+    
+    Args:
+        breakdown (List[Dict[str, Any]]): Resultado de hot_path_breakdown
+        elapsed (float): Duración de la ejecución en segundos
+    
+    Returns:
+        str: Informe en texto
+    """
+    lines = [f"CAMINO CRÍTICO ({elapsed:.2f}s en total):"]
+    for entry in breakdown:
+        lines.append(f"  • {entry['stage']}: {entry['seconds']:.3f}s ({entry['share']:.1%})")
+        for function in entry['functions']:
+            lines.append(f"      {function['function']}: {function['calls']} llamadas, "
+                         f"{function['own_seconds']:.3f}s propios, {function['cumulative_seconds']:.3f}s acumulados")
+    return "\n".join(lines)
+
+def profile_import(output_dir: str = PROFILE_DIR, **run_options: Any) -> Dict[str, Any]:
+    """
+    Ejecuta una importación bajo cProfile y el perfilador por muestreo.
+    
+    Escribe en output_dir, con el mismo prefijo profile_<fecha>:
+    - .pstats: estadísticas de cProfile (snakeviz, pstats)
+    - .collapsed: pilas muestreadas para flamegraph.pl o speedscope
+    - .txt: camino crítico y funciones con más tiempo acumulado
+    
+    Salvo que se indique lo contrario reprocesa todas las filas (como --full):
+    con el estado incremental las filas ya importadas no pasarían por el pipeline.
+    
+    Args:
+        output_dir (str): Directorio de los informes
+        **run_options: Opciones de main (sources, chunk_size, workers, row_limit...)
+    
+    Returns:
+        Dict[str, Any]: Rutas de los informes, estadísticas y camino crítico
+    """
+    run_options.setdefault("full_reprocess", True)
+    profiler = cProfile.Profile()
+    sampler = StackSampler()
+    started = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+    try:
+        statistics = main(**run_options)
+    finally:
+        profiler.disable()
+        sampler.stop()
+    elapsed = time.perf_counter() - started
+    
+    os.makedirs(output_dir, exist_ok=True)
+    prefix = os.path.join(output_dir, datetime.now().strftime("profile_%Y%m%d_%H%M%S"))
+    stats = pstats.Stats(profiler)
+    stats.dump_stats(f"{prefix}.pstats")
+    write_file_atomically(f"{prefix}.collapsed", sampler.collapsed().encode("utf-8"))
+    
+    breakdown = hot_path_breakdown(stats, sampler, elapsed)
+    report = generate_profile_report(breakdown, elapsed)
+    top_functions = StringIO()
+    stats.stream = top_functions
+    stats.sort_stats("cumulative").print_stats(40)
+    write_file_atomically(f"{prefix}.txt", f"{report}\n\n{top_functions.getvalue()}".encode("utf-8"))
+    
+    for line in report.splitlines():
+        logger.info(line)
+    logger.info(f"Perfil guardado en {prefix}.pstats / .collapsed / .txt ({sampler.samples} muestras)")
+    return {'statistics': statistics, 'elapsed_seconds': elapsed, 'samples': sampler.samples,
+            'hot_path': breakdown, 'files': [f"{prefix}.{ext}" for ext in ("pstats", "collapsed", "txt")]}
+
 # =========================================================================
 # PUNTO DE ENTRADA DEL PROGRAMA
 # =========================================================================
 
+def parse_arguments(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """
+    Procesa los argumentos de línea de comandos.
+    
+    Args:
+        argv (List[str], optional): Argumentos (por defecto sys.argv)
+    
+    Returns:
+        argparse.Namespace: Opciones de ejecución
+    """
+    parser = argparse.ArgumentParser(
+        description="Importa mediciones desde Google Sheets a PostgreSQL/Supabase")
+    parser.add_argument("--db-url", default=SUPABASE_DB_URL,
+                        help="Cadena de conexión PostgreSQL o 'sqlite:///ruta.db' para importar sin red")
+    parser.add_argument("--full", action="store_true",
+                        help="Reprocesar todas las filas ignorando el estado incremental")
+    parser.add_argument("--source", action="append",
+                        help="URL del CSV, ruta a un fichero local o '-' para leer de stdin; se puede repetir "
+                             "y admite 'nombre=fuente' (por defecto IMPORT_SOURCES o la hoja configurada)")
+    parser.add_argument("--chunk-size", type=int, default=CSV_CHUNK_SIZE,
+                        help="Filas por bloque de lectura (0 = cargar la hoja completa)")
+    parser.add_argument("--workers", type=int, default=IMPORT_WORKERS,
+                        help="Hilos de escritura en paralelo, cada uno con su propia conexión")
+    parser.add_argument("--commit-every", type=int, default=COMMIT_BATCH_SIZE,
+                        help="Filas por transacción en el modo fila a fila (0 = autocommit)")
+    parser.add_argument("--backfill-celdas", action="store_true",
+                        help="Calcular la celda de las sesiones existentes que no la tienen, recalcular los "
+                             "agregados por celda y salir")
+    parser.add_argument("--backfill-provincias", action="store_true",
+                        help="Asignar provincia a las sesiones existentes que no la tienen y salir")
+    parser.add_argument("--retry-rejected", action="store_true",
+                        help="Reintentar solo las filas rechazadas guardadas (de --source o de todas las fuentes) y salir")
+    parser.add_argument("--compact-archive", action="store_true",
+                        help="Compactar todas las particiones del archivo Parquet y salir")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Mantener el proceso activo y sondear la fuente periódicamente")
+    parser.add_argument("--interval", type=float, default=DAEMON_INTERVAL_SECONDS,
+                        help="Segundos entre sondeos en modo demonio")
+    parser.add_argument("--jitter", type=float, default=DAEMON_JITTER,
+                        help="Variación aleatoria del intervalo en modo demonio (0.1 = ±10%%)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Importar bajo cProfile y muestreo de pilas y escribir el informe "
+                             "(reprocesa las filas como --full)")
+    parser.add_argument("--profile-rows", type=int, default=0,
+                        help="Con --profile, perfilar solo las primeras N filas de cada fuente (0 = todas)")
+    parser.add_argument("--profile-dir", default=PROFILE_DIR,
+                        help="Directorio de los informes de --profile")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    arguments = parse_arguments()
+    set_importer(Importer(db_url=arguments.db_url, commit_every=arguments.commit_every))
+    sources = parse_source_list(arguments.source) if arguments.source else None
     try:
-        main()
+        if arguments.backfill_celdas or arguments.backfill_provincias:
+            setup_logging()
+            # Primero las celdas: la asignación de provincias recalcula los agregados de cada celda
+            if arguments.backfill_celdas:
+                backfill_grid_cells()
+            if arguments.backfill_provincias:
+                backfill_provinces()
+        elif arguments.retry_rejected:
+            retry_rejected(sources)
+        elif arguments.compact_archive:
+            setup_logging()
+            compact_parquet_archive(min_files=2)
+        elif arguments.profile:
+            profile_import(output_dir=arguments.profile_dir, sources=sources, chunk_size=arguments.chunk_size,
+                           workers=arguments.workers, row_limit=arguments.profile_rows or None)
+        elif arguments.daemon:
+            run_daemon(sources=sources, chunk_size=arguments.chunk_size, workers=arguments.workers,
+                       interval=arguments.interval, jitter=arguments.jitter)
+        else:
+            main(full_reprocess=arguments.full, sources=sources, chunk_size=arguments.chunk_size,
+                 workers=arguments.workers)
     except KeyboardInterrupt:
         logger.info("Proceso interrumpido por el usuario")
     except Exception as e:
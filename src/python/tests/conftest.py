@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Utilidades comunes de las pruebas del importador.
+
+Las pruebas no usan red ni la base de datos de producción: el estado
+incremental, las métricas y los ficheros de filas rechazadas van a un
+directorio temporal, la geometría de España es el contorno aproximado del
+banco de pruebas y la base de datos es la conexión simulada de
+benchmarkImport.py o un fichero SQLite temporal.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import csvToPostgres  # noqa: E402
+import benchmarkImport  # noqa: E402
+
+@pytest.fixture
+def importer_env(tmp_path, monkeypatch):
+    """
+    Aísla el importador igual que benchmarkImport.configure_importer, pero
+    deshaciendo los cambios al terminar cada prueba.
+    """
+    geometry_path = tmp_path / "spain_approx.wkt"
+    geometry_path.write_text(benchmarkImport.APPROXIMATE_SPAIN_WKT, encoding="utf-8")
+    monkeypatch.setattr(csvToPostgres, "IMPORT_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(csvToPostgres, "IMPORT_METRICS_ENABLED", False)
+    monkeypatch.setattr(csvToPostgres, "SPAIN_GEOMETRY_FIXTURE", str(geometry_path))
+    monkeypatch.setattr(csvToPostgres, "SPAIN_GEOMETRY_OFFLINE", True)
+    monkeypatch.setattr(csvToPostgres, "SNAPSHOT_EXPORT_ENABLED", False)
+    monkeypatch.setattr(csvToPostgres, "PARQUET_ARCHIVE_ENABLED", False)
+    monkeypatch.setattr(csvToPostgres, "_spain_geometry_cache", None)
+    monkeypatch.setattr(csvToPostgres, "_importer", None)
+    return tmp_path
+
+@pytest.fixture
+def fake_importer(importer_env):
+    """Importador activo sobre la conexión simulada en memoria de benchmarkImport."""
+    database = benchmarkImport.FakeDatabase()
+    importer = csvToPostgres.Importer(
+        connection_factory=lambda: benchmarkImport.FakeConnection(database))
+    importer.database = database
+    csvToPostgres.set_importer(importer)
+    yield importer
+    importer.close()
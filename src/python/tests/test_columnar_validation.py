@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Paridad de la validación por columnas (prepare_dataframe) con el
+procesamiento fila a fila original (iterrows + parse_timestamp,
+parse_location, validate_row_data, validate_coordinates_spain...).
+"""
+import io
+import random
+
+import pandas as pd
+import pytest
+
+import csvToPostgres
+import benchmarkImport
+
+REJECTION_CATEGORIES = ['skipped', 'invalid_timestamp', 'unknown_operator', 'invalid_coords', 'outside_spain']
+
+# Filas límite escritas a mano: formatos de fecha mezclados en la misma
+# columna, coordenadas con espacios, separadores o precisión extra y
+# mediciones fuera de rango o no numéricas
+EDGE_CASES_CSV = """Marca temporal,OPERADOR,COORDENADAS_LIMPIAS,Intensidad 4G,Intensidad 5G,ConcentraciÃ³n PM 2.5,ConcentraciÃ³n PM 10,ConcentraciÃ³n CO,ConcentraciÃ³n CO2
+01/03/2025 10:00:00,Movistar,"40.4168, -3.7038",-80,,12.5,,,
+01/03/2025 10:05,vodafone,"40.41680001,-3.70380001",-79.6,-101,,,,
+2025-03-01 10:10:00, Orange ,"41.6523 , -4.7245",,,3.25,40,,
+2025-03-01 10:15,O2,"41.652312345678, -4.724512345678",-200,,,,,
+01-03-2025 10:20:00,Digi,"39.5, 2.9",-90,,-1,,,
+01-03-2025 10:25,Otro,"28.3,-16.5",,-70,,,0.4,800
+32/13/2025 25:61:00,Movistar,"40.0,-3.0",-80,,,,,
+ayer,Movistar,"40.0,-3.0",-80,,,,,
+01/03/2025 11:00:00,Telefonía Rural,"40.0,-3.0",-80,,,,,
+01/03/2025 11:05:00,,"40.0,-3.0",-80,,,,,
+01/03/2025 11:10:00,Movistar,abc,-80,,,,,
+01/03/2025 11:15:00,Movistar,"40.0;-3.0",-80,,,,,
+01/03/2025 11:20:00,Movistar,"40.0,-3.0,1",-80,,,,,
+01/03/2025 11:25:00,Movistar,"95.0,-3.0",-80,,,,,
+01/03/2025 11:30:00,Movistar,"38.7223,-9.1393",-80,,,,,
+01/03/2025 11:35:00,Movistar,"48.8566,2.3522",-80,,,,,
+01/03/2025 11:40:00,Movistar,"40.0,-3.0",,,,,,
+01/03/2025 11:45:00,Movistar,"40.0,-3.0",n/d,,,,,
+01/03/2025 11:50:00,Movistar,"40.0,-3.0",,,mucho,,,
+,Movistar,"40.0,-3.0",-80,,,,,
+"""
+
+def reference_records(dataframe: pd.DataFrame, statistics: dict) -> list:
+    """Validación fila a fila tal y como la hacía process_data_row (sin escribir en la base de datos)."""
+    records = []
+    for index, row in dataframe.iterrows():
+        if not csvToPostgres.validate_row_data(row)[0]:
+            statistics['skipped'] += 1
+            continue
+        timestamp = csvToPostgres.parse_timestamp(row["Marca temporal"])
+        if not timestamp:
+            statistics['invalid_timestamp'] += 1
+            continue
+        operator_id = csvToPostgres.get_operator_id(str(row["OPERADOR"]).strip())
+        if operator_id is None:
+            statistics['unknown_operator'] += 1
+            continue
+        lat, lon = csvToPostgres.parse_location(str(row["COORDENADAS_LIMPIAS"]))
+        if lat is None or lon is None:
+            statistics['invalid_coords'] += 1
+            continue
+        if not csvToPostgres.validate_coordinates_spain(lat, lon)[0]:
+            statistics['outside_spain'] = statistics.get('outside_spain', 0) + 1
+            continue
+        signals = []
+        for field, code in csvToPostgres.SIGNAL_COLUMNS:
+            if field in row and not pd.isna(row[field]):
+                strength = csvToPostgres.parse_signal_strength(row[field])
+                if strength is not None:
+                    signals.append((code, strength))
+        pollutants = []
+        for field, code in csvToPostgres.POLLUTANT_COLUMNS.items():
+            if field in row and not pd.isna(row[field]):
+                concentration = csvToPostgres.parse_concentration(row[field])
+                if concentration is not None:
+                    pollutants.append((code, concentration))
+        records.append({'row_index': int(index), 'latitude': lat, 'longitude': lon, 'timestamp': timestamp,
+                        'operator_id': operator_id, 'signals': signals, 'pollutants': pollutants})
+    return records
+
+def columnar_records(dataframe: pd.DataFrame, statistics: dict) -> list:
+    keys = ['row_index', 'latitude', 'longitude', 'timestamp', 'operator_id', 'signals', 'pollutants']
+    return [{key: record[key] for key in keys}
+            for record in csvToPostgres.prepare_dataframe(dataframe, statistics)]
+
+def assert_same_validation(dataframe: pd.DataFrame) -> None:
+    expected_statistics = csvToPostgres.create_processing_stats()
+    statistics = csvToPostgres.create_processing_stats()
+    expected = reference_records(dataframe, expected_statistics)
+    assert columnar_records(dataframe, statistics) == expected
+    assert ({key: statistics.get(key, 0) for key in REJECTION_CATEGORIES}
+            == {key: expected_statistics.get(key, 0) for key in REJECTION_CATEGORIES})
+
+def test_edge_cases_match_row_by_row(fake_importer):
+    dataframe = pd.read_csv(io.StringIO(EDGE_CASES_CSV))
+    assert_same_validation(dataframe)
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_generated_sheet_matches_row_by_row(fake_importer, tmp_path, seed):
+    path = tmp_path / "sheet.csv"
+    benchmarkImport.generate_sheet_csv(str(path), 600, seed=seed, bad_timestamp_ratio=0.1,
+                                       unknown_operator_ratio=0.1, outside_ratio=0.1)
+    assert_same_validation(pd.read_csv(path))
+
+def test_processing_stats_match_row_by_row_import(fake_importer, tmp_path):
+    """Las estadísticas completas de una importación coinciden con las de la validación fila a fila."""
+    path = tmp_path / "sheet.csv"
+    benchmarkImport.generate_sheet_csv(str(path), 400, seed=7, bad_timestamp_ratio=0.1,
+                                       unknown_operator_ratio=0.1, outside_ratio=0.1, duplicate_ratio=0.0)
+    expected_statistics = csvToPostgres.create_processing_stats()
+    expected = reference_records(pd.read_csv(path), expected_statistics)
+
+    statistics = fake_importer.run(full_reprocess=True, source=str(path), chunk_size=0)
+    for key in REJECTION_CATEGORIES:
+        assert statistics.get(key, 0) == expected_statistics.get(key, 0)
+    assert statistics['processed'] == len(expected)
+    assert statistics['total_signals'] == sum(len(record['signals']) for record in expected)
+    assert statistics['total_pollutants'] == sum(len(record['pollutants']) for record in expected)
+
+def test_location_rounding_matches_python_round(fake_importer):
+    """Series.round(8) y round(x, 8) dan el mismo float con cualquier número de decimales."""
+    rnd = random.Random(5)
+    values = pd.Series([f"{rnd.uniform(27, 44):.{rnd.randint(1, 15)}f}, {rnd.uniform(-19, 5):.{rnd.randint(1, 15)}f}"
+                        for _ in range(5000)])
+    lats, lons = csvToPostgres.parse_location_column(values)
+    expected = [csvToPostgres.parse_location(value) for value in values]
+    assert list(zip(lats, lons)) == expected
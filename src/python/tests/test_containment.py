@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+La cascada de contención (interior / envolvente / geometría exacta) da
+exactamente las mismas respuestas que shapely.contains_xy, también en la
+franja de costa y fronteras donde actúa cada nivel.
+"""
+import logging
+
+import numpy as np
+import pytest
+import shapely
+from shapely.geometry import MultiPolygon, Polygon
+
+import csvToPostgres
+
+def rough_polygon(rng: np.random.Generator, cx: float, cy: float, radius: float, vertices: int) -> Polygon:
+    """Polígono con contorno irregular (como una costa) y muchos vértices."""
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    radii = radius * (1 + sum(rng.normal() * 0.05 / k * np.sin(k * angles + rng.uniform(0, 6))
+                              for k in range(1, 200)))
+    return Polygon(np.c_[cx + radii * np.cos(angles), cy + radii * np.sin(angles)]).buffer(0)
+
+@pytest.fixture(scope="module")
+def geometry():
+    """Península con un hueco, dos islas y un islote dentro del hueco."""
+    rng = np.random.default_rng(0)
+    mainland = rough_polygon(rng, -3.5, 40, 4.0, 20000).difference(rough_polygon(rng, -3.5, 40, 0.3, 2000))
+    parts = [mainland, rough_polygon(rng, 2.9, 39.5, 0.4, 4000), rough_polygon(rng, -15.5, 28.3, 0.6, 4000),
+             rough_polygon(rng, -3.5, 40, 0.1, 1000)]
+    return MultiPolygon(list(shapely.get_parts(shapely.union_all(parts))))
+
+def sample_points(geometry, seed: int) -> tuple:
+    """Puntos uniformes en la caja de España más puntos en la costa: cerca del contorno y sobre sus vértices."""
+    rng = np.random.default_rng(seed)
+    lons, lats = rng.uniform(-19, 5, 20000), rng.uniform(27, 44, 20000)
+    boundary = shapely.get_coordinates(shapely.boundary(geometry))
+    near = boundary[rng.integers(0, len(boundary), 20000)]
+    exact = boundary[rng.integers(0, len(boundary), 500)]
+    scale = csvToPostgres.SPAIN_CASCADE_TOLERANCE
+    lons = np.r_[lons, near[:, 0] + rng.normal(0, 2 * scale, len(near)), exact[:, 0]]
+    lats = np.r_[lats, near[:, 1] + rng.normal(0, 2 * scale, len(near)), exact[:, 1]]
+    return lons, lats
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_cascade_matches_shapely(geometry, seed):
+    cascade = csvToPostgres.ContainmentCascade(geometry)
+    assert cascade.inner is not None and cascade.outer is not None
+    lons, lats = sample_points(geometry, seed)
+    expected = shapely.contains_xy(geometry, lons, lats)
+    assert 0 < expected.sum() < len(expected)
+    np.testing.assert_array_equal(cascade.contains_xy(lons, lats), expected)
+
+def test_single_points_match_shapely(geometry):
+    cascade = csvToPostgres.ContainmentCascade(geometry)
+    lons, lats = sample_points(geometry, 3)
+    for lon, lat in zip(lons[-1000:], lats[-1000:]):
+        assert cascade.contains_xy(lon, lat) == shapely.contains_xy(geometry, lon, lat)
+
+def test_small_geometry_uses_exact_check(geometry):
+    small = shapely.simplify(geometry, 0.05)
+    cascade = csvToPostgres.ContainmentCascade(small)
+    assert cascade.inner is None and cascade.outer is None
+    lons, lats = sample_points(small, 4)
+    np.testing.assert_array_equal(cascade.contains_xy(lons, lats), shapely.contains_xy(small, lons, lats))
+
+def test_no_debug_summary_without_debug_logging(geometry, monkeypatch, caplog):
+    """is_point_in_spain llama a la cascada punto a punto: sin DEBUG no se formatea el resumen."""
+    cascade = csvToPostgres.ContainmentCascade(geometry)
+    caplog.set_level(logging.INFO, logger=csvToPostgres.logger.name)
+    monkeypatch.setattr(csvToPostgres.logger, "debug", lambda *args, **kwargs: pytest.fail("resumen calculado"))
+    cascade.contains_xy(np.array([-3.7]), np.array([40.4]))
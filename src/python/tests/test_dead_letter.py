@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Filas rechazadas (dead letter): una fila corregida en la hoja sustituye a
+su versión rechazada y --retry-rejected no reimporta versiones antiguas.
+"""
+import sqlite3
+
+import pytest
+
+import csvToPostgres
+
+HEADER = "Marca temporal,OPERADOR,COORDENADAS_LIMPIAS,Intensidad 4G\n"
+ROWS = [
+    "01/03/2025 10:00:00,Movistar,\"41.6523,-4.7245\",-80",
+    "01/03/2025 10:05:00,Vodafone,\"41.6600,-4.7300\",-85",
+    "01/03/2025 10:10:00,Orange,\"41.6700,-4.7400\",-90",
+]
+
+def write_sheet(path, rows) -> None:
+    path.write_text(HEADER + "\n".join(rows) + "\n", encoding="utf-8")
+
+def entries_by_row(source) -> dict:
+    return {entry['row']: entry for entry in csvToPostgres.DeadLetterStore.load(str(source)).entries.values()}
+
+@pytest.fixture
+def sqlite_importer(importer_env, tmp_path):
+    """Importador activo sobre un fichero SQLite temporal (uno nuevo en cada llamada)."""
+    database_path = tmp_path / "import.db"
+    importers = []
+    
+    def create() -> csvToPostgres.Importer:
+        importer = csvToPostgres.Importer(db_url=f"sqlite:///{database_path}")
+        csvToPostgres.set_importer(importer)
+        importers.append(importer)
+        return importer
+    
+    create.database_path = database_path
+    yield create
+    for importer in importers:
+        importer.close()
+
+def sessions(database_path) -> list:
+    with sqlite3.connect(database_path) as connection:
+        return connection.execute("SELECT latitude, longitude, timestamp_recorded, operator_id "
+                                  "FROM measurement_sessions ORDER BY id").fetchall()
+
+def test_fixed_row_replaces_rejected_version(sqlite_importer, tmp_path):
+    sheet = tmp_path / "sheet.csv"
+    write_sheet(sheet, ROWS[:1] + ["ayer,Vodafone,\"41.6600,-4.7300\",-85"] + ROWS[2:])
+    statistics = sqlite_importer().run(source=str(sheet), chunk_size=0)
+    assert statistics['invalid_timestamp'] == 1
+    assert entries_by_row(sheet)[2]['reason'] == 'invalid_timestamp'
+    
+    # Se corrige la fecha en la hoja: la fila se importa y su entrada desaparece
+    write_sheet(sheet, ROWS)
+    statistics = sqlite_importer().run(source=str(sheet), chunk_size=0)
+    assert statistics['processed'] == 1
+    assert entries_by_row(sheet) == {}
+    assert len(sessions(sqlite_importer.database_path)) == 3
+
+def test_edited_rejected_row_keeps_one_entry(sqlite_importer, tmp_path):
+    sheet = tmp_path / "sheet.csv"
+    write_sheet(sheet, ROWS[:2] + ["01/03/2025 10:10:00,Telefonía Rural,\"41.6700,-4.7400\",-90"])
+    sqlite_importer().run(source=str(sheet), chunk_size=0)
+    first = entries_by_row(sheet)[3]
+    
+    # Otra corrección que sigue fallando: una única entrada, con los valores nuevos
+    write_sheet(sheet, ROWS[:2] + ["01/03/2025 10:10:00,Telefonía Rural,\"41.6700,-4.7400\",-95"])
+    sqlite_importer().run(source=str(sheet), chunk_size=0)
+    with open(csvToPostgres.get_dead_letter_path(str(sheet)), encoding="utf-8") as dead_letter_file:
+        assert len(dead_letter_file.readlines()) == 1
+    entries = entries_by_row(sheet)
+    assert entries[3]['fingerprint'] != first['fingerprint']
+    assert entries[3]['values']['Intensidad 4G'] == -95
+
+def test_retry_after_fixing_row_in_sheet(sqlite_importer, tmp_path):
+    sheet = tmp_path / "sheet.csv"
+    write_sheet(sheet, ROWS[:2] + ["01/03/2025 10:10:00,Telefonía Rural,\"41.6800,-4.7500\",-90"])
+    statistics = sqlite_importer().run(source=str(sheet), chunk_size=0)
+    assert statistics['unknown_operator'] == 1
+    
+    # Se corrige el operador en la hoja y se importa
+    write_sheet(sheet, ROWS)
+    sqlite_importer().run(source=str(sheet), chunk_size=0)
+    assert entries_by_row(sheet) == {}
+    
+    # Más tarde se da de alta el operador: el reintento no tiene nada que reimportar
+    with sqlite3.connect(sqlite_importer.database_path) as connection:
+        connection.execute("INSERT INTO operators (name, display_name) VALUES ('telefonia_rural', 'Telefonía Rural')")
+    statistics = sqlite_importer().retry_rejected({'sheet': str(sheet)})
+    assert statistics['processed'] == 0
+    stored = sessions(sqlite_importer.database_path)
+    assert len(stored) == 3
+    assert all((lat, lon) != (41.68, -4.75) for lat, lon, _, _ in stored)
+
+def test_load_keeps_latest_version_of_each_row(importer_env, tmp_path):
+    """Ficheros escritos antes de sustituir versiones: solo se reintenta la última de cada fila."""
+    source = str(tmp_path / "sheet.csv")
+    store = csvToPostgres.DeadLetterStore(source, {
+        fingerprint: {'fingerprint': fingerprint, 'source': source, 'row': 34, 'reason': 'unknown_operator',
+                      'first_rejected_at': rejected_at, 'rejected_at': rejected_at, 'values': {}}
+        for fingerprint, rejected_at in (("00000000000000aa", "2025-03-01T10:00:00"),
+                                         ("00000000000000bb", "2025-03-02T10:00:00"))
+    })
+    store.changed = True
+    store.save()
+    assert list(csvToPostgres.DeadLetterStore.load(source).entries) == ["00000000000000bb"]
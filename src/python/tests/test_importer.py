@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Opciones de Importer que se fijan al crearlo y estado global del proceso (sin efectos al importar)."""
+import codecs
+import os
+import subprocess
+import sys
+
+import csvToPostgres
+import benchmarkImport
+
+def test_commit_every_is_per_importer(importer_env, tmp_path, monkeypatch):
+    path = tmp_path / "sheet.csv"
+    benchmarkImport.generate_sheet_csv(str(path), 120, seed=3)
+    batches = []
+    store_batch = csvToPostgres.store_records_transaction
+    monkeypatch.setattr(csvToPostgres, "store_records_transaction",
+                        lambda records, statistics: batches.append(len(records)) or store_batch(records, statistics))
+
+    results = []
+    for commit_every in (0, 25):
+        database = benchmarkImport.FakeDatabase()
+        importer = csvToPostgres.Importer(connection_factory=lambda: benchmarkImport.FakeConnection(database),
+                                          commit_every=commit_every)
+        try:
+            results.append(importer.run(full_reprocess=True, source=str(path), chunk_size=0))
+        finally:
+            importer.close()
+        if commit_every == 0:
+            assert batches == []
+
+    assert batches and max(batches) == 25
+    assert results[0] == results[1]
+
+def test_import_registers_no_codec_handler():
+    """Importar el módulo no modifica el registro global de codecs: el manejador se registra al leer."""
+    code = ("import codecs, csvToPostgres\n"
+            "try:\n"
+            "    codecs.lookup_error(csvToPostgres.LATIN1_FALLBACK_ERRORS)\n"
+            "except LookupError:\n"
+            "    print('sin registrar')\n")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(csvToPostgres.__file__)))
+    assert result.stdout.strip() == "sin registrar"
+
+def test_utf8_stream_falls_back_to_latin1(importer_env, tmp_path):
+    """Bytes latin-1 tras la muestra inicial de un fichero UTF-8 se leen y se recuerda latin1."""
+    path = tmp_path / "sheet.csv"
+    rows = [f"01/03/2025 10:{minute % 60:02d}:00,Movistar,\"40.4168,-3.7038\",-80" for minute in range(3000)]
+    text = "Marca temporal,OPERADOR,COORDENADAS_LIMPIAS,Intensidad 4G\n" + "\n".join(rows) + "\n"
+    path.write_bytes(text.encode("utf-8") + "01/03/2025 11:00:00,Telefonía,\"40.0,-3.0\",-80\n".encode("latin-1"))
+    chunks = list(csvToPostgres.iter_csv_chunks(str(path), 1000))
+    assert chunks[-1]["OPERADOR"].iloc[-1] == "Telefonía"
+    assert codecs.lookup_error(csvToPostgres.LATIN1_FALLBACK_ERRORS)
+    assert csvToPostgres.get_remembered_encoding(str(path)) == "latin1"
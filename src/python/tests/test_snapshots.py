@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Vigencia de las instantáneas GeoJSON: una importación sin cambios no
+regenera las capas, pero confirma el manifiesto (checked_at) para que la
+web no lo descarte por antigüedad.
+"""
+import json
+
+import pytest
+
+import csvToPostgres
+import benchmarkImport
+
+OLD_TIMESTAMP = "2025-01-01T00:00:00+00:00"
+
+def write_old_manifest(directory) -> dict:
+    manifest = {'generated_at': OLD_TIMESTAMP, 'checked_at': OLD_TIMESTAMP, 'layers': {}}
+    (directory / csvToPostgres.SNAPSHOT_MANIFEST_FILE).write_text(json.dumps(manifest), encoding="utf-8")
+    return manifest
+
+def read_manifest(directory) -> dict:
+    return json.loads((directory / csvToPostgres.SNAPSHOT_MANIFEST_FILE).read_text(encoding="utf-8"))
+
+def test_touch_keeps_generated_at(tmp_path):
+    write_old_manifest(tmp_path)
+    assert csvToPostgres.touch_snapshot_manifest(str(tmp_path))
+    manifest = read_manifest(tmp_path)
+    assert manifest['generated_at'] == OLD_TIMESTAMP
+    assert manifest['checked_at'] > OLD_TIMESTAMP
+
+def test_touch_without_manifest(tmp_path):
+    assert not csvToPostgres.touch_snapshot_manifest(str(tmp_path / "no_existe"))
+
+def test_unchanged_import_confirms_snapshots(fake_importer, tmp_path, monkeypatch):
+    path = tmp_path / "sheet.csv"
+    benchmarkImport.generate_sheet_csv(str(path), 200, seed=3)
+    fake_importer.run(source=str(path), chunk_size=0)
+
+    snapshot_dir = tmp_path / "snapshots"
+    snapshot_dir.mkdir()
+    write_old_manifest(snapshot_dir)
+    monkeypatch.setattr(csvToPostgres, "SNAPSHOT_DIR", str(snapshot_dir))
+    monkeypatch.setattr(csvToPostgres, "SNAPSHOT_EXPORT_ENABLED", True)
+    monkeypatch.setattr(csvToPostgres, "export_geojson_snapshots",
+                        lambda *args, **kwargs: pytest.fail("no debe regenerar las capas"))
+
+    statistics = fake_importer.run(source=str(path), chunk_size=0)
+    assert statistics['processed'] == 0
+    manifest = read_manifest(snapshot_dir)
+    assert manifest['generated_at'] == OLD_TIMESTAMP
+    assert manifest['checked_at'] > OLD_TIMESTAMP
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+Paridad entre backends: la misma hoja importada por el camino PostgreSQL
+(conexión simulada de benchmarkImport) y por SQLiteBackend da las mismas
+estadísticas, las mismas sesiones deduplicadas y los mismos agregados por celda.
+"""
+import sqlite3
+from collections import defaultdict
+from datetime import datetime
+
+import pytest
+
+import csvToPostgres
+import benchmarkImport
+
+def fake_grid(database: benchmarkImport.FakeDatabase) -> dict:
+    """Agregados de signal_grid_cells calculados a partir de las tablas simuladas."""
+    grid = defaultdict(list)
+    for (session_id, signal_type_id), strength in database.signals.items():
+        operator_id = database.sessions[session_id][3]
+        grid[(database.session_cells[session_id], operator_id, signal_type_id)].append(strength)
+    return {key: (len(values), sum(values), min(values), max(values)) for key, values in grid.items()}
+
+def fake_pollution_grid(database: benchmarkImport.FakeDatabase) -> dict:
+    """Agregados de pollution_grid_cells (con las mismas condiciones que refresh_grid_cells)."""
+    grid = defaultdict(list)
+    for (session_id, pollutant_type_id), concentration in database.pollutants.items():
+        value = round(float(concentration), 4)
+        if 0 < value < 9999:
+            timestamp = database.sessions[session_id][2]
+            grid[(database.session_cells[session_id], pollutant_type_id, timestamp.date().isoformat())].append(value)
+    return {key: (len(values), round(sum(values), 4), min(values), max(values)) for key, values in grid.items()}
+
+def run_both(tmp_path, monkeypatch, path) -> tuple:
+    database = benchmarkImport.FakeDatabase()
+    fake = csvToPostgres.Importer(connection_factory=lambda: benchmarkImport.FakeConnection(database))
+    sqlite_path = tmp_path / "import.db"
+    embedded = csvToPostgres.Importer(db_url=f"sqlite:///{sqlite_path}")
+
+    statistics = {}
+    for name, importer in (("postgres", fake), ("sqlite", embedded)):
+        monkeypatch.setattr(csvToPostgres, "IMPORT_CACHE_DIR", str(tmp_path / name))
+        csvToPostgres.set_importer(importer)
+        try:
+            first = importer.run(full_reprocess=True, source=str(path), chunk_size=0)
+            # Segunda pasada: todas las sesiones ya existen en la base de datos
+            second = importer.run(full_reprocess=True, source=str(path), chunk_size=0)
+        finally:
+            importer.close()
+        statistics[name] = (first, second)
+    return database, sqlite3.connect(sqlite_path), statistics
+
+def test_postgres_and_sqlite_import_the_same(importer_env, tmp_path, monkeypatch):
+    path = tmp_path / "sheet.csv"
+    benchmarkImport.generate_sheet_csv(str(path), 500, seed=11, bad_timestamp_ratio=0.05,
+                                       unknown_operator_ratio=0.05, outside_ratio=0.05, duplicate_ratio=0.1)
+    database, connection, statistics = run_both(tmp_path, monkeypatch, path)
+
+    assert statistics["postgres"] == statistics["sqlite"]
+    first, second = statistics["sqlite"]
+    assert first['existing_sessions'] > 0
+    assert second['new_sessions'] == 0
+    assert second['existing_sessions'] == first['processed']
+
+    # Sesiones deduplicadas
+    rows = connection.execute("SELECT latitude, longitude, timestamp_recorded, operator_id, cell_id "
+                              "FROM measurement_sessions").fetchall()
+    sqlite_sessions = sorted((round(lat, 8), round(lon, 8), datetime.fromisoformat(timestamp), operator_id, cell_id)
+                             for lat, lon, timestamp, operator_id, cell_id in rows)
+    fake_sessions = sorted((round(lat, 8), round(lon, 8), timestamp, operator_id, database.session_cells[session_id])
+                           for session_id, (lat, lon, timestamp, operator_id) in database.sessions.items())
+    assert sqlite_sessions == fake_sessions
+    assert len(sqlite_sessions) == first['new_sessions']
+
+    # Agregados por celda
+    signal_grid = {(cell_id, operator_id, signal_type_id): (count, total, minimum, maximum)
+                   for cell_id, operator_id, signal_type_id, count, total, minimum, maximum in connection.execute(
+                       "SELECT cell_id, operator_id, signal_type_id, measurement_count, strength_sum, "
+                       "min_strength, max_strength FROM signal_grid_cells")}
+    assert signal_grid and signal_grid == fake_grid(database)
+    pollution_grid = {(cell_id, pollutant_type_id, day): (count, round(total, 4), minimum, maximum)
+                      for cell_id, pollutant_type_id, day, count, total, minimum, maximum in connection.execute(
+                          "SELECT cell_id, pollutant_type_id, measurement_date, measurement_count, "
+                          "concentration_sum, min_concentration, max_concentration FROM pollution_grid_cells")}
+    assert pollution_grid and pollution_grid == fake_pollution_grid(database)
+    connection.close()
+
+def test_incomplete_backend_fails_on_creation():
+    class IncompleteBackend(csvToPostgres.StorageBackend):
+        def connect(self) -> None:
+            pass
+
+    with pytest.raises(TypeError, match="abstract"):
+        IncompleteBackend()
+
+def test_sqlite_assign_provinces_is_measured(importer_env):
+    importer = csvToPostgres.Importer(db_url="sqlite://")
+    csvToPostgres.set_importer(importer)
+    backend = importer.storage
+    try:
+        session_id = backend.insert_session(41.65, -4.72, datetime(2025, 3, 1, 10), 1,
+                                            (30, "30_1_1", 41.65, -4.72), None)
+        queries = importer.metrics.db_queries.count
+        backend.assign_provinces([session_id], [None])
+        assert importer.metrics.db_queries.count == queries + 1
+    finally:
+        importer.close()
+
+def test_sqlite_backfill_grid_cells(importer_env, tmp_path):
+    """Sesiones anteriores al cálculo de celdas (cell_id NULL): --backfill-celdas las lleva a los agregados."""
+    path = tmp_path / "sheet.csv"
+    benchmarkImport.generate_sheet_csv(str(path), 200, seed=5)
+    sqlite_path = tmp_path / "import.db"
+    importer = csvToPostgres.Importer(db_url=f"sqlite:///{sqlite_path}")
+    csvToPostgres.set_importer(importer)
+    try:
+        importer.run(full_reprocess=True, source=str(path), chunk_size=0)
+        with sqlite3.connect(sqlite_path) as connection:
+            expected_sessions = connection.execute(
+                "SELECT id, utm_zone, cell_id, cell_lat, cell_lng FROM measurement_sessions ORDER BY id").fetchall()
+            expected_grid = connection.execute("SELECT * FROM signal_grid_cells ORDER BY 1, 2, 3").fetchall()
+            # Estado de una instalación anterior
+            connection.execute("UPDATE measurement_sessions SET utm_zone = NULL, cell_id = NULL, "
+                               "cell_lat = NULL, cell_lng = NULL")
+            connection.execute("DELETE FROM signal_grid_cells")
+            connection.execute("DELETE FROM pollution_grid_cells")
+        
+        assert csvToPostgres.backfill_grid_cells() == len(expected_sessions)
+        assert csvToPostgres.backfill_grid_cells() == 0
+    finally:
+        importer.close()
+    
+    with sqlite3.connect(sqlite_path) as connection:
+        assert connection.execute("SELECT id, utm_zone, cell_id, cell_lat, cell_lng FROM measurement_sessions "
+                                  "ORDER BY id").fetchall() == expected_sessions
+        grid = connection.execute("SELECT * FROM signal_grid_cells ORDER BY 1, 2, 3").fetchall()
+    # updated_at (última columna) cambia al recalcular
+    assert [row[:-1] for row in grid] == [row[:-1] for row in expected_grid]
+    assert grid